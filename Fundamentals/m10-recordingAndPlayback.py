@@ -3,10 +3,11 @@ m10-recordingAndPlayback.py
 
 Demonstrates recording and playback of multi-joint robotic arm movements using two joysticks and buttons on a Raspberry Pi Pico.
 Movements are recorded step-by-step and can be replayed on demand.
+A timer moves the servos, so the joints of each step move at the same time.
 """
 
-from machine import ADC, Pin, PWM
-from time import sleep
+from machine import ADC, Pin, PWM, Timer
+from time import sleep, sleep_ms
 
 # === Initialize ADCs for Joysticks ===
 x1 = ADC(Pin(26))  # Joystick 1 X-axis (Base)
@@ -24,47 +25,118 @@ elbow_servo = PWM(Pin(4))
 for s in (base_servo, shoulder_servo, elbow_servo):
     s.freq(50)
 
-def angle_to_duty(angle):
-    """
-    Convert an angle (0-180 degrees) to a 16-bit PWM duty cycle.
-    Args:
-        angle (int): Target angle in degrees
-    Returns:
-        int: Duty cycle value for PWM
-    """
-    min_us = 500
-    max_us = 2500
-    us = min_us + (max_us - min_us) * angle // 180
-    return int(us * 65535 / 20000)
+#################### Timer-Driven Servo Motion ###########################
+# A machine.Timer moves every servo a little towards its target on each tick,
+# so joints move at the same time and move_to() returns at once. A new target
+# replaces the old one mid-move. Angles are kept in millidegrees (integers).
+
+def _duty(mdeg):
+    # 500-2500 us pulse over 0-180 degrees, as a 16-bit duty cycle of the 20 ms period
+    return (500 + mdeg * 2000 // 180000) * 65535 // 20000
 
-def move_servo(servo, angle):
-    """Move a servo to the given angle."""
-    servo.duty_u16(angle_to_duty(angle))
 
-def smooth_move(current, target, servo):
+class ServoMotion:
     """
-    Smoothly move a servo from current angle to target angle.
+    Moves a set of named servos towards their targets at a fixed speed.
+
     Args:
-        current (int): Current angle
-        target (int): Target angle
-        servo (PWM): The PWM object for the servo
-    Returns:
-        int: The final angle reached (target)
+        speed_dps (int): Joint speed in degrees per second
+        period_ms (int): Timer tick period
     """
-    step = 1 if target > current else -1
-    for angle in range(current, target + step, step):
-        move_servo(servo, angle)
-        sleep(0.01)
-    return target
-
-# === Initial Positions ===
-base_angle = 0
-shoulder_angle = 0
-elbow_angle = 0
-# Move to initial
-base_angle = smooth_move(0, base_angle, base_servo)
-shoulder_angle = smooth_move(0, shoulder_angle, shoulder_servo)
-elbow_angle = smooth_move(0, elbow_angle, elbow_servo)
+    def __init__(self, speed_dps=100, period_ms=10):
+        self.period_ms = period_ms
+        self._step = max(1, speed_dps * period_ms)  # deg/s * ms = millidegrees per tick
+        self._index = {}           # Servo name -> index into the lists below
+        self._pwm = []             # PWM object per servo
+        self._pos = []             # Current angle, millidegrees
+        self._target = []          # Target angle, millidegrees
+        self._timer = None
+
+    def add(self, name, pwm, angle):
+        """
+        Register a servo and drive it to its starting angle at once.
+        Args:
+            name (str): Servo name, e.g. "base"
+            pwm (PWM): PWM object, already set to 50 Hz
+            angle (int): Starting angle in degrees
+        """
+        mdeg = int(max(0, min(180, angle)) * 1000)
+        self._index[name] = len(self._pwm)
+        self._pwm.append(pwm)
+        self._pos.append(mdeg)
+        self._target.append(mdeg)
+        pwm.duty_u16(_duty(mdeg))
+
+    def move_to(self, name, angle):
+        """
+        Set a servo's target angle; it starts moving on the next tick.
+        Replaces any target it is still moving towards.
+        Args:
+            name (str): Servo name
+            angle (int): Target angle in degrees, clamped to 0-180
+        """
+        self._target[self._index[name]] = int(max(0, min(180, angle)) * 1000)
+
+    def moving(self):
+        """
+        Check whether any servo has not reached its target yet.
+        Returns:
+            bool: True while moving
+        """
+        return self._pos != self._target
+
+    def angle(self, name):
+        """
+        Return a servo's current angle.
+        Args:
+            name (str): Servo name
+        Returns:
+            int: Angle in degrees, rounded
+        """
+        return (self._pos[self._index[name]] + 500) // 1000
+
+    def wait(self):
+        """
+        Block until every servo has reached its target.
+        """
+        while self.moving():
+            sleep_ms(self.period_ms)
+
+    def start(self):
+        """
+        Start the timer that moves the servos.
+        """
+        if self._timer is None:
+            self._timer = Timer(-1, mode=Timer.PERIODIC, period=self.period_ms, callback=self._tick)
+
+    def deinit(self):
+        """
+        Stop the timer; the servos hold their current angles.
+        """
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+    def _tick(self, _timer):
+        step = self._step
+        for i in range(len(self._pos)):
+            p = self._pos[i]
+            t = self._target[i]
+            if p == t:
+                continue
+            if t > p:
+                p = t if t - p <= step else p + step
+            else:
+                p = t if p - t <= step else p - step
+            self._pos[i] = p
+            self._pwm[i].duty_u16(_duty(p))
+
+# === Initial Positions (servos move 1 degree every 10 ms) ===
+motion = ServoMotion(speed_dps=100)
+motion.add("base", base_servo, 0)
+motion.add("shoulder", shoulder_servo, 0)
+motion.add("elbow", elbow_servo, 0)
+motion.start()
 
 # === Joystick Deadzone and Center ===
 center = 32767
@@ -79,41 +151,43 @@ button2_prev = 1
 
 print("Ready to record movements...")
 
-while True:
-    b1 = button1.value()
-    b2 = button2.value()
-    x1_val = x1.read_u16()
-    x2_val = x2.read_u16()
-    x3_val = x3.read_u16()
-    # Joystick 1 X for base
-    if abs(x1_val - center) > dead_zone:
-        angle = int(x1_val * 180 / 65535)
-        base_angle = smooth_move(base_angle, angle, base_servo)
-    # Joystick 1 Y for shoulder
-    if abs(x2_val - center) > dead_zone:
-        angle = int(x2_val * 180 / 65535)
-        shoulder_angle = smooth_move(shoulder_angle, angle, shoulder_servo)
-    # Joystick 2 X for elbow
-    if abs(x3_val - center) > dead_zone:
-        angle = int(x3_val * 180 / 65535)
-        elbow_angle = smooth_move(elbow_angle, angle, elbow_servo)
-    # Record if either button is newly pressed
-    if (b1 == 0 and button1_prev == 1) or (b2 == 0 and button2_prev == 1):
-        recorded_steps.append((base_angle, shoulder_angle, elbow_angle))
-        print("Recorded:", base_angle, shoulder_angle, elbow_angle)
-        sleep(0.3)  # Debounce
-    # Playback when both buttons are held
-    if b1 == 0 and b2 == 0 and len(recorded_steps) > 0:
-        print("Playing back sequence...")
-        for step in recorded_steps:
-            base_angle = smooth_move(base_angle, step[0], base_servo)
-            shoulder_angle = smooth_move(shoulder_angle, step[1], shoulder_servo)
-            elbow_angle = smooth_move(elbow_angle, step[2], elbow_servo)
-            print("Playing back:", base_angle, shoulder_angle, elbow_angle)
-            sleep(0.5)
-        print("Playback finished.")
-        sleep(1)
-    button1_prev = b1
-    button2_prev = b2
-    sleep(0.05)
-
+try:
+    while True:
+        b1 = button1.value()
+        b2 = button2.value()
+        x1_val = x1.read_u16()
+        x2_val = x2.read_u16()
+        x3_val = x3.read_u16()
+        # Joystick 1 X for base
+        if abs(x1_val - center) > dead_zone:
+            motion.move_to("base", int(x1_val * 180 / 65535))
+        # Joystick 1 Y for shoulder
+        if abs(x2_val - center) > dead_zone:
+            motion.move_to("shoulder", int(x2_val * 180 / 65535))
+        # Joystick 2 X for elbow
+        if abs(x3_val - center) > dead_zone:
+            motion.move_to("elbow", int(x3_val * 180 / 65535))
+        # Record if either button is newly pressed
+        if (b1 == 0 and button1_prev == 1) or (b2 == 0 and button2_prev == 1):
+            motion.wait()  # Record where the joints end up, not where they are passing
+            step = (motion.angle("base"), motion.angle("shoulder"), motion.angle("elbow"))
+            recorded_steps.append(step)
+            print("Recorded:", *step)
+            sleep(0.3)  # Debounce
+        # Playback when both buttons are held
+        if b1 == 0 and b2 == 0 and len(recorded_steps) > 0:
+            print("Playing back sequence...")
+            for step in recorded_steps:
+                motion.move_to("base", step[0])
+                motion.move_to("shoulder", step[1])
+                motion.move_to("elbow", step[2])
+                motion.wait()
+                print("Playing back:", *step)
+                sleep(0.5)
+            print("Playback finished.")
+            sleep(1)
+        button1_prev = b1
+        button2_prev = b2
+        sleep(0.05)
+finally:
+    motion.deinit()  # Stop the timer, also after Ctrl+C
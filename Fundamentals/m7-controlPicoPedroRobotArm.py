@@ -2,11 +2,11 @@
 m7-controlPicoPedroRobotArm.py
 
 Demonstrates control of a 4-DOF robot arm (base, shoulder, elbow, gripper) using PWM on a Raspberry Pi Pico.
-Includes both direct angle moves and smooth sweeping motion for each servo.
+Includes both direct angle moves and smooth timer-driven motion, in which the joints of a pose move together.
 """
 
-from machine import Pin, PWM
-from time import sleep
+from machine import Pin, PWM, Timer
+from time import sleep, sleep_ms
 
 # Setup PWM for each servo (base, shoulder, elbow, gripper)
 base = PWM(Pin(2))
@@ -61,71 +61,145 @@ def move_servo(servo, angle):
 # move_servo(gripper, 0)
 # sleep(3)
 
-#################### Smooth Sweeping Motion ###########################
-def angle_to_duty(angle):
-    """
-    Convert an angle (0-180 degrees) to a 16-bit PWM duty cycle.
-    Args:
-        angle (int): Target angle in degrees
-    Returns:
-        int: Duty cycle value for PWM
-    """
-    min_us = 500
-    max_us = 2500
-    us = min_us + (max_us - min_us) * angle // 180
-    return int(us * 65535 / 20000)
+#################### Timer-Driven Servo Motion ###########################
+# A machine.Timer moves every servo a little towards its target on each tick,
+# so joints move at the same time and move_to() returns at once. A new target
+# replaces the old one mid-move. Angles are kept in millidegrees (integers).
+
+def _duty(mdeg):
+    # 500-2500 us pulse over 0-180 degrees, as a 16-bit duty cycle of the 20 ms period
+    return (500 + mdeg * 2000 // 180000) * 65535 // 20000
+
 
-def sweep_to_angle(servo, current_angle, target_angle, step=2, delay=0.02):
+class ServoMotion:
     """
-    Smoothly sweep a servo from current_angle to target_angle.
+    Moves a set of named servos towards their targets at a fixed speed.
+
     Args:
-        servo (PWM): The PWM object for the servo
-        current_angle (int): Starting angle
-        target_angle (int): Target angle
-        step (int): Step size in degrees
-        delay (float): Delay between steps in seconds
-    Returns:
-        int: The final angle reached (target_angle)
+        speed_dps (int): Joint speed in degrees per second
+        period_ms (int): Timer tick period
     """
-    if current_angle < target_angle:
-        for angle in range(current_angle, target_angle + 1, step):
-            servo.duty_u16(angle_to_duty(angle))
-            sleep(delay)
-    else:
-        for angle in range(current_angle, target_angle - 1, -step):
-            servo.duty_u16(angle_to_duty(angle))
-            sleep(delay)
-    return target_angle  # Update current angle
+    def __init__(self, speed_dps=100, period_ms=10):
+        self.period_ms = period_ms
+        self._step = max(1, speed_dps * period_ms)  # deg/s * ms = millidegrees per tick
+        self._index = {}           # Servo name -> index into the lists below
+        self._pwm = []             # PWM object per servo
+        self._pos = []             # Current angle, millidegrees
+        self._target = []          # Target angle, millidegrees
+        self._timer = None
+
+    def add(self, name, pwm, angle):
+        """
+        Register a servo and drive it to its starting angle at once.
+        Args:
+            name (str): Servo name, e.g. "base"
+            pwm (PWM): PWM object, already set to 50 Hz
+            angle (int): Starting angle in degrees
+        """
+        mdeg = int(max(0, min(180, angle)) * 1000)
+        self._index[name] = len(self._pwm)
+        self._pwm.append(pwm)
+        self._pos.append(mdeg)
+        self._target.append(mdeg)
+        pwm.duty_u16(_duty(mdeg))
+
+    def move_to(self, name, angle):
+        """
+        Set a servo's target angle; it starts moving on the next tick.
+        Replaces any target it is still moving towards.
+        Args:
+            name (str): Servo name
+            angle (int): Target angle in degrees, clamped to 0-180
+        """
+        self._target[self._index[name]] = int(max(0, min(180, angle)) * 1000)
+
+    def moving(self):
+        """
+        Check whether any servo has not reached its target yet.
+        Returns:
+            bool: True while moving
+        """
+        return self._pos != self._target
+
+    def wait(self):
+        """
+        Block until every servo has reached its target.
+        """
+        while self.moving():
+            sleep_ms(self.period_ms)
+
+    def start(self):
+        """
+        Start the timer that moves the servos.
+        """
+        if self._timer is None:
+            self._timer = Timer(-1, mode=Timer.PERIODIC, period=self.period_ms, callback=self._tick)
+
+    def deinit(self):
+        """
+        Stop the timer; the servos hold their current angles.
+        """
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+    def _tick(self, _timer):
+        step = self._step
+        for i in range(len(self._pos)):
+            p = self._pos[i]
+            t = self._target[i]
+            if p == t:
+                continue
+            if t > p:
+                p = t if t - p <= step else p + step
+            else:
+                p = t if p - t <= step else p - step
+            self._pos[i] = p
+            self._pwm[i].duty_u16(_duty(p))
+
+# Moves at 100 degrees per second (2 degrees every 20 ms, as before)
+motion = ServoMotion(speed_dps=100)
 
 # Initial angles for each joint
-base_angle = 0
-shoulder_angle = 0
-elbow_angle = 0
-gripper_angle = 0
-sleep(1)
-
-# Move to pick-up pose smoothly
-base_angle = sweep_to_angle(base, base_angle, 90)
-sleep(1)
-shoulder_angle = sweep_to_angle(shoulder, shoulder_angle, 90)
-elbow_angle = sweep_to_angle(elbow, elbow_angle, 0)
-gripper_angle = sweep_to_angle(gripper, gripper_angle, 100)
-sleep(1)
-
-# Lift pose
-shoulder_angle = sweep_to_angle(shoulder, shoulder_angle, 60)
-elbow_angle = sweep_to_angle(elbow, elbow_angle, 10)
-sleep(1)
-
-# Drop pose
-base_angle = sweep_to_angle(base, base_angle, 0)
-sleep(1)
-gripper_angle = sweep_to_angle(gripper, gripper_angle, 0)
-sleep(1)
-
-# Reset to rest
-base_angle = sweep_to_angle(base, base_angle, 0)
-sleep(1)
-shoulder_angle = sweep_to_angle(shoulder, shoulder_angle, 0)
-elbow_angle = sweep_to_angle(elbow, elbow_angle, 0)
-gripper_angle = sweep_to_angle(gripper, gripper_angle, 0)
+motion.add("base", base, 0)
+motion.add("shoulder", shoulder, 0)
+motion.add("elbow", elbow, 0)
+motion.add("gripper", gripper, 0)
+motion.start()
+try:
+    sleep(1)
+
+    # Move to pick-up pose smoothly
+    motion.move_to("base", 90)
+    motion.wait()
+    sleep(1)
+    motion.move_to("shoulder", 90)  # Shoulder, elbow and gripper move together
+    motion.move_to("elbow", 0)
+    motion.move_to("gripper", 100)
+    motion.wait()
+    sleep(1)
+
+    # Lift pose
+    motion.move_to("shoulder", 60)
+    motion.move_to("elbow", 10)
+    motion.wait()
+    sleep(1)
+
+    # Drop pose
+    motion.move_to("base", 0)
+    motion.wait()
+    sleep(1)
+    motion.move_to("gripper", 0)
+    motion.wait()
+    sleep(1)
+
+    # Reset to rest
+    motion.move_to("base", 0)
+    motion.wait()
+    sleep(1)
+    motion.move_to("shoulder", 0)
+    motion.move_to("elbow", 0)
+    motion.move_to("gripper", 0)
+    motion.wait()
+finally:
+    motion.deinit()  # Stop the timer, also after Ctrl+C
@@ -3,6 +3,7 @@ m8-introToJoystickControl.py
 
 Demonstrates how to control a servo motor using the X-axis of an analog joystick on a Raspberry Pi Pico.
 Features real-time response, dead zone filtering, and button press detection.
+The servo is moved by a timer, so the loop keeps reading the joystick while it turns.
 """
 
 # Joystick-Based Base Rotation Control for Robotic Arm
@@ -13,8 +14,8 @@ Features real-time response, dead zone filtering, and button press detection.
 #   using the X-axis of an analog joystick module with real-time response,
 #   a dead zone filter, and a button press detector.
 
-from machine import ADC, Pin, PWM
-from time import sleep
+from machine import ADC, Pin, PWM, Timer
+from time import sleep, sleep_ms
 
 # --- Hardware Setup ---
 x_axis = ADC(26)                          # X-axis of joystick connected to ADC pin GP26
@@ -22,68 +23,140 @@ button = Pin(15, Pin.IN, Pin.PULL_UP)     # Joystick push-button on GP15 with pu
 base_servo = PWM(Pin(2))                  # Servo connected to GP2 (PWM pin)
 base_servo.freq(50)                       # Standard servo PWM frequency (50Hz)
 
-# --- Helper Functions ---
+# --- Helper Functions: timer-driven servo motion ---
+# A machine.Timer moves every servo a little towards its target on each tick,
+# so joints move at the same time and move_to() returns at once. A new target
+# replaces the old one mid-move. Angles are kept in millidegrees (integers).
 
-def angle_to_duty(angle):
-    """
-    Converts a servo angle (0–180 degrees) to a PWM duty cycle.
-    Args:
-        angle (int): Target angle in degrees
-    Returns:
-        int: Duty cycle value for PWM
-    """
-    min_us = 500       # Minimum pulse width in microseconds
-    max_us = 2500      # Maximum pulse width in microseconds
-    us = min_us + (max_us - min_us) * angle // 180
-    return int(us * 65535 / 20000)  # Convert microseconds to 16-bit duty cycle
+def _duty(mdeg):
+    # 500-2500 us pulse over 0-180 degrees, as a 16-bit duty cycle of the 20 ms period
+    return (500 + mdeg * 2000 // 180000) * 65535 // 20000
 
-def move_base(angle):
-    """
-    Moves the base servo to the specified angle.
-    Args:
-        angle (int): Target angle in degrees
-    """
-    base_servo.duty_u16(angle_to_duty(angle))
 
-def sweep_to_angle(current, target):
+class ServoMotion:
     """
-    Smoothly sweeps the servo from current angle to target angle in 1° steps.
+    Moves a set of named servos towards their targets at a fixed speed.
+
     Args:
-        current (int): Current angle
-        target (int): Target angle
-    Returns:
-        int: The final angle reached (target)
+        speed_dps (int): Joint speed in degrees per second
+        period_ms (int): Timer tick period
     """
-    step = 1 if current < target else -1
-    for a in range(current, target + step, step):
-        move_base(a)
-        sleep(0.02)  # Delay for smooth movement
-    return target
+    def __init__(self, speed_dps=100, period_ms=10):
+        self.period_ms = period_ms
+        self._step = max(1, speed_dps * period_ms)  # deg/s * ms = millidegrees per tick
+        self._index = {}           # Servo name -> index into the lists below
+        self._pwm = []             # PWM object per servo
+        self._pos = []             # Current angle, millidegrees
+        self._target = []          # Target angle, millidegrees
+        self._timer = None
+
+    def add(self, name, pwm, angle):
+        """
+        Register a servo and drive it to its starting angle at once.
+        Args:
+            name (str): Servo name, e.g. "base"
+            pwm (PWM): PWM object, already set to 50 Hz
+            angle (int): Starting angle in degrees
+        """
+        mdeg = int(max(0, min(180, angle)) * 1000)
+        self._index[name] = len(self._pwm)
+        self._pwm.append(pwm)
+        self._pos.append(mdeg)
+        self._target.append(mdeg)
+        pwm.duty_u16(_duty(mdeg))
+
+    def move_to(self, name, angle):
+        """
+        Set a servo's target angle; it starts moving on the next tick.
+        Replaces any target it is still moving towards.
+        Args:
+            name (str): Servo name
+            angle (int): Target angle in degrees, clamped to 0-180
+        """
+        self._target[self._index[name]] = int(max(0, min(180, angle)) * 1000)
+
+    def moving(self):
+        """
+        Check whether any servo has not reached its target yet.
+        Returns:
+            bool: True while moving
+        """
+        return self._pos != self._target
+
+    def angle(self, name):
+        """
+        Return a servo's current angle.
+        Args:
+            name (str): Servo name
+        Returns:
+            int: Angle in degrees, rounded
+        """
+        return (self._pos[self._index[name]] + 500) // 1000
+
+    def wait(self):
+        """
+        Block until every servo has reached its target.
+        """
+        while self.moving():
+            sleep_ms(self.period_ms)
+
+    def start(self):
+        """
+        Start the timer that moves the servos.
+        """
+        if self._timer is None:
+            self._timer = Timer(-1, mode=Timer.PERIODIC, period=self.period_ms, callback=self._tick)
+
+    def deinit(self):
+        """
+        Stop the timer; the servos hold their current angles.
+        """
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+    def _tick(self, _timer):
+        step = self._step
+        for i in range(len(self._pos)):
+            p = self._pos[i]
+            t = self._target[i]
+            if p == t:
+                continue
+            if t > p:
+                p = t if t - p <= step else p + step
+            else:
+                p = t if p - t <= step else p - step
+            self._pos[i] = p
+            self._pwm[i].duty_u16(_duty(p))
 
 # --- Initialization ---
 
 center = 32767            # Joystick center value for 16-bit ADC range
 dead_zone = 2000          # Ignore small movements around the center
-current_base_angle = 0    # Start from 0° angle
-move_base(current_base_angle)  # Initialize servo to starting position
+motion = ServoMotion(speed_dps=50)  # 1° every 20 ms, as smooth as before
+motion.add("base", base_servo, 0)   # Initialize servo to starting position (0°)
+motion.start()
 
 # --- Main Loop ---
 
-while True:
-    # Read analog value from X-axis of joystick
-    x_val = x_axis.read_u16()
-    print(f"X: {x_val}")
+try:
+    while True:
+        # Read analog value from X-axis of joystick
+        x_val = x_axis.read_u16()
+        print(f"X: {x_val}")
 
-    # Dead zone filter: Only react to meaningful movement
-    if abs(x_val - center) > dead_zone:
-        angle = int(x_val * 180 / 65535)  # Map joystick value to angle (0–180°)
+        # Dead zone filter: Only react to meaningful movement
+        if abs(x_val - center) > dead_zone:
+            angle = int(x_val * 180 / 65535)  # Map joystick value to angle (0–180°)
 
-        # Sweep base servo to new angle smoothly
-        current_base_angle = sweep_to_angle(current_base_angle, angle)
-        print(f"Base Angle: {current_base_angle}")
+            # Retarget the base servo; it turns towards the new angle while the loop goes on
+            motion.move_to("base", angle)
+            print(f"Base Angle: {motion.angle('base')} -> {angle}")
 
-    # Detect joystick button press
-    if button.value() == 0:
-        print("Joystick button pressed!")
+        # Detect joystick button press
+        if button.value() == 0:
+            print("Joystick button pressed!")
 
-    sleep(0.05)  # Short delay for stability
+        sleep(0.05)  # Short delay for stability
+finally:
+    motion.deinit()  # Stop the timer, also after Ctrl+C
@@ -3,10 +3,11 @@ m9-dualJoystickControllerForManualControl.py
 
 Demonstrates manual control of a 4-DOF robotic arm using two analog joysticks and buttons on a Raspberry Pi Pico.
 Each joystick axis controls a different servo, and buttons toggle modes and the gripper.
+A timer moves the servos, so all joints follow their joysticks at the same time.
 """
 
-from machine import ADC, Pin, PWM
-from time import sleep
+from machine import ADC, Pin, PWM, Timer
+from time import sleep, sleep_ms
 
 # === Analog inputs from 3 ADC-capable pins ===
 x1 = ADC(26)  # Joystick 1 X → Base
@@ -29,56 +30,120 @@ gripper_servo = PWM(Pin(5))
 for servo in (base_servo, shoulder_servo, elbow_servo, gripper_servo):
     servo.freq(50)
 
-def angle_to_duty(angle):
-    """
-    Convert an angle (0-180 degrees) to a 16-bit PWM duty cycle.
-    Args:
-        angle (int): Target angle in degrees
-    Returns:
-        int: Duty cycle value for PWM
-    """
-    min_us = 500
-    max_us = 2500
-    us = min_us + (max_us - min_us) * angle // 180
-    return int(us * 65535 / 20000)
+#################### Timer-Driven Servo Motion ###########################
+# A machine.Timer moves every servo a little towards its target on each tick,
+# so joints move at the same time and move_to() returns at once. A new target
+# replaces the old one mid-move. Angles are kept in millidegrees (integers).
 
-def move_servo(servo, angle):
-    """Move a servo to the given angle."""
-    servo.duty_u16(angle_to_duty(angle))
+def _duty(mdeg):
+    # 500-2500 us pulse over 0-180 degrees, as a 16-bit duty cycle of the 20 ms period
+    return (500 + mdeg * 2000 // 180000) * 65535 // 20000
 
-def sweep_to_angle(servo, current_angle, target_angle, delay=0.01):
+
+class ServoMotion:
     """
-    Smoothly sweep a servo from current_angle to target_angle.
+    Moves a set of named servos towards their targets at a fixed speed.
+
     Args:
-        servo (PWM): The PWM object for the servo
-        current_angle (int): Starting angle
-        target_angle (int): Target angle
-        delay (float): Delay between steps in seconds
-    Returns:
-        int: The final angle reached (target_angle)
+        speed_dps (int): Joint speed in degrees per second
+        period_ms (int): Timer tick period
     """
-    step = 1 if current_angle < target_angle else -1
-    for angle in range(current_angle, target_angle + step, step):
-        move_servo(servo, angle)
-        sleep(delay)
-    return target_angle
+    def __init__(self, speed_dps=100, period_ms=10):
+        self.period_ms = period_ms
+        self._step = max(1, speed_dps * period_ms)  # deg/s * ms = millidegrees per tick
+        self._index = {}           # Servo name -> index into the lists below
+        self._pwm = []             # PWM object per servo
+        self._pos = []             # Current angle, millidegrees
+        self._target = []          # Target angle, millidegrees
+        self._timer = None
+
+    def add(self, name, pwm, angle):
+        """
+        Register a servo and drive it to its starting angle at once.
+        Args:
+            name (str): Servo name, e.g. "base"
+            pwm (PWM): PWM object, already set to 50 Hz
+            angle (int): Starting angle in degrees
+        """
+        mdeg = int(max(0, min(180, angle)) * 1000)
+        self._index[name] = len(self._pwm)
+        self._pwm.append(pwm)
+        self._pos.append(mdeg)
+        self._target.append(mdeg)
+        pwm.duty_u16(_duty(mdeg))
+
+    def move_to(self, name, angle):
+        """
+        Set a servo's target angle; it starts moving on the next tick.
+        Replaces any target it is still moving towards.
+        Args:
+            name (str): Servo name
+            angle (int): Target angle in degrees, clamped to 0-180
+        """
+        self._target[self._index[name]] = int(max(0, min(180, angle)) * 1000)
+
+    def moving(self):
+        """
+        Check whether any servo has not reached its target yet.
+        Returns:
+            bool: True while moving
+        """
+        return self._pos != self._target
+
+    def wait(self):
+        """
+        Block until every servo has reached its target.
+        """
+        while self.moving():
+            sleep_ms(self.period_ms)
+
+    def start(self):
+        """
+        Start the timer that moves the servos.
+        """
+        if self._timer is None:
+            self._timer = Timer(-1, mode=Timer.PERIODIC, period=self.period_ms, callback=self._tick)
+
+    def deinit(self):
+        """
+        Stop the timer; the servos hold their current angles.
+        """
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+    def _tick(self, _timer):
+        step = self._step
+        for i in range(len(self._pos)):
+            p = self._pos[i]
+            t = self._target[i]
+            if p == t:
+                continue
+            if t > p:
+                p = t if t - p <= step else p + step
+            else:
+                p = t if p - t <= step else p - step
+            self._pos[i] = p
+            self._pwm[i].duty_u16(_duty(p))
 
 def reset_all_servos():
-    """Set all servos to initial neutral positions."""
-    global base_angle, shoulder_angle, elbow_angle
-    base_angle = sweep_to_angle(base_servo, base_angle, 0)
-    shoulder_angle = sweep_to_angle(shoulder_servo, shoulder_angle, 0)
-    elbow_angle = sweep_to_angle(elbow_servo, elbow_angle, 0)
-    sweep_to_angle(gripper_servo, 0 if gripper_open else 100, 0 if gripper_open else 100)
+    """Send all servos back to their initial neutral positions, together."""
+    motion.move_to("base", 0)
+    motion.move_to("shoulder", 0)
+    motion.move_to("elbow", 0)
+    motion.move_to("gripper", 0 if gripper_open else 100)
 
 # === Dead zone for analog input ===
 center = 32767
 dead_zone = 2000
 
-# === Track current angles and gripper state ===
-base_angle = 0
-shoulder_angle = 0
-elbow_angle = 0
+# === Servo motion (1 degree every 10 ms) and gripper state ===
+motion = ServoMotion(speed_dps=100)
+motion.add("base", base_servo, 0)
+motion.add("shoulder", shoulder_servo, 0)
+motion.add("elbow", elbow_servo, 0)
+motion.add("gripper", gripper_servo, 0)
+motion.start()
 gripper_open = True
 button1_flag = False
 button1_last = 1
@@ -88,38 +153,37 @@ button2_flag = False
 reset_all_servos()
 
 # === Main control loop ===
-while True:
-    # Toggle button1 flag on rising edge
-    if button1.value() == 0 and button1_last == 1:
-        button1_flag = not button1_flag
-        led.value(button1_flag)  # LED indicates control mode ON/OFF
-        print("Button 1 pressed. Toggle mode:", button1_flag)
-        reset_all_servos()  # Reset servos every toggle
-        sleep(0.2)  # Debounce delay
-    button1_last = button1.value()
-    if button1_flag:
-        x1_val = x1.read_u16()
-        y1_val = y1.read_u16()
-        x2_val = x2.read_u16()
-        print(f"x1 value : {x1_val} -- y1 value : {y1_val} -- x2 value : {x2_val}")
-        # === Base control ===
-        if abs(x1_val - center) > dead_zone:
-            target = int(x1_val * 180 / 65535)
-            base_angle = sweep_to_angle(base_servo, base_angle, target)
-        # === Shoulder control ===
-        if abs(y1_val - center) > dead_zone:
-            target = int(y1_val * 180 / 65535)
-            shoulder_angle = sweep_to_angle(shoulder_servo, shoulder_angle, target)
-        # === Elbow control ===
-        if abs(x2_val - center) > dead_zone:
-            target = int(x2_val * 180 / 65535)
-            elbow_angle = sweep_to_angle(elbow_servo, elbow_angle, target)
-    # === Gripper toggle with button 2 ===
-    if button2.value() == 0 and not button2_flag:
-        gripper_open = not gripper_open
-        angle = 0 if gripper_open else 100
-        sweep_to_angle(gripper_servo, 0 if not gripper_open else 100, angle)
-        button2_flag = True
-    elif button2.value() == 1:
-        button2_flag = False
-    sleep(0.05)
+try:
+    while True:
+        # Toggle button1 flag on rising edge
+        if button1.value() == 0 and button1_last == 1:
+            button1_flag = not button1_flag
+            led.value(button1_flag)  # LED indicates control mode ON/OFF
+            print("Button 1 pressed. Toggle mode:", button1_flag)
+            reset_all_servos()  # Reset servos every toggle
+            sleep(0.2)  # Debounce delay
+        button1_last = button1.value()
+        if button1_flag:
+            x1_val = x1.read_u16()
+            y1_val = y1.read_u16()
+            x2_val = x2.read_u16()
+            print(f"x1 value : {x1_val} -- y1 value : {y1_val} -- x2 value : {x2_val}")
+            # === Base control ===
+            if abs(x1_val - center) > dead_zone:
+                motion.move_to("base", int(x1_val * 180 / 65535))
+            # === Shoulder control ===
+            if abs(y1_val - center) > dead_zone:
+                motion.move_to("shoulder", int(y1_val * 180 / 65535))
+            # === Elbow control ===
+            if abs(x2_val - center) > dead_zone:
+                motion.move_to("elbow", int(x2_val * 180 / 65535))
+        # === Gripper toggle with button 2 ===
+        if button2.value() == 0 and not button2_flag:
+            gripper_open = not gripper_open
+            motion.move_to("gripper", 0 if gripper_open else 100)
+            button2_flag = True
+        elif button2.value() == 1:
+            button2_flag = False
+        sleep(0.05)
+finally:
+    motion.deinit()  # Stop the timer, also after Ctrl+C
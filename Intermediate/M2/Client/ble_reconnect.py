@@ -0,0 +1,117 @@
+"""
+ble_reconnect.py
+
+Implements Reconnector, the bookkeeping behind automatic reconnects.
+When a link drops the first attempt is due at once; every failed attempt
+doubles the wait before the next one, up to a cap. The client drives it from
+its poll() method, so no timer or thread is needed.
+"""
+
+import time
+
+
+class Reconnector:
+    """
+    Reconnect schedule and statistics for one robot.
+
+    Args:
+        base_ms (int): Wait after the first failed attempt
+        max_ms (int): Longest wait between attempts
+    """
+    def __init__(self, base_ms=100, max_ms=5000):
+        self.base_ms = base_ms
+        self.max_ms = max_ms
+        self.enabled = False       # Set while the user wants this robot connected
+        self._active = False       # Link lost and not yet restored
+        self._waiting = False      # An attempt is in progress
+        self._lost_at = 0
+        self._next_at = 0
+        self._failures = 0         # Failed attempts since the link was lost
+
+        # Statistics
+        self.attempts = 0          # Reconnect attempts started
+        self.reconnects = 0        # Links restored
+        self.last_reconnect_ms = None   # Link loss -> connected, for the last reconnect
+        self.last_failure = None   # Reason the last attempt (or link) failed
+
+    def lost(self, reason):
+        """
+        Record a dropped link and make the first attempt due straight away.
+        Args:
+            reason (str): Why the link went down
+        """
+        if not self.enabled:
+            return
+        self.last_failure = reason
+        self._active = True
+        self._waiting = False
+        self._failures = 0
+        self._lost_at = time.ticks_ms()
+        self._next_at = self._lost_at
+
+    def due(self):
+        """
+        Check whether the next attempt should start now.
+        Returns:
+            bool: True if an attempt is due
+        """
+        return self._active and not self._waiting and time.ticks_diff(time.ticks_ms(), self._next_at) >= 0
+
+    def attempt(self):
+        """
+        Mark the start of an attempt.
+        """
+        self._waiting = True
+        self.attempts += 1
+
+    def failed(self, reason):
+        """
+        Record a failed attempt and schedule the next one with capped exponential backoff.
+        Args:
+            reason (str): Why the attempt failed
+        """
+        self.last_failure = reason
+        if not self._active:
+            return
+        self._waiting = False
+        delay = min(self.max_ms, self.base_ms << min(self._failures, 16))
+        self._failures += 1
+        self._next_at = time.ticks_add(time.ticks_ms(), delay)
+
+    def connected(self):
+        """
+        Record a successful connection, ending any reconnect in progress.
+        Returns:
+            int or None: Milliseconds since the link was lost, or None if this was
+                not a reconnect
+        """
+        elapsed = None
+        if self._active:
+            elapsed = time.ticks_diff(time.ticks_ms(), self._lost_at)
+            self.last_reconnect_ms = elapsed
+            self.reconnects += 1
+        self._active = False
+        self._waiting = False
+        return elapsed
+
+    def cancel(self):
+        """
+        Stop reconnecting, e.g. when the user disconnects on purpose.
+        """
+        self.enabled = False
+        self._active = False
+        self._waiting = False
+
+    def stats(self):
+        """
+        Return reconnect counters.
+        Returns:
+            dict: reconnecting, attempts, reconnects, last_reconnect_ms, last_failure
+        """
+        return {
+            "reconnecting": self._active,
+            "attempts": self.attempts,
+            "reconnects": self.reconnects,
+            "last_reconnect_ms": self.last_reconnect_ms,
+            "last_failure": self.last_failure,
+        }
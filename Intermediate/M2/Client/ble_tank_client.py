@@ -6,8 +6,12 @@ Handles BLE scanning, connection, service/characteristic discovery, and sending
 """
 
 import bluetooth
-import time
 from micropython import const
+from ble_reconnect import Reconnector
+from ble_rx_queue import RxQueue
+from ble_scan import DeviceCache, has_uuid128, name_equals
+from ble_write_queue import WriteQueue
+from telemetry import unpack as unpack_telemetry
 
 # BLE IRQ event constants
 _IRQ_SCAN_RESULT = const(5)
@@ -25,26 +29,64 @@ _IRQ_GATTC_NOTIFY = const(18)
 _UART_SERVICE_UUID = bluetooth.UUID("6E400001-B5A3-F393-E0A9-E50E24DCCA9E")
 _UART_RX_UUID = bluetooth.UUID("6E400002-B5A3-F393-E0A9-E50E24DCCA9E")
 _UART_TX_CHAR = bluetooth.UUID("6E400003-B5A3-F393-E0A9-E50E24DCCA9E")
+_TELEMETRY_UUID = bluetooth.UUID("6E400004-B5A3-F393-E0A9-E50E24DCCA9E")
+
+# conn_handle reported by _IRQ_PERIPHERAL_DISCONNECT when gap_connect times out
+_CONN_FAILED = const(0xFFFF)
+
+# Notification queue: tags say which characteristic each one came from. Slots
+# hold a default-MTU payload; this client never negotiates a larger MTU.
+_NOTIFY_RX = const(0)
+_NOTIFY_TELEMETRY = const(1)
+_NOTIFY_SLOTS = const(8)
+_NOTIFY_SLOT_SIZE = const(20)
+
+# Movement commands share one write-queue key: only the latest unsent one is kept
+_DRIVE_COMMANDS = "FBLRS"
 
 class BLETankClient:
     """
     BLE client for connecting to and controlling a PicoTank robot.
     Handles scanning, connecting, service/characteristic discovery, and sending commands.
     """
-    def __init__(self):
+    def __init__(self, write_with_response=True, auto_reconnect=True):
         """
         Initialize the BLETankClient instance.
         Sets up BLE, IRQ, and initial connection parameters.
+        
+        Args:
+            write_with_response (bool): Acknowledge every command write (False trades
+                delivery confirmation for throughput)
+            auto_reconnect (bool): Reconnect on its own when the link drops
         """
         self.ble = bluetooth.BLE()
         self.ble.active(True)
         self.conn_handle = None
         self.tx_handle = None
+        self.rx_handle = None
+        self.telemetry_handle = None
         self.connected = False
         self.ble.irq(self._irq)
         self.target_name = "PicoTank"
+        # Raw bytes compared against scan results in the IRQ
+        self._target_name_bytes = self.target_name.encode()
+        self._target_uuid = bytes(_UART_SERVICE_UUID)
         self._found_device = False
-        self.on_rx = None
+        self.devices = DeviceCache()  # Where each tank was last seen
+        self._direct = None  # Address of a connect attempt made without scanning
+        self._scanning = False  # A scan for the tank is running
+        self._gap_connecting = False  # gap_connect was called and has not finished
+        self.on_rx = None  # Callback taking the message (str); runs from poll()
+        self.on_telemetry = None  # Callback taking a decoded telemetry dict; runs from poll()
+        self._notifications = RxQueue(_NOTIFY_SLOTS, _NOTIFY_SLOT_SIZE)
+        self._writes = WriteQueue(self.ble, with_response=write_with_response)
+        self.auto_reconnect = auto_reconnect
+        self._reconnect = Reconnector()  # Driven from poll() after the link drops
+
+    @property
+    def connecting(self):
+        """True while a scan or a connect attempt (user or automatic) is in progress."""
+        return self._scanning or self._gap_connecting
     
     def _irq(self, event, data):
         """
@@ -56,25 +98,60 @@ class BLETankClient:
             data (tuple): The event data
         """
         if event == _IRQ_SCAN_RESULT:
-            addr_type, addr, _, _, adv_data = data
-            print("Raw adv_data:", adv_data)  # Debug print to show raw advertisement data
-            name = self.decode_name(adv_data)
-            print("🔍 Found device:", repr(name))
-            if name == self.target_name:
+            addr_type, addr, _, rssi, adv_data = data
+            if self._found_device:
+                return  # Results still queued after the scan was stopped
+            # Matched in place, so other devices cost no allocation. The tank
+            # advertises its service UUID; the name only arrives in the scan response.
+            if has_uuid128(adv_data, self._target_uuid) or name_equals(adv_data, self._target_name_bytes):
                 print("Found target, connecting...")
+                addr = bytes(addr)
+                self.devices.seen(addr, addr_type, rssi, self.target_name)
+                self._found_device = True
+                self._gap_connecting = True
                 self.ble.gap_connect(addr_type, addr)
                 self.ble.gap_scan(None)
         elif event == _IRQ_SCAN_DONE:
             print("Scan complete.")
+            self._scanning = False
+            if not self._found_device:
+                self._reconnect.failed("not found")
         elif event == _IRQ_PERIPHERAL_CONNECT:
             conn_handle, _, _ = data
             print("Connected.")
+            self._direct = None
+            self._gap_connecting = False
+            elapsed = self._reconnect.connected()
+            if elapsed is not None:
+                print(f"Reconnected {elapsed} ms after the link was lost.")
             self.conn_handle = conn_handle
             self.connected = True
             self.ble.gattc_discover_services(conn_handle)
         elif event == _IRQ_PERIPHERAL_DISCONNECT:
+            conn_handle, _, _ = data
+            if conn_handle == _CONN_FAILED:
+                self._gap_connecting = False
+            if conn_handle == _CONN_FAILED and self._direct is not None:
+                # The tank is no longer where it was last seen: scan for it
+                print("Known tank not reachable.")
+                self.devices.forget(self._direct)
+                self._direct = None
+                self._scan()
+                return
+            if conn_handle == _CONN_FAILED:
+                print("Connection attempt failed.")
+                self._reconnect.failed("connect timeout")
+                return
             print("Disconnected.")
             self.connected = False
+            self.conn_handle = None
+            self.tx_handle = None
+            self.rx_handle = None
+            self.telemetry_handle = None
+            self._writes.reset()
+            # poll() starts the first attempt: a directed connect to the address
+            # the tank was just on, then a scan if that fails
+            self._reconnect.lost("link lost")
         elif event == _IRQ_GATTC_SERVICE_RESULT:
             conn_handle, start, end, uuid = data
             if uuid == _UART_SERVICE_UUID:
@@ -86,51 +163,143 @@ class BLETankClient:
             conn_handle, def_handle, value_handle, properties, uuid = data
             if uuid == _UART_RX_UUID:
                 self.tx_handle = value_handle
+            elif uuid == _UART_TX_CHAR:
+                self.rx_handle = value_handle
+            elif uuid == _TELEMETRY_UUID:
+                self.telemetry_handle = value_handle
         elif event == _IRQ_GATTC_NOTIFY:
+            # Only copied here; poll() runs the callbacks, which may redraw the LCD
             conn_handle, value_handle, notify_data = data
-            if self.on_rx:
-                self.on_rx(bytes(notify_data).decode("utf-8"))
+            if value_handle == self.telemetry_handle:
+                self._notifications.put(notify_data, _NOTIFY_TELEMETRY)
+            elif value_handle == self.rx_handle:
+                self._notifications.put(notify_data, _NOTIFY_RX)
         elif event == _IRQ_GATTC_CHARACTERISTIC_DONE:
             print("Ready to send BLE commands.")
+            if self.tx_handle:
+                self._writes.attach(self.conn_handle, self.tx_handle)
+        elif event == _IRQ_GATTC_WRITE_DONE:
+            conn_handle, value_handle, status = data
+            self._writes.write_done(value_handle, status)
     
-    def decode_name(self, adv_data):
+    def connect(self):
         """
-        Decode the device name from BLE advertisement data.
-        
-        Args:
-            adv_data (bytes): Advertisement data
-            
-        Returns:
-            str or None: Decoded device name, or None if not found
-        """
-        try:
-            i = 0
-            adv_data = bytes(adv_data)  # convert memoryview to bytes first
-            while i < len(adv_data):
-                length = adv_data[i]
-                if length == 0:
-                    break
-                type_ = adv_data[i + 1]
-                if type_ == 0x09:  # Complete Local Name
-                    return adv_data[i + 2:i + 1 + length].decode("utf-8")
-                i += 1 + length
-        except Exception as e:
-            print("decode_name error:", e)
-        return None
+        Connect to the target device: straight away if it has been seen before,
+        otherwise after scanning for it. Does nothing while connected or while
+        an attempt is already in progress.
+        """
+        if self.connected or self.connecting:
+            return
+        self._reconnect.enabled = self.auto_reconnect
+        self._start_connect()
 
-    def connect(self):
+    def _start_connect(self):
+        """
+        Make one connection attempt: directed if the tank's address is known, else a scan.
         """
-        Start scanning for BLE devices and connect to the target device.
+        known = self.devices.find(self.target_name)
+        if known:
+            print("Connecting to known tank...")
+            self._direct = known[1]
+            self._gap_connecting = True
+            self.ble.gap_connect(*known)
+        else:
+            self._scan()
+
+    def _scan(self):
+        """
+        Start scanning for BLE devices; the IRQ handler connects to the target device.
+        Matches the tank's service UUID, or its name for servers that only advertise a name.
         """
         print("Scanning...")
-        self.ble.gap_scan(5000, 30000, 30000)
+        self._found_device = False
+        self._scanning = True
+        # Active scanning requests the scan response, which carries the name
+        self.ble.gap_scan(5000, 30000, 30000, True)
 
     def send_command(self, cmd):
         """
-        Send a command string to the connected BLE device.
+        Queue a command string for the connected BLE device and return immediately.
+        A newer movement command replaces one that has not been sent yet.
         
         Args:
             cmd (str): Command to send
         """
         if self.connected and self.tx_handle:
-            self.ble.gattc_write(self.conn_handle, self.tx_handle, cmd.encode(), 1)
+            key = "drive" if len(cmd) == 1 and cmd in _DRIVE_COMMANDS else None
+            self._writes.put(cmd.encode(), key)
+
+    def disconnect(self, flush_ms=500):
+        """
+        Disconnect from the tank on purpose; no reconnect is attempted.
+        Queued commands (such as a final stop) are sent first, waiting up to
+        flush_ms for them.
+        
+        Args:
+            flush_ms (int): Longest wait for queued writes
+        """
+        self._reconnect.cancel()
+        if self.connected:
+            if not self._writes.flush(flush_ms):
+                print("Queued commands not sent before disconnecting.")
+            self.ble.gap_disconnect(self.conn_handle)
+
+    def poll(self):
+        """
+        Dispatch queued notifications, retry queued writes the stack could not
+        take yet and start a reconnect attempt when one is due.
+        Call this from the main loop.
+        """
+        self._dispatch_notifications()
+        self._writes.poll()
+        if not self.connecting and self._reconnect.due():
+            self._reconnect.attempt()
+            print(f"Reconnecting (attempt {self._reconnect.attempts})...")
+            self._start_connect()
+
+    def _dispatch_notifications(self):
+        """
+        Pass every queued notification to its callback.
+        """
+        queue = self._notifications
+        while True:
+            data = queue.peek()
+            if data is None:
+                break
+            try:
+                if queue.tag() == _NOTIFY_TELEMETRY:
+                    if self.on_telemetry:
+                        self.on_telemetry(unpack_telemetry(data))
+                elif self.on_rx:
+                    self.on_rx(bytes(data).decode("utf-8"))
+            except ValueError as e:
+                print("Dropped invalid notification:", e)
+            finally:
+                queue.pop()
+
+    def notify_stats(self):
+        """
+        Return notification queue counters.
+        
+        Returns:
+            dict: See RxQueue.stats()
+        """
+        return self._notifications.stats()
+
+    def reconnect_stats(self):
+        """
+        Return automatic reconnect counters.
+        
+        Returns:
+            dict: See Reconnector.stats()
+        """
+        return self._reconnect.stats()
+
+    def write_stats(self):
+        """
+        Return outbound write queue counters.
+        
+        Returns:
+            dict: See WriteQueue.stats()
+        """
+        return self._writes.stats()
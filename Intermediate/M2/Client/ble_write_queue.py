@@ -0,0 +1,187 @@
+"""
+ble_write_queue.py
+
+Implements WriteQueue, a non-blocking outbound write queue for BLE clients.
+Writes return immediately. With write-with-response, one write is in flight
+at a time and _IRQ_GATTC_WRITE_DONE releases the next. With
+write-without-response, writes go straight to the stack until its buffers
+fill. Commands sharing a key keep only their latest unsent value.
+
+_IRQ_GATTC_WRITE_DONE pumps the queue from the BLE IRQ while the main loop
+may be pumping it too. A write claims the queue by taking its entry and
+setting _in_flight with IRQs disabled, before gattc_write() is called, so
+the two can never send the same entry or two writes at once.
+"""
+
+import machine
+import time
+
+
+class WriteQueue:
+    """
+    Flow-controlled writer for one remote characteristic.
+
+    Args:
+        ble: bluetooth.BLE instance
+        max_pending (int): Writes kept while the link is busy; the oldest is dropped beyond this
+        with_response (bool): Use write-with-response (True) or write-without-response (False)
+        timeout_ms (int): Time to wait for a write acknowledgement before sending the next write
+    """
+    def __init__(self, ble, max_pending=16, with_response=True, timeout_ms=1000):
+        self._ble = ble
+        self.max_pending = max_pending
+        self.with_response = with_response
+        self.timeout_ms = timeout_ms
+        self._conn = None
+        self._handle = None
+        self._pending = []         # [key, payload] in send order
+        self._in_flight = False    # A write is being handed to the stack or awaits its ack
+        self._sent_at = 0          # time.ticks_ms() of the write in flight
+
+        # Statistics
+        self.sent = 0              # Writes handed to the stack
+        self.collapsed = 0         # Unsent writes replaced by a newer value with the same key
+        self.dropped = 0           # Writes discarded because the queue was full
+        self.busy = 0              # Write attempts refused because the stack was busy
+        self.timeouts = 0          # Acknowledgements that never arrived
+        self.errors = 0            # Writes acknowledged with an error status
+
+    def attach(self, conn_handle, value_handle):
+        """
+        Start writing to a characteristic once discovery has found it.
+        Args:
+            conn_handle (int): Connection handle
+            value_handle (int): Handle of the characteristic to write
+        """
+        self._conn = conn_handle
+        self._handle = value_handle
+        self._in_flight = False
+        self._pump()
+
+    def detach(self):
+        """
+        Stop writing until attach() is called again. Queued writes are kept.
+        """
+        self._handle = None
+        self._in_flight = False
+
+    def reset(self):
+        """
+        Forget the connection and discard every unsent write.
+        """
+        self._conn = None
+        self._handle = None
+        self._pending = []
+        self._in_flight = False
+
+    def put(self, payload, key=None):
+        """
+        Queue a write and start sending it if the link is free.
+        Args:
+            payload (bytes): Data to write
+            key (str): Writes with the same key replace each other while unsent;
+                None always queues a new write
+        """
+        if key is not None:
+            for entry in self._pending:
+                if entry[0] == key:
+                    entry[1] = payload
+                    self.collapsed += 1
+                    self._pump()
+                    return
+        if len(self._pending) >= self.max_pending:
+            self._pending.pop(0)
+            self.dropped += 1
+        self._pending.append([key, payload])
+        self._pump()
+
+    def write_done(self, value_handle, status):
+        """
+        Handle _IRQ_GATTC_WRITE_DONE and send the next queued write.
+        Args:
+            value_handle (int): Handle the write completed on
+            status (int): 0 on success
+        """
+        if value_handle != self._handle or not self.with_response:
+            return
+        if status != 0:
+            self.errors += 1
+        self._in_flight = False
+        self._pump()
+
+    def poll(self):
+        """
+        Retry writes the stack refused and recover from lost acknowledgements.
+        Call this regularly from the main loop.
+        """
+        if self._in_flight and time.ticks_diff(time.ticks_ms(), self._sent_at) > self.timeout_ms:
+            self.timeouts += 1
+            self._in_flight = False
+        self._pump()
+
+    def flush(self, timeout_ms=500):
+        """
+        Wait until every queued write has been handed to the stack and the last
+        one acknowledged, e.g. so a final stop command is sent before disconnecting.
+        Args:
+            timeout_ms (int): Give up after this long
+        Returns:
+            bool: True if the queue emptied in time
+        """
+        deadline = time.ticks_add(time.ticks_ms(), timeout_ms)
+        while self._pending or self._in_flight:
+            if self._handle is None or time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                return False
+            self.poll()
+            time.sleep_ms(1)
+        return True
+
+    def pending(self):
+        """
+        Return the number of writes not yet handed to the stack.
+        Returns:
+            int: Queue depth
+        """
+        return len(self._pending)
+
+    def _pump(self):
+        mode = 1 if self.with_response else 0
+        while True:
+            # Claim the next write; an IRQ arriving after this sees _in_flight and leaves it
+            irq_state = machine.disable_irq()
+            if self._in_flight or not self._pending or self._handle is None:
+                machine.enable_irq(irq_state)
+                return
+            entry = self._pending.pop(0)
+            self._in_flight = True
+            self._sent_at = time.ticks_ms()
+            machine.enable_irq(irq_state)
+
+            try:
+                self._ble.gattc_write(self._conn, self._handle, entry[1], mode)
+            except OSError:
+                irq_state = machine.disable_irq()
+                self._pending.insert(0, entry)
+                self._in_flight = False
+                machine.enable_irq(irq_state)
+                self.busy += 1
+                return  # Stack buffers full; poll() tries again
+            self.sent += 1
+            if not self.with_response:
+                self._in_flight = False  # Nothing to wait for
+
+    def stats(self):
+        """
+        Return write counters.
+        Returns:
+            dict: pending, sent, collapsed, dropped, busy, timeouts, errors
+        """
+        return {
+            "pending": len(self._pending),
+            "sent": self.sent,
+            "collapsed": self.collapsed,
+            "dropped": self.dropped,
+            "busy": self.busy,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+        }
@@ -0,0 +1,103 @@
+"""
+lcd_sprites.py
+
+Implements Sprite, a small packed bitmap (1, 2 or 4 bits per pixel) that is
+drawn on an LCDDisplay with a single framebuf blit instead of one call per
+line, rectangle or character. Each pixel value indexes a short color list, so
+one bitmap serves several states (an arrow highlighted or not) and works with
+every LCDDisplay format. Value 0 can be transparent.
+
+icons.py holds the sprites the GUIs use; make_icons.py generates it on a PC.
+"""
+
+import framebuf
+
+_FORMATS = {1: framebuf.MONO_HLSB, 2: framebuf.GS2_HMSB, 4: framebuf.GS4_HMSB}
+
+
+class Sprite:
+    """
+    A packed bitmap with a default color for every pixel value.
+
+    Args:
+        width, height (int): Size in pixels
+        bits (int): Bits per pixel: 1 (MONO_HLSB), 2 (GS2_HMSB) or 4 (GS4_HMSB)
+        data (bytes): Packed rows in that framebuf layout
+        colors (tuple): Default color per pixel value, as LCDDisplay color names
+            ("red", "white", ...); None makes the value transparent
+    """
+    def __init__(self, width, height, bits, data, colors):
+        self.width = width
+        self.height = height
+        self.bits = bits
+        self.colors = colors
+        self._data = data
+        self._fb = None            # FrameBuffer over a RAM copy of data, made on first draw
+        self._palettes = {}        # colors (None for the default) -> (palette, key)
+        self._fmt = None           # Display format the palettes are in
+
+    def _source(self):
+        if self._fb is None:
+            # framebuf needs a writable buffer; the bytes object stays in flash
+            self._fb = framebuf.FrameBuffer(bytearray(self._data), self.width, self.height,
+                                            _FORMATS[self.bits])
+        return self._fb
+
+    def palette(self, lcd, colors=None):
+        """
+        Return the blit palette that maps pixel values to display colors.
+        Palettes are cached per color tuple, so pass the same tuple objects
+        (or equal ones) every frame.
+        Args:
+            lcd (LCDDisplay): Display the sprite is drawn on; palettes are in its format
+            colors (tuple): Display colors per pixel value, e.g. (None, lcd.red)
+                (default: the sprite's own colors)
+        Returns:
+            tuple: (palette FrameBuffer, key color for blit, -1 if nothing is transparent)
+        """
+        if lcd.fmt != self._fmt:
+            self._palettes = {}
+            self._fmt = lcd.fmt
+        entry = self._palettes.get(colors)
+        if entry is None:
+            values = colors
+            if values is None:
+                values = tuple(None if name is None else getattr(lcd, name) for name in self.colors)
+            key = -1
+            if None in values:
+                # Transparent values map to a color no other value uses, which blit skips
+                key = 0
+                while key in values:
+                    key += 1
+            palette = framebuf.FrameBuffer(bytearray(2 * len(values)), len(values), 1, lcd.fmt)
+            for i, color in enumerate(values):
+                palette.pixel(i, 0, key if color is None else color)
+            entry = (palette, key)
+            self._palettes[colors] = entry
+        return entry
+
+    def draw(self, lcd, x, y, colors=None):
+        """
+        Draw the sprite into the frame buffer; the next show() sends its rectangle.
+        Args:
+            lcd (LCDDisplay): Display to draw on
+            x, y (int): Top-left corner
+            colors (tuple): Display colors per pixel value (default: the sprite's own)
+        """
+        palette, key = self.palette(lcd, colors)
+        lcd.mark(x, y, self.width, self.height)
+        # The base blit: LCDDisplay.blit() cannot tell the source size and marks everything
+        framebuf.FrameBuffer.blit(lcd, self._source(), x, y, key, palette)
+
+    def push(self, lcd, x, y, colors=None):
+        """
+        Draw the sprite and send its rectangle to the panel at once, expanding
+        palette indices on the way, without waiting for show().
+        Args:
+            lcd (LCDDisplay): Display to draw on
+            x, y (int): Top-left corner
+            colors (tuple): Display colors per pixel value (default: the sprite's own)
+        """
+        palette, key = self.palette(lcd, colors)
+        framebuf.FrameBuffer.blit(lcd, self._source(), x, y, key, palette)
+        lcd.show_rect(x, y, self.width, self.height)
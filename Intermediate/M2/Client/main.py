@@ -7,6 +7,9 @@ Handles BLE connection, command sending, and obstacle status display.
 
 from machine import Pin
 from lcd_display import LCDDisplay
+from lcd_widgets import Icon, Indicator, Label, Screen
+from lcd_log import LogPane
+import icons
 from ble_tank_client import BLETankClient
 import time
 
@@ -25,17 +28,20 @@ right = Pin(20, Pin.IN, Pin.PULL_UP)
 ctrl = Pin(3, Pin.IN, Pin.PULL_UP)  # Center = Stop
 
 obstacle_status = "Unknown"
+gui_dirty = False  # Set when the screen needs a redraw at the end of the loop
+log = None         # Event log at the bottom of the screen, created by draw_static()
 
 def on_rx(msg):
     """
-    BLE receive callback for obstacle status updates.
-    Updates the obstacle_status and refreshes the GUI.
+    BLE receive callback for obstacle status updates, run from ble.poll().
+    Updates the obstacle_status; the GUI is redrawn once per loop however many arrive.
     """
-    global obstacle_status
+    global obstacle_status, gui_dirty
     print("📩 Received from tank:", msg)
-    if msg in ["Obstacle Detected", "Path Clear"]:
+    if msg in ["Obstacle Detected", "Path Clear"] and msg != obstacle_status:
         obstacle_status = msg
-        draw_gui(selected=last_command)  # update the screen
+        gui_dirty = True
+        log.add(msg)
 
 # Setup BLE
 global ble
@@ -45,43 +51,86 @@ last_command = ""
 connection_status = "Disconnected"
 tank_name = "PicoTank"
 
-def draw_gui(selected=""):
+def draw_static():
     """
-    Draw the LCD GUI with current status and selected command.
-    Args:
-        selected (str): The currently selected command (F, B, L, R, S)
+    Draw the parts of the GUI that never change. Called once at start-up.
     """
     lcd.fill(lcd.white)
     lcd.text("Pico BLE Controller", 20, 10, lcd.red)
     lcd.text("Tank: " + tank_name, 20, 30, lcd.green)
+    icons.TANK.draw(lcd, 200, 26)
     lcd.text("B: Connect  X: Disconnect", 20, 50, lcd.blue)
-    lcd.text("Status: " + connection_status, 20, 70, lcd.red)
-    # Arrow layout
-    def color(key): return lcd.red if key == selected else lcd.black
-    lcd.text("^", 115, 100, color("F"))
-    lcd.text("v", 115, 140, color("B"))
-    lcd.text("<", 95, 120, color("L"))
-    lcd.text(">", 135, 120, color("R"))
-    lcd.text("X", 115, 120, color("S"))  # Stop
-    lcd.rect(114, 99, 10, 10, color("F"))  # Up
-    lcd.rect(114, 139, 10, 10, color("B"))  # Down
-    lcd.rect(94, 119, 10, 10, color("L"))   # Left
-    lcd.rect(134, 119, 10, 10, color("R"))  # Right
-    lcd.rect(114, 119, 10, 10, color("S"))  # Stop
-    # Obstacle status label
     lcd.text("Obstacle:", 20, 180, lcd.black)
-    lcd.text(obstacle_status, 100, 180, lcd.red if obstacle_status == "Obstacle!" else lcd.green)
+    # Each new event line is sent on its own (see lcd_log.py), not with show()
+    global log
+    log = LogPane(lcd, 196, 5, lcd.black, lcd.white)
+
+# GUI widgets (see lcd_widgets.py): only those whose value changed are redrawn
+screen = Screen(lcd, lcd.white)
+status_label = screen.add(Label(20, 70, connection_status, lcd.red, prefix="Status: "))
+# Link quality 0-3: that many bars of the link icon are lit
+link_icon = screen.add(Icon(200, 66, {
+    level: (icons.LINK, (None,) + tuple(lcd.green if bar < level else lcd.black for bar in range(3)))
+    for level in range(4)
+}, 0))
+arrows = {
+    "F": screen.add(Indicator(114, 99, icons.ARROW_UP, lcd.red, lcd.black)),
+    "B": screen.add(Indicator(114, 139, icons.ARROW_DOWN, lcd.red, lcd.black)),
+    "L": screen.add(Indicator(94, 119, icons.ARROW_LEFT, lcd.red, lcd.black)),
+    "R": screen.add(Indicator(134, 119, icons.ARROW_RIGHT, lcd.red, lcd.black)),
+    "S": screen.add(Indicator(114, 119, icons.STOP, lcd.red, lcd.black)),  # Stop
+}
+obstacle_label = screen.add(Label(100, 180, obstacle_status, lcd.green))
+obstacle_icon = screen.add(Icon(200, 156, {
+    "Unknown": (icons.CLEAR, (None, lcd.white)),   # Blank
+    "Path Clear": (icons.CLEAR, None),
+    "Obstacle Detected": (icons.OBSTACLE, None),
+}, obstacle_status))
+
+def link_level():
+    """
+    Return the link quality shown by the link icon: 0 if not connected,
+    otherwise 1-3 from the RSSI the tank was last scanned with.
+    Returns:
+        int: 0-3
+    """
+    if not ble.connected:
+        return 0
+    known = ble.devices.find(tank_name)
+    if known is None:
+        return 1
+    rssi = ble.devices.get(known[1])[2]
+    return 3 if rssi > -60 else 2 if rssi > -75 else 1
+
+def draw_gui(selected=""):
+    """
+    Draw the LCD GUI with current status and selected command.
+    Only widgets whose value changed are redrawn and sent to the display.
+    Args:
+        selected (str): The currently selected command (F, B, L, R, S)
+    """
+    global gui_dirty
+    status_label.set(connection_status)
+    link_icon.set(link_level())
+    for key, arrow in arrows.items():
+        arrow.set(key == selected)
+    obstacle_label.set(obstacle_status, lcd.red if obstacle_status == "Obstacle!" else lcd.green)
+    obstacle_icon.set(obstacle_status)
+    screen.render()
     lcd.show()
+    gui_dirty = False
 
+draw_static()
 draw_gui()
 
 while True:
     try:
         # Handle Connect
         if not button_b.value():
-            if not ble.connected:
+            if not ble.connected and not ble.connecting:
                 print("🔗 Button B pressed: Connecting...")
                 connection_status = "Connecting..."
+                log.add("Connecting...")
                 draw_gui()
                 ble.connect()
                 time.sleep(0.5)
@@ -89,16 +138,20 @@ while True:
         if not button_x.value():
             if ble.connected:
                 print("❌ Button X pressed: Disconnecting...")
-                ble.ble.gap_disconnect(ble.conn_handle)
+                ble.disconnect()
                 connection_status = "Disconnected"
+                log.add("Disconnected")
                 draw_gui()
                 time.sleep(0.5)
         # Refresh status if changed externally
         if ble.connected and connection_status != "Connected":
             connection_status = "Connected"
             print("✅ BLE connected")
+            log.add("Connected to " + tank_name)
             draw_gui()
         elif not ble.connected and connection_status != "Disconnected":
+            if connection_status == "Connected":
+                log.add("Connection lost")
             connection_status = "Disconnected"
             print("🔌 BLE disconnected")
             draw_gui()
@@ -117,15 +170,19 @@ while True:
         if command and command != last_command:
             ble.send_command(command)
             print(f"➡️ Sent command: {command}")
+            log.add("Sent " + command)
             draw_gui(selected=command)
             last_command = command
         elif not command and last_command:
             draw_gui(selected=None)
             last_command = ""
+        ble.poll()  # Dispatch notifications and send writes the BLE stack could not take yet
+        if gui_dirty:
+            draw_gui(selected=last_command)
         time.sleep(0.1)
     except KeyboardInterrupt:
         print("🛑 Script interrupted")
         if ble.connected:
             ble.send_command("S")
-            ble.ble.gap_disconnect(ble.conn_handle)
+            ble.disconnect()
         break
@@ -0,0 +1,130 @@
+
+"""
+telemetry.py
+
+Fixed-layout binary telemetry record streamed by the robot servers on a
+dedicated notify characteristic, and the matching decoder for clients.
+
+Record version 1, 13 bytes, little-endian:
+
+    offset 0   uint8     version (1)
+    offset 1   uint8     flags: bit 0 = obstacle detected
+    offset 2   uint16    sequence number (wraps)
+    offset 4   uint8     motor state, ASCII drive command ('F', 'B', 'L', 'R', 'S')
+    offset 5   4 x uint8 servo angles: base, shoulder, elbow, gripper (255 = none)
+    offset 9   uint16    main loop period in microseconds (capped at 65535)
+    offset 11  uint8     RX queue high-water mark since the previous record
+    offset 12  uint8     RX queue overflows (wraps)
+"""
+
+import struct
+import time
+from micropython import const
+
+TELEMETRY_VERSION = const(1)
+NO_ANGLE = const(255)
+
+_FORMAT = "<BBHB4BHBB"
+_SIZE = const(13)
+_FLAG_OBSTACLE = const(0x01)
+
+
+class Telemetry:
+    """
+    Holds the latest robot state and packs it into a preallocated record.
+
+    Args:
+        interval_ms (int): Time between records; 0 disables streaming (default: 250)
+    """
+    def __init__(self, interval_ms=250):
+        self.interval_ms = interval_ms
+        self.buffer = bytearray(_SIZE)
+        self.obstacle = False
+        self.motor = "S"
+        self.angles = [NO_ANGLE, NO_ANGLE, NO_ANGLE, NO_ANGLE]
+        self.loop_us = 0
+        self._seq = 0
+        self._last_ms = time.ticks_ms()
+        self._last_loop = time.ticks_us()
+
+    def set_angles(self, base, shoulder, elbow, gripper):
+        """
+        Update the servo angles reported in the record.
+        Args:
+            base, shoulder, elbow, gripper (int): Angles in degrees
+        """
+        angles = self.angles
+        angles[0] = max(0, min(base, NO_ANGLE))
+        angles[1] = max(0, min(shoulder, NO_ANGLE))
+        angles[2] = max(0, min(elbow, NO_ANGLE))
+        angles[3] = max(0, min(gripper, NO_ANGLE))
+
+    def mark_loop(self):
+        """
+        Measure the main loop period. Call once per loop iteration.
+        """
+        now = time.ticks_us()
+        self.loop_us = time.ticks_diff(now, self._last_loop)
+        self._last_loop = now
+
+    def due(self):
+        """
+        Check whether the next record should be sent.
+        Returns:
+            bool: True once per interval while streaming is enabled
+        """
+        if not self.interval_ms:
+            return False
+        now = time.ticks_ms()
+        if time.ticks_diff(now, self._last_ms) < self.interval_ms:
+            return False
+        self._last_ms = now
+        return True
+
+    def pack(self, rx_depth=0, rx_overflows=0):
+        """
+        Pack the current state into the preallocated buffer.
+        Args:
+            rx_depth (int): Most writes waiting in the RX queue since the previous record
+            rx_overflows (int): Writes dropped because the RX queue was full
+        Returns:
+            bytearray: The telemetry record (the same buffer every call)
+        """
+        angles = self.angles
+        self._seq = (self._seq + 1) & 0xFFFF
+        struct.pack_into(
+            _FORMAT, self.buffer, 0,
+            TELEMETRY_VERSION,
+            _FLAG_OBSTACLE if self.obstacle else 0,
+            self._seq,
+            ord(self.motor),
+            angles[0], angles[1], angles[2], angles[3],
+            min(self.loop_us, 0xFFFF),
+            min(rx_depth, 0xFF),
+            rx_overflows & 0xFF,
+        )
+        return self.buffer
+
+
+def unpack(data):
+    """
+    Decode a telemetry record received by a client.
+    Args:
+        data (bytes/memoryview): One telemetry notification
+    Returns:
+        dict: seq, obstacle, motor, angles, loop_us, rx_depth, rx_overflows,
+            or None if the record has an unknown version or size
+    """
+    if len(data) < _SIZE or data[0] != TELEMETRY_VERSION:
+        return None
+    (_, flags, seq, motor, base, shoulder, elbow, gripper,
+     loop_us, rx_depth, rx_overflows) = struct.unpack_from(_FORMAT, data, 0)
+    return {
+        "seq": seq,
+        "obstacle": bool(flags & _FLAG_OBSTACLE),
+        "motor": chr(motor),
+        "angles": (base, shoulder, elbow, gripper),
+        "loop_us": loop_us,
+        "rx_depth": rx_depth,
+        "rx_overflows": rx_overflows,
+    }
@@ -0,0 +1,93 @@
+
+"""
+ble_notifier.py
+
+Implements Notifier, a rate-limited notification sender for BLE servers.
+Each connection keeps only the latest pending payload, so a burst of status
+updates is merged into one notification instead of flooding the link.
+"""
+
+import time
+
+
+class Notifier:
+    """
+    Coalescing, per-connection rate-limited sender for one notify characteristic.
+
+    Args:
+        ble: bluetooth.BLE instance
+        value_handle (int): Handle of the characteristic to notify
+        min_interval_ms (int): Minimum time between notifications to one connection
+    """
+    def __init__(self, ble, value_handle, min_interval_ms=100):
+        self._ble = ble
+        self._handle = value_handle
+        self.min_interval_ms = min_interval_ms
+        # conn_handle -> [last send time (ms), pending payload, last sent payload]
+        self._conns = {}
+
+        # Statistics
+        self.sent = 0          # Notifications actually sent
+        self.merged = 0        # Pending payloads replaced by a newer one
+        self.dropped = 0       # Payloads skipped because they repeat the last one sent
+
+    def add(self, conn_handle):
+        """
+        Start tracking a new connection.
+        Args:
+            conn_handle (int): Connection handle
+        """
+        self._conns[conn_handle] = [time.ticks_add(time.ticks_ms(), -self.min_interval_ms), None, None]
+
+    def remove(self, conn_handle):
+        """
+        Stop tracking a connection and discard its pending payload.
+        Args:
+            conn_handle (int): Connection handle
+        """
+        self._conns.pop(conn_handle, None)
+
+    def send(self, data):
+        """
+        Queue a payload for every connection. Anything still pending is replaced.
+        Args:
+            data (bytes/str): Payload to send; str is encoded once to bytes
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        for state in tuple(self._conns.values()):
+            if state[1] is not None:
+                self.merged += 1
+            state[1] = data
+        self.poll()
+
+    def poll(self):
+        """
+        Send pending payloads to connections whose rate limit has expired.
+        Call this regularly from the main loop.
+        """
+        now = time.ticks_ms()
+        for conn_handle, state in tuple(self._conns.items()):
+            data = state[1]
+            if data is None or time.ticks_diff(now, state[0]) < self.min_interval_ms:
+                continue
+            state[1] = None
+            if data == state[2]:
+                self.dropped += 1
+                continue
+            try:
+                self._ble.gatts_notify(conn_handle, self._handle, data)
+            except OSError:
+                state[1] = data  # Stack is busy; retry on the next poll
+                continue
+            state[0] = now
+            state[2] = data
+            self.sent += 1
+
+    def stats(self):
+        """
+        Return notification counters.
+        Returns:
+            dict: sent, merged, dropped
+        """
+        return {"sent": self.sent, "merged": self.merged, "dropped": self.dropped}
@@ -6,88 +6,380 @@ Implements BLE server for tank robot. Handles BLE communication, command recepti
 """
 
 import bluetooth
-from ble_advertising import advertising_payload
+import time
+from ble_advertising import advertising_payload, scan_response_payload
+from ble_notifier import Notifier
+from ble_protocol import ACK_SIZE, ACK_SUPERSEDED, FRAME_V1, RECEIPT_SIZE, SEQ, decode, pack_ack, pack_receipt
+from ble_rx_queue import RxQueue
+from command_scheduler import CommandScheduler
+from telemetry import Telemetry
+from ble_transfer import DEFAULT_MTU, FRAG_V1, MAX_MTU, MAX_PAYLOAD, Fragmenter, Reassembler, payload_size
 from micropython import const
 
+# BLE IRQ event constants
+_IRQ_CENTRAL_CONNECT = const(1)
+_IRQ_CENTRAL_DISCONNECT = const(2)
+_IRQ_GATTS_WRITE = const(3)
+_IRQ_MTU_EXCHANGED = const(21)
+_IRQ_CONNECTION_UPDATE = const(27)
+
 # BLE UART service and characteristic UUIDs
 _UART_SERVICE_UUID = bluetooth.UUID("6E400001-B5A3-F393-E0A9-E50E24DCCA9E")
 _UART_RX_CHAR = (bluetooth.UUID("6E400002-B5A3-F393-E0A9-E50E24DCCA9E"), bluetooth.FLAG_WRITE)
 _UART_TX_CHAR = (bluetooth.UUID("6E400003-B5A3-F393-E0A9-E50E24DCCA9E"), bluetooth.FLAG_NOTIFY)
-_UART_SERVICE = (_UART_SERVICE_UUID, (_UART_TX_CHAR, _UART_RX_CHAR))
+_TELEMETRY_CHAR = (bluetooth.UUID("6E400004-B5A3-F393-E0A9-E50E24DCCA9E"), bluetooth.FLAG_READ | bluetooth.FLAG_NOTIFY)
+# Command scheduling: all drive commands share the motors; S and X (emergency) stop
+_ACTUATORS = {"F": "drive", "B": "drive", "L": "drive", "R": "drive"}
+_STOP_COMMANDS = "SX"
+
+_MAX_TRANSFERS = const(4)  # Payloads send_large() can have waiting for notify buffers
+_UART_SERVICE = (_UART_SERVICE_UUID, (_UART_TX_CHAR, _UART_RX_CHAR, _TELEMETRY_CHAR))
 
 class BLETankServer:
     """
     BLE server for the tank robot. Handles BLE events, command reception, and status notification.
     """
-    def __init__(self, ble, on_rx_callback):
+    def __init__(self, ble, on_rx_callback, rx_slots=8, notify_interval_ms=100,
+                 telemetry_interval_ms=250):
         """
         Initialize BLE, register UART service, and start advertising.
         Args:
             ble: bluetooth.BLE instance
-            on_rx_callback: function to call when data is received
+            on_rx_callback: function(cmd, arg) called from poll() for each received command
+            rx_slots (int): number of writes that can be queued before poll() runs
+            notify_interval_ms (int): minimum time between notifications to one client
+            telemetry_interval_ms (int): time between telemetry records, 0 to disable
         """
         self._ble = ble
         self._ble.active(True)
+        self._ble.config(mtu=MAX_MTU)  # Preferred MTU offered during exchange
         self._ble.irq(self._irq)
         self._connections = set()
-        self._rx_buffer = bytearray()
+        self._rx_buffer = RxQueue(rx_slots, payload_size(MAX_MTU))
         self._on_rx = on_rx_callback
-        ((self._tx_handle, self._rx_handle),) = self._ble.gatts_register_services((_UART_SERVICE,))
-        self._payload = advertising_payload(name="PicoTank")
+        ((self._tx_handle, self._rx_handle, self._telemetry_handle),) = self._ble.gatts_register_services(
+            (_UART_SERVICE,))
+        self._notifier = Notifier(self._ble, self._tx_handle, notify_interval_ms)
+        # Accept writes up to the largest MTU instead of the default 20 bytes
+        self._ble.gatts_set_buffer(self._rx_handle, payload_size(MAX_MTU))
+        self._mtu = {}                    # conn_handle -> negotiated MTU
+        self._conn_params = {}            # conn_handle -> (interval_us, latency, timeout_ms)
+        self._fragmenter = Fragmenter()
+        self._reassembler = Reassembler()
+        self._on_data = None              # Callback for reassembled non-command payloads
+        self._ack = bytearray(ACK_SIZE)   # Reused for every sequence ack
+        self._receipt = bytearray(RECEIPT_SIZE)  # Reused for every transfer receipt
+        self.acks_lost = 0                # Acks the stack had no buffer for
+        self._transfers = []              # (conn_handle, payload) queued by send_large()
+        self._tx = None                   # [conn_handle, fragment generator, unsent fragment]
+        self.transfers_dropped = 0        # Payloads refused because the queue was full
+        # Decoded commands wait here until poll() runs them
+        self._scheduler = CommandScheduler(_ACTUATORS, _STOP_COMMANDS, self._on_drop)
+        self._arrival = 0                 # IRQ arrival time of the write being decoded
+        self._frame_seq = None
+        self._last_entry = None
+        # Robot state streamed on the telemetry characteristic; main.py keeps it up to date
+        self.telemetry = Telemetry(telemetry_interval_ms)
+        # Advertising data is built once and reused on every re-advertise: the
+        # 128-bit service UUID goes in the advertisement so scanners can filter
+        # on it, the name goes in the scan response sent to active scanners
+        self._name = "PicoTank"
+        self._adv_data = advertising_payload(services=[_UART_SERVICE_UUID])
+        self._resp_data = scan_response_payload(name=self._name)
         self._advertise()
 
     def _irq(self, event, data):
         """
         BLE IRQ event handler. Handles connection, disconnection, and write events.
+        Writes are only copied into the RX queue; commands run later from poll().
         Args:
             event (int): BLE event code
             data (tuple): Event data
         """
-        if event == 1:  # CONNECT
+        if event == _IRQ_CENTRAL_CONNECT:
             conn_handle, _, _ = data
             print(f"[BLE] Connected: {conn_handle}")
             self._connections.add(conn_handle)
-        elif event == 2:  # DISCONNECT
+            self._mtu[conn_handle] = DEFAULT_MTU
+            self._notifier.add(conn_handle)
+        elif event == _IRQ_CENTRAL_DISCONNECT:
             conn_handle, _, _ = data
             print(f"[BLE] Disconnected: {conn_handle}")
             self._connections.discard(conn_handle)
+            self._mtu.pop(conn_handle, None)
+            self._conn_params.pop(conn_handle, None)
+            self._notifier.remove(conn_handle)
             self._advertise()
-        elif event == 3:  # WRITE
+        elif event == _IRQ_GATTS_WRITE:
+            start = time.ticks_us()
             conn_handle, attr_handle = data
             if attr_handle == self._rx_handle:
-                msg = self._ble.gatts_read(self._rx_handle)
-                print(f"[BLE] Received: {msg}")
-                if self._on_rx:
-                    self._on_rx(msg.decode().strip())
+                self._rx_buffer.put(self._ble.gatts_read(self._rx_handle))
+            self._rx_buffer.record_irq(start)
+        elif event == _IRQ_MTU_EXCHANGED:
+            conn_handle, mtu = data
+            self._mtu[conn_handle] = mtu
+        elif event == _IRQ_CONNECTION_UPDATE:
+            conn_handle, interval, latency, timeout, status = data
+            if status == 0:
+                # Interval is in 1.25 ms units, supervision timeout in 10 ms units
+                self._conn_params[conn_handle] = (interval * 1250, latency, timeout * 10)
 
-    def send(self, data):
+    def poll(self):
+        """
+        Process all queued writes and pass each command to the RX callback.
+        Accepts both ASCII commands and binary multi-command frames (see ble_protocol.py).
+        Call this regularly from the main loop.
+        Returns:
+            int: Number of commands processed
+        """
+        self.telemetry.mark_loop()
+        self._drain()
+        count = self._scheduler.run(self._execute)
+        self._pump_transfers()
+        self._notifier.poll()
+        self._send_telemetry()
+        return count
+
+    def _drain(self):
+        """
+        Decode every queued write into the command scheduler.
+        """
+        while True:
+            msg = self._rx_buffer.peek()
+            if msg is None:
+                break
+            try:
+                self._dispatch(msg, self._rx_buffer.arrival_us())
+            except ValueError as e:
+                print("[BLE] Dropped invalid write:", e)
+            finally:
+                self._rx_buffer.pop()
+
+    def _send_telemetry(self):
+        """
+        Publish a telemetry record to all clients when one is due.
+        The record is written to the characteristic once and notified from there.
+        """
+        if not self._connections or not self.telemetry.due():
+            return
+        record = self.telemetry.pack(self._rx_buffer.take_peak(), self._rx_buffer.overflows)
+        self._ble.gatts_write(self._telemetry_handle, record)
+        for conn_handle in tuple(self._connections):
+            try:
+                self._ble.gatts_notify(conn_handle, self._telemetry_handle)
+            except OSError:
+                pass  # Stack busy; the next record supersedes this one
+
+    def _dispatch(self, msg, arrival_us):
+        """
+        Decode one queued write, reassembling fragmented payloads first.
+        Complete payloads that are not command frames go to the data callback,
+        and the clients get a receipt so the sender can measure delivery.
+        """
+        if msg and msg[0] == FRAG_V1:
+            msg = self._reassembler.feed(msg)
+            if msg is None:
+                return
+            if not msg or msg[0] != FRAME_V1:
+                self._send_receipt(len(msg), self._reassembler.last_us)
+                if self._on_data:
+                    self._on_data(msg)
+                return
+        self._arrival = arrival_us
+        self._frame_seq = None
+        self._last_entry = None
+        decode(msg, self._handle)
+        if self._frame_seq is not None and self._last_entry is not None:
+            # The frame is acked once its last command has run
+            self._scheduler.tag(self._last_entry, self._frame_seq)
+
+    def _handle(self, cmd, arg):
+        """
+        Schedule one decoded command, keeping the frame's sequence tag for the ack.
+        """
+        if cmd == SEQ:
+            self._frame_seq = arg
+        else:
+            self._last_entry = self._scheduler.add(cmd, arg, self._arrival)
+
+    def _execute(self, cmd, arg, seq):
+        """
+        Run one scheduled command and ack it if it carries a sequence number.
+        """
+        start = time.ticks_us()
+        if self._on_rx:
+            self._on_rx(cmd, arg)
+        if seq is not None:
+            self._send_ack(seq, time.ticks_diff(time.ticks_us(), start))
+
+    def _on_drop(self, cmd, arg, seq):
+        """
+        Ack a superseded or discarded command so benchmarks can account for it.
+        """
+        if seq is not None:
+            self._send_ack(seq, ACK_SUPERSEDED)
+
+    def _send_ack(self, seq, exec_us):
+        """
+        Notify a sequence ack to all clients, bypassing the rate limit used by send().
+        An ack the stack cannot take is counted and dropped, so it never stops
+        the command run that sends it.
+        """
+        pack_ack(self._ack, seq, exec_us)
+        for conn_handle in tuple(self._connections):
+            if not self._try_notify(conn_handle, self._ack):
+                self.acks_lost += 1
+
+    def _send_receipt(self, size, receive_us):
+        """
+        Notify a transfer receipt to all clients; a receipt that finds no buffer is lost.
+        """
+        pack_receipt(self._receipt, size, receive_us)
+        for conn_handle in tuple(self._connections):
+            self._try_notify(conn_handle, self._receipt)
+
+    def set_data_callback(self, callback):
+        """
+        Set a function to receive large payloads that are not command frames.
+        Args:
+            callback (callable): Function taking a memoryview, valid only during the call
+        """
+        self._on_data = callback
+
+    def send_large(self, data):
         """
-        Send a status message to all connected BLE clients.
+        Queue a payload of 1 to MAX_PAYLOAD (1024) bytes for all connected clients.
+        The payload is split into fragments that fit each client's negotiated MTU
+        and bypasses the rate limit used by send(). Fragments the stack has no
+        buffer for yet are sent by later poll() calls, so this never blocks.
         Args:
-            data (str): Status message to send
+            data (bytes): Payload to send; must stay unchanged until it is sent
+        Returns:
+            bool: False if too many payloads were waiting and this one was dropped
+        Raises:
+            ValueError: If the payload is empty or larger than the clients can receive
         """
-        for conn_handle in self._connections:
+        if not 0 < len(data) <= MAX_PAYLOAD:
+            raise ValueError("payload size out of range")
+        if len(self._transfers) + len(self._connections) > _MAX_TRANSFERS:
+            self.transfers_dropped += 1
+            return False
+        for conn_handle in tuple(self._connections):
+            self._transfers.append((conn_handle, data))
+        self._pump_transfers()
+        return True
+
+    def _pump_transfers(self):
+        """
+        Notify queued fragments until the stack runs out of buffers.
+        """
+        while True:
+            tx = self._tx
+            if tx is None:
+                if not self._transfers:
+                    return
+                conn_handle, data = self._transfers.pop(0)
+                # Fragments share one buffer, so payloads are sent one at a time
+                tx = self._tx = [conn_handle, self._fragmenter.fragments(data, self.mtu(conn_handle)), None]
+            if tx[0] not in self._connections:
+                self._tx = None  # Client gone: abandon the rest of the payload
+                continue
+            if tx[2] is None:
+                tx[2] = next(tx[1], None)
+                if tx[2] is None:
+                    self._tx = None  # Payload complete
+                    continue
+            if not self._try_notify(tx[0], tx[2]):
+                return  # Out of buffers; the next poll() continues with this fragment
+            tx[2] = None
+
+    def _try_notify(self, conn_handle, data):
+        """
+        Notify on the TX characteristic without waiting for buffers.
+        Returns:
+            bool: False if the stack could not take the notification
+        """
+        try:
             self._ble.gatts_notify(conn_handle, self._tx_handle, data)
+            return True
+        except OSError:
+            return False
+
+    def mtu(self, conn_handle):
+        """
+        Return the negotiated MTU for a connection.
+        Args:
+            conn_handle (int): Connection handle
+        Returns:
+            int: MTU (23 until an exchange completes)
+        """
+        return self._mtu.get(conn_handle, DEFAULT_MTU)
+
+    def conn_params(self, conn_handle):
+        """
+        Return the connection parameters last reported for a connection.
+        Args:
+            conn_handle (int): Connection handle
+        Returns:
+            tuple or None: (interval_us, peripheral_latency, supervision_timeout_ms),
+                or None until the central updates the parameters
+        """
+        return self._conn_params.get(conn_handle)
+
+    def transfer_stats(self):
+        """
+        Return reassembly counters, the last measured receive throughput, and
+        the state of the send_large() queue.
+        Returns:
+            dict: See Reassembler.stats(), plus tx_queued (payloads not fully
+                sent) and tx_dropped (payloads refused because the queue was full)
+        """
+        stats = self._reassembler.stats()
+        stats["tx_queued"] = len(self._transfers) + (self._tx is not None)
+        stats["tx_dropped"] = self.transfers_dropped
+        return stats
+
+    def sched_stats(self):
+        """
+        Return superseded/discarded command counts and stop latency.
+        Returns:
+            dict: See CommandScheduler.stats()
+        """
+        return self._scheduler.stats()
+
+    def rx_stats(self):
+        """
+        Return RX queue depth, overflow count, and IRQ timing statistics.
+        Returns:
+            dict: See RxQueue.stats()
+        """
+        return self._rx_buffer.stats()
+
+    def send(self, data):
+        """
+        Queue a status message for all connected BLE clients.
+        Messages are rate limited per client; if several arrive within the
+        interval only the latest is sent, and repeats of the last one are skipped.
+        Args:
+            data (bytes): Status message to send
+        """
+        self._notifier.send(data)
+
+    def notify_stats(self):
+        """
+        Return counts of sent, merged, and dropped notifications, and of lost acks.
+        Returns:
+            dict: See Notifier.stats(), plus acks_lost
+        """
+        stats = self._notifier.stats()
+        stats["acks_lost"] = self.acks_lost
+        return stats
 
     def _advertise(self):
         """
-        Start BLE advertising with the device name.
+        Start BLE advertising with the precomputed advertisement and scan response.
         """
-        # Try to decode the advertised name from the payload
-        adv_name = "<Unknown>"
-        try:
-            # BLE type for Complete Local Name is 0x09
-            i = 0
-            while i < len(self._payload):
-                length = self._payload[i]
-                type_ = self._payload[i + 1]
-                if type_ == 0x09:
-                    adv_name = self._payload[i + 2:i + 1 + length].decode("utf-8")
-                    break
-                i += 1 + length
-        except Exception as e:
-            print("[BLE] Failed to parse advertising name:", e)
-
-        print(f"[BLE] Advertising as: {adv_name}")
-        self._ble.gap_advertise(500_000, adv_data=self._payload)
+        print(f"[BLE] Advertising as: {self._name}")
+        self._ble.gap_advertise(500_000, adv_data=self._adv_data, resp_data=self._resp_data)
 
@@ -23,12 +23,13 @@ obstacle = ObstacleSensor()
 # Store last command to restore after obstacle clears
 last_command = "S"
 
-def on_rx(command):
+def on_rx(command, arg=None):
     """
     Callback for BLE commands received from the client.
     Handles movement and obstacle logic.
     Args:
-        command (str): Command character (F, B, L, R, S)
+        command (str): Command character (F, B, L, R, S, X = emergency stop)
+        arg (int): Command argument (unused by the tank)
     """
     global last_command
     print("[BLE] Command received:", command)
@@ -48,7 +49,7 @@ def on_rx(command):
                 tank.turn_left()
             elif command == "R":
                 tank.turn_right()
-            elif command == "S":
+            elif command in ("S", "X"):
                 tank.stop()
                 last_command = "S"
             else:
@@ -83,15 +84,19 @@ try:
                 if state == 0:
                     print("[Obstacle] Obstacle Detected")
                     tank.stop()
-                    ble_server.send("Obstacle Detected")
-                    print("[BLE] Message sent to client.")
+                    ble_server.send(b"Obstacle Detected")
+                    print("[BLE] Status queued for client.")
                 else:
                     print("[Obstacle] Path Clear")
-                    ble_server.send("Path Clear")
-                    print("[BLE] Message sent to client.")
+                    ble_server.send(b"Path Clear")
+                    print("[BLE] Status queued for client.")
                     if last_command != "S":
                         on_rx(last_command)
-        time.sleep(0.1)
+        # Run commands queued by the BLE IRQ and stream telemetry
+        ble_server.telemetry.motor = tank.state
+        ble_server.telemetry.obstacle = obstacle.last_state == 0
+        ble_server.poll()
+        time.sleep_ms(10)
 
 except KeyboardInterrupt:
     print("[System] Script stopped by user")
@@ -21,11 +21,13 @@ class RobotTank:
         self.in2 = Pin(in2_pin, Pin.OUT)
         self.in3 = Pin(in3_pin, Pin.OUT)
         self.in4 = Pin(in4_pin, Pin.OUT)
+        self.state = "S"  # Last drive command: F, B, L, R, or S
 
     def forward(self):
         """
         Move the tank forward by setting both motors forward.
         """
+        self.state = "F"
         self.in1.low()
         self.in2.high()
         self.in3.low()
@@ -35,6 +37,7 @@ class RobotTank:
         """
         Move the tank backward by setting both motors backward.
         """
+        self.state = "B"
         self.in1.high()
         self.in2.low()
         self.in3.high()
@@ -44,6 +47,7 @@ class RobotTank:
         """
         Turn the tank right by running left motor backward and right motor forward.
         """
+        self.state = "R"
         self.in1.high()
         self.in2.low()
         self.in3.low()
@@ -53,6 +57,7 @@ class RobotTank:
         """
         Turn the tank left by running left motor forward and right motor backward.
         """
+        self.state = "L"
         self.in1.low()
         self.in2.high()
         self.in3.high()
@@ -62,6 +67,7 @@ class RobotTank:
         """
         Stop both motors.
         """
+        self.state = "S"
         self.in1.low()
         self.in2.low()
         self.in3.low()
@@ -3,7 +3,7 @@
 ble_advertising.py
 
 Utility functions for creating BLE advertising payloads for MicroPython BLE applications.
-Provides a function to build advertising payloads with device name and service UUIDs.
+Provides functions to build advertising and scan response payloads with device name and service UUIDs.
 """
 
 from micropython import const
@@ -16,6 +16,53 @@ _ADV_TYPE_UUID16_COMPLETE = const(0x03)
 _ADV_TYPE_UUID32_COMPLETE = const(0x05)
 _ADV_TYPE_UUID128_COMPLETE = const(0x07)
 
+# Legacy advertising data and scan response data are each limited to 31 bytes
+_MAX_PAYLOAD = const(31)
+
+_UUID_TYPES = {
+    2: _ADV_TYPE_UUID16_COMPLETE,
+    4: _ADV_TYPE_UUID32_COMPLETE,
+    16: _ADV_TYPE_UUID128_COMPLETE,
+}
+
+
+def _encode(flags, name, services):
+    """
+    Pack AD structures into a single preallocated bytearray.
+    Args:
+        flags (int): Flags value, or None to leave out the Flags field.
+        name (str): Device name (optional).
+        services (list): List of UUID objects (optional).
+    Returns:
+        bytearray: The encoded payload.
+    Raises:
+        ValueError: If the payload does not fit in 31 bytes.
+    """
+    fields = []
+    if flags is not None:
+        fields.append((_ADV_TYPE_FLAGS, bytes((flags,))))
+    if name:
+        fields.append((_ADV_TYPE_NAME, name.encode()))
+    for uuid in services or ():
+        b = bytes(uuid)
+        if len(b) in _UUID_TYPES:
+            fields.append((_UUID_TYPES[len(b)], b))
+
+    size = 0
+    for _, value in fields:
+        size += 2 + len(value)
+    if size > _MAX_PAYLOAD:
+        raise ValueError("advertising payload is %d bytes, limit is 31" % size)
+
+    payload = bytearray(size)
+    offset = 0
+    for adv_type, value in fields:
+        struct.pack_into("BB", payload, offset, len(value) + 1, adv_type)
+        payload[offset + 2:offset + 2 + len(value)] = value
+        offset += 2 + len(value)
+    return payload
+
+
 def advertising_payload(limited_disc=False, br_edr=False, name=None, services=None):
     """
     Build a BLE advertising payload.
@@ -27,28 +74,16 @@ def advertising_payload(limited_disc=False, br_edr=False, name=None, services=No
     Returns:
         bytearray: The advertising payload.
     """
-    payload = bytearray()
+    return _encode(0x02 if limited_disc else 0x06, name, services)
 
-    # Flags field
-    flags = 0x02 if limited_disc else 0x06
-    payload += struct.pack("BB", 2, _ADV_TYPE_FLAGS)
-    payload += struct.pack("B", flags)
 
-    # Complete Local Name
-    if name:
-        name_bytes = name.encode()
-        payload += struct.pack("BB", len(name_bytes) + 1, _ADV_TYPE_NAME)
-        payload += name_bytes
-
-    # Service UUIDs
-    if services:
-        for uuid in services:
-            b = bytes(uuid)
-            if len(b) == 2:
-                payload += struct.pack("BB", len(b) + 1, _ADV_TYPE_UUID16_COMPLETE) + b
-            elif len(b) == 4:
-                payload += struct.pack("BB", len(b) + 1, _ADV_TYPE_UUID32_COMPLETE) + b
-            elif len(b) == 16:
-                payload += struct.pack("BB", len(b) + 1, _ADV_TYPE_UUID128_COMPLETE) + b
-
-    return payload
\ No newline at end of file
+def scan_response_payload(name=None, services=None):
+    """
+    Build a BLE scan response payload (sent only to active scanners).
+    Args:
+        name (str): Device name to send.
+        services (list): List of UUID objects to send.
+    Returns:
+        bytearray: The scan response payload.
+    """
+    return _encode(None, name, services)
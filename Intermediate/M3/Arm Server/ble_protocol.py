@@ -0,0 +1,202 @@
+
+"""
+ble_protocol.py
+
+Command encoding shared by the BLE robot servers and the controller clients.
+
+Two formats are accepted on the RX characteristic:
+- ASCII: one command per write, a letter optionally followed by an integer
+  ("F", "S", "B90", "T").
+- Binary frame, version 1: several commands packed into a single write.
+
+      offset 0   uint8   FRAME_V1 (0x81, never a printable ASCII character)
+      offset 1   uint8   number of commands N
+      offset 2   N x (uint8 command letter, int16 little-endian argument)
+
+A full arm pose (four joints plus gripper toggle) fits in one 17-byte frame.
+
+A frame may start with a sequence tag, (SEQ, n) with 0 <= n < 32768. After
+the remaining commands have run, the server notifies an ack:
+
+      offset 0   uint8   ACK_V1 (0x83)
+      offset 1   uint16  sequence number, little-endian
+      offset 3   uint32  execution time on the server in microseconds, or
+                         ACK_SUPERSEDED if a newer command or a stop replaced it
+
+Arm joint setpoints are streamed in a third, fixed-size form. Each one is a
+complete pose that replaces the previous one, so it bypasses the command
+queue and is never acked:
+
+      offset 0   uint8   SETPOINT_V1 (0x84)
+      offset 1   4 x uint8  base, shoulder, elbow, gripper angle in degrees (0-180)
+
+When a fragmented payload (see ble_transfer.py) that is not a command frame
+has been reassembled, the server notifies a receipt, so a sender can tell
+how long delivery really took:
+
+      offset 0   uint8   RECEIPT_V1 (0x85)
+      offset 1   uint16  payload size in bytes, little-endian
+      offset 3   uint32  time from first to last fragment on the server in microseconds
+"""
+
+import struct
+from micropython import const
+
+FRAME_V1 = const(0x81)
+ACK_V1 = const(0x83)
+ACK_SIZE = const(7)
+ACK_SUPERSEDED = const(0xFFFFFFFF)
+SETPOINT_V1 = const(0x84)
+SETPOINT_SIZE = const(5)
+RECEIPT_V1 = const(0x85)
+RECEIPT_SIZE = const(7)
+SEQ = "Q"
+
+_HEADER_SIZE = const(2)
+_RECORD = "<Bh"
+_RECORD_SIZE = const(3)
+_ACK = "<BHI"
+_SETPOINT = "<B4B"
+_RECEIPT = "<BHI"
+
+
+def parse_ascii(text):
+    """
+    Split an ASCII command into its letter and optional integer argument.
+    Args:
+        text (str): Command string, e.g. 'F' or 'B90'
+    Returns:
+        tuple: (cmd (str), arg (int or None))
+    Raises:
+        ValueError: If the argument is not an integer
+    """
+    if len(text) > 1:
+        return text[0], int(text[1:])
+    return text, None
+
+
+def decode(data, handler):
+    """
+    Decode one BLE write and call handler(cmd, arg) for every command in it.
+    Args:
+        data (memoryview/bytes): Raw write contents
+        handler (callable): Function taking (cmd (str), arg (int or None))
+    Returns:
+        int: Number of commands dispatched
+    Raises:
+        ValueError: If the write is not a valid command or frame
+    """
+    if not data:
+        return 0
+    if data[0] == FRAME_V1:
+        if len(data) < _HEADER_SIZE:
+            raise ValueError("short frame")
+        count = data[1]
+        if len(data) < _HEADER_SIZE + count * _RECORD_SIZE:
+            raise ValueError("truncated frame")
+        offset = _HEADER_SIZE
+        for _ in range(count):
+            op, arg = struct.unpack_from(_RECORD, data, offset)
+            offset += _RECORD_SIZE
+            handler(chr(op), arg)
+        return count
+
+    text = bytes(data).decode().strip()
+    if not text:
+        return 0
+    cmd, arg = parse_ascii(text)
+    handler(cmd, arg)
+    return 1
+
+
+def encode_frame(commands):
+    """
+    Pack several commands into one binary frame.
+    Args:
+        commands (list): (cmd (str), arg (int or None)) pairs, e.g. [("B", 90), ("T", None)]
+    Returns:
+        bytearray: Encoded frame
+    """
+    frame = bytearray(_HEADER_SIZE + len(commands) * _RECORD_SIZE)
+    frame[0] = FRAME_V1
+    frame[1] = len(commands)
+    offset = _HEADER_SIZE
+    for cmd, arg in commands:
+        struct.pack_into(_RECORD, frame, offset, ord(cmd), arg or 0)
+        offset += _RECORD_SIZE
+    return frame
+
+
+def pack_ack(buf, seq, exec_us):
+    """
+    Write an ack into a preallocated buffer of ACK_SIZE bytes.
+    Args:
+        buf (bytearray): Destination buffer
+        seq (int): Sequence number being acknowledged
+        exec_us (int): Time the server spent executing the frame
+    """
+    struct.pack_into(_ACK, buf, 0, ACK_V1, seq & 0xFFFF, exec_us & 0xFFFFFFFF)
+
+
+def unpack_ack(data):
+    """
+    Decode an ack notification.
+    Args:
+        data (bytes/memoryview): Notification contents starting with ACK_V1
+    Returns:
+        tuple or None: (seq, exec_us), or None if data is not an ack
+    """
+    if len(data) < ACK_SIZE or data[0] != ACK_V1:
+        return None
+    _, seq, exec_us = struct.unpack_from(_ACK, data, 0)
+    return seq, exec_us
+
+
+def pack_setpoints(base, shoulder, elbow, gripper):
+    """
+    Encode an arm pose as a setpoint write.
+    Args:
+        base, shoulder, elbow, gripper (int): Joint angles in degrees, clamped to 0-180
+    Returns:
+        bytes: SETPOINT_SIZE-byte payload
+    """
+    return struct.pack(_SETPOINT, SETPOINT_V1, min(max(base, 0), 180), min(max(shoulder, 0), 180),
+                       min(max(elbow, 0), 180), min(max(gripper, 0), 180))
+
+
+def unpack_setpoints(data):
+    """
+    Decode a setpoint write.
+    Args:
+        data (bytes/memoryview): Write contents starting with SETPOINT_V1
+    Returns:
+        tuple or None: (base, shoulder, elbow, gripper), or None if data is not a setpoint
+    """
+    if len(data) < SETPOINT_SIZE or data[0] != SETPOINT_V1:
+        return None
+    return struct.unpack_from(_SETPOINT, data, 0)[1:]
+
+
+def pack_receipt(buf, size, receive_us):
+    """
+    Write a transfer receipt into a preallocated buffer of RECEIPT_SIZE bytes.
+    Args:
+        buf (bytearray): Destination buffer
+        size (int): Payload size in bytes
+        receive_us (int): Time from first to last fragment
+    """
+    struct.pack_into(_RECEIPT, buf, 0, RECEIPT_V1, size & 0xFFFF, receive_us & 0xFFFFFFFF)
+
+
+def unpack_receipt(data):
+    """
+    Decode a transfer receipt notification.
+    Args:
+        data (bytes/memoryview): Notification contents starting with RECEIPT_V1
+    Returns:
+        tuple or None: (size, receive_us), or None if data is not a receipt
+    """
+    if len(data) < RECEIPT_SIZE or data[0] != RECEIPT_V1:
+        return None
+    _, size, receive_us = struct.unpack_from(_RECEIPT, data, 0)
+    return size, receive_us
@@ -0,0 +1,127 @@
+
+"""
+command_scheduler.py
+
+Implements CommandScheduler, which orders decoded BLE commands before they run.
+- A newer movement command for an actuator replaces an older one still waiting.
+- Stop commands run before anything else and discard the movement queued before them.
+- The time from a stop arriving in the BLE IRQ to it running is recorded.
+"""
+
+import time
+
+# Entry fields
+_CMD = 0
+_ARG = 1
+_KEY = 2
+_SEQ = 3
+_ARRIVAL = 4
+
+
+class CommandScheduler:
+    """
+    Orders pending commands by priority and drops stale movement commands.
+
+    Args:
+        actuators (dict): Command letter -> actuator key. Commands sharing a key
+            supersede each other; letters not listed always run in order.
+        stops (str): Command letters that stop the robot
+        on_drop (callable): Function taking an entry that was superseded or
+            discarded by a stop (optional)
+    """
+    def __init__(self, actuators, stops, on_drop=None):
+        self._actuators = actuators
+        self._stops = stops
+        self._on_drop = on_drop
+        self._pending = []         # Entries in arrival order
+        self._stop = None          # Stop entry waiting to run
+
+        # Statistics
+        self.superseded = 0        # Movement commands replaced by a newer one
+        self.discarded = 0         # Movement commands dropped by a stop
+        self.stop_last_us = 0      # Arrival-to-execution time of the last stop
+        self.stop_max_us = 0       # Worst arrival-to-execution time of any stop
+
+    def add(self, cmd, arg, arrival_us):
+        """
+        Queue a decoded command.
+        Args:
+            cmd (str): Command letter
+            arg (int or None): Command argument
+            arrival_us (int): time.ticks_us() when the write reached the BLE IRQ
+        Returns:
+            list: The queued entry (its sequence number can be set with tag())
+        """
+        entry = [cmd, arg, self._actuators.get(cmd), None, arrival_us]
+        if cmd in self._stops:
+            # Everything queued before a stop is stale
+            while self._pending:
+                self.discarded += 1
+                self._drop(self._pending.pop(0))
+            if self._stop is not None:
+                self._drop(self._stop)
+            self._stop = entry
+            return entry
+
+        key = entry[_KEY]
+        if key is not None:
+            for i in range(len(self._pending)):
+                if self._pending[i][_KEY] == key:
+                    self.superseded += 1
+                    self._drop(self._pending.pop(i))
+                    break
+        self._pending.append(entry)
+        return entry
+
+    def tag(self, entry, seq):
+        """
+        Attach a sequence number to a queued entry so it can be acknowledged.
+        Args:
+            entry (list): Entry returned by add()
+            seq (int): Sequence number
+        """
+        entry[_SEQ] = seq
+
+    def run(self, execute):
+        """
+        Run queued commands: a pending stop first, then the rest in arrival order.
+        Commands queued while one is running (e.g. during a sweep) are picked up too.
+        Args:
+            execute (callable): Function taking (cmd, arg, seq)
+        Returns:
+            int: Number of commands run
+        """
+        count = 0
+        while True:
+            if self._stop is not None:
+                entry = self._stop
+                self._stop = None
+                execute(entry[_CMD], entry[_ARG], entry[_SEQ])
+                elapsed = time.ticks_diff(time.ticks_us(), entry[_ARRIVAL])
+                self.stop_last_us = elapsed
+                if elapsed > self.stop_max_us:
+                    self.stop_max_us = elapsed
+            elif self._pending:
+                entry = self._pending.pop(0)
+                execute(entry[_CMD], entry[_ARG], entry[_SEQ])
+            else:
+                return count
+            count += 1
+
+    def _drop(self, entry):
+        if self._on_drop:
+            self._on_drop(entry[_CMD], entry[_ARG], entry[_SEQ])
+
+    def stats(self):
+        """
+        Return scheduling counters and stop latency.
+        Returns:
+            dict: pending, superseded, discarded, stop_last_us, stop_max_us
+        """
+        return {
+            "pending": len(self._pending) + (self._stop is not None),
+            "superseded": self.superseded,
+            "discarded": self.discarded,
+            "stop_last_us": self.stop_last_us,
+            "stop_max_us": self.stop_max_us,
+        }
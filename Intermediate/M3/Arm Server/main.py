@@ -1,10 +1,11 @@
-
 """
 main.py
 
 Main script for the BLE-controlled robot arm server.
 Initializes servos, BLE server, and handles incoming BLE commands to control the arm.
-Provides functions for smooth servo movement and angle conversion.
+Servo motion runs from a timer (see servo_motion.py): commands only set target
+angles, so joints move together and the loop keeps serving BLE while they move.
+Poses streamed by the controller are followed at a bounded joint speed.
 """
 
 from machine import Pin, PWM
@@ -13,6 +14,7 @@ import time
 
 from ble_led import BleLED
 from ble_arm_server import BLEArmServer
+from servo_motion import ServoMotion
 
 # Servo motor pins
 base = PWM(Pin(2))
@@ -26,96 +28,67 @@ for servo in [base, shoulder, elbow, gripper]:
 # LED indicator (yellow)
 led = BleLED(13)
 
-def angle_to_duty(angle):
-    """
-    Convert an angle in degrees to PWM duty cycle for servo control.
-    Args:
-        angle (int): Angle in degrees (0-180)
-    Returns:
-        int: PWM duty cycle value
-    """
-    us = 500 + (angle * 2000) // 180
-    return int(us * 65535 / 20000)
+# Joint speed for commanded moves: the 1 degree per 10 ms of the old sweeps
+MOVE_SPEED_DPS = 100
+# Streamed setpoints: each joint moves towards its target at TRACK_SPEED_DPS,
+# so 30-50 Hz setpoints turn into smooth motion between them
+TRACK_SPEED_DPS = 180
+motion = ServoMotion(speed_dps=MOVE_SPEED_DPS, period_ms=10)
 
-def move_servo(servo, angle):
+def initialize_servos():
     """
-    Move a servo to the specified angle.
-    Args:
-        servo (PWM): Servo PWM object
-        angle (int): Target angle in degrees
+    Initialize all servos to their default positions and start the motion timer.
     """
-    servo.duty_u16(angle_to_duty(angle))
+    motion.add("base", base, 90)
+    motion.add("shoulder", shoulder, 0)
+    motion.add("elbow", elbow, 0)
+    motion.add("gripper", gripper, 180)
+    motion.start()
+    print("✅ Servos initialized to default positions.")
 
-def sweep_servo(servo, start_angle, end_angle, step=1, delay=0.01):
-    """
-    Sweep a servo smoothly from start_angle to end_angle.
-    Args:
-        servo (PWM): Servo PWM object
-        start_angle (int): Starting angle
-        end_angle (int): Ending angle
-        step (int): Step size in degrees
-        delay (float): Delay between steps in seconds
-    """
-    if start_angle == end_angle:
-        return
-    direction = 1 if end_angle > start_angle else -1
-    for angle in range(start_angle, end_angle, direction * step):
-        move_servo(servo, angle)
-        time.sleep(delay)
-    move_servo(servo, end_angle)  # Ensure final position
+JOINTS = ("base", "shoulder", "elbow", "gripper")
 
-def initialize_servos():
+def track_setpoints():
     """
-    Initialize all servos to their default positions.
+    Retarget every joint to the latest streamed pose, if one arrived.
+    Call this from the main loop.
     """
-    move_servo(base, 90)
-    move_servo(shoulder, 0)
-    move_servo(elbow, 0)
-    move_servo(gripper, 180)
-    print("✅ Servos initialized to default positions.")
+    setpoint = arm_server.take_setpoint()
+    if setpoint is not None:
+        for name, angle in zip(JOINTS, setpoint):
+            motion.move_to(name, angle, TRACK_SPEED_DPS)
 
-angles = {
-    "base": 90,
-    "shoulder": 0,
-    "elbow": 0,
-    "gripper": 180
-}
+_JOINT_NAMES = {"B": "base", "S": "shoulder", "E": "elbow", "G": "gripper"}
 
-def on_rx(command):
+def on_rx(command, angle=None):
     """
     BLE receive callback to handle incoming commands for servo movement.
+    Runs from the main loop via arm_server.poll(). Moves are started, not waited
+    for: a later command for the same joint retargets it mid-move.
     Args:
-        command (str): Command string, e.g. 'B90' for base to 90 degrees
+        command (str): Command letter: 'B', 'S', 'E', 'G' (joint), 'T' (toggle gripper)
+            or 'X' (emergency stop: hold every joint where it is)
+        angle (int): Target angle in degrees for joint commands, e.g. ('B', 90)
     """
-    print("📥 Received command:", command)
+    print("📥 Received command:", command, angle)
     led.on()
     try:
-        if command.startswith("B"):  # Base
-            angle = int(command[1:])
-            sweep_servo(base, angles["base"], angle)
-            angles["base"] = angle
-        elif command.startswith("S"):  # Shoulder
-            angle = int(command[1:])
-            sweep_servo(shoulder, angles["shoulder"], angle)
-            angles["shoulder"] = angle
-        elif command.startswith("E"):  # Elbow
-            angle = int(command[1:])
-            sweep_servo(elbow, angles["elbow"], angle)
-            angles["elbow"] = angle
-        elif command.startswith("G"):  # Gripper
-            angle = int(command[1:])
-            sweep_servo(gripper, angles["gripper"], angle)
-            angles["gripper"] = angle
+        if command in "BSEG" and angle is None:
+            print("⚠️ Missing angle for", command)
+        elif command in _JOINT_NAMES:
+            motion.move_to(_JOINT_NAMES[command], angle)
         elif command == "T":  # Toggle gripper open/close
             # Toggle between open (180) and closed (0)
-            if angles["gripper"] == 180:
-                move_servo(gripper, 0)
-                angles["gripper"] = 0
+            if motion.target("gripper") == 180:
+                motion.move_to("gripper", 0, 0)
                 print("🔒 Gripper closed")
             else:
-                move_servo(gripper, 180)
-                angles["gripper"] = 180
+                motion.move_to("gripper", 180, 0)
                 print("🔓 Gripper opened")
+        elif command == "X":  # Emergency stop
+            motion.stop()
+            print("🛑 Emergency stop, holding",
+                  [motion.angle(name) for name in JOINTS])
     except Exception as e:
         print("❌ Command error:", e)
 
@@ -132,10 +105,16 @@ try:
     while True:
         if arm_server._connections:
             led.on()
+            # Run commands queued by the BLE IRQ and stream telemetry
+            arm_server.telemetry.set_angles(motion.angle("base"), motion.angle("shoulder"),
+                                            motion.angle("elbow"), motion.angle("gripper"))
+            arm_server.poll()
+            track_setpoints()
+            time.sleep_ms(10)
         else:
             led.blink()
-        time.sleep(0.3)
 
 except KeyboardInterrupt:
     print("🛑 Server stopped")
+    motion.deinit()
     led.off()
@@ -0,0 +1,163 @@
+"""
+servo_motion.py
+
+Implements ServoMotion, a timer-driven motion engine for hobby servos.
+A machine.Timer advances every servo towards its target angle a little on
+each tick, so all joints move at the same time and move_to() returns at once.
+A new target replaces the old one mid-move; the servo turns around from
+wherever it is. Positions are kept in millidegrees so a tick does no
+floating-point math and allocates nothing.
+"""
+
+from machine import Timer
+import time
+
+
+def _duty(mdeg):
+    # 500-2500 us pulse over 0-180 degrees, as a 16-bit duty cycle of the 20 ms period
+    return (500 + mdeg * 2000 // 180000) * 65535 // 20000
+
+
+class ServoMotion:
+    """
+    Moves a set of named servos towards their targets at a bounded speed.
+
+    Args:
+        speed_dps (int): Default joint speed in degrees per second
+        period_ms (int): Timer tick period
+    """
+    def __init__(self, speed_dps=100, period_ms=10):
+        self.speed_dps = speed_dps
+        self.period_ms = period_ms
+        self._index = {}           # Servo name -> index into the lists below
+        self._pwm = []             # PWM object per servo
+        self._pos = []             # Current angle, millidegrees
+        self._target = []          # Target angle, millidegrees
+        self._step = []            # Millidegrees per tick
+        self._timer = None
+
+    def add(self, name, pwm, angle):
+        """
+        Register a servo and drive it to its starting angle at once.
+        Args:
+            name (str): Servo name, e.g. "base"
+            pwm (PWM): PWM object, already set to 50 Hz
+            angle (int): Starting angle in degrees
+        """
+        mdeg = int(max(0, min(180, angle)) * 1000)
+        self._index[name] = len(self._pwm)
+        self._pwm.append(pwm)
+        self._pos.append(mdeg)
+        self._target.append(mdeg)
+        self._step.append(self._step_for(self.speed_dps))
+        pwm.duty_u16(_duty(mdeg))
+
+    def _step_for(self, speed_dps):
+        return max(1, speed_dps * self.period_ms)  # deg/s * ms = millidegrees per tick
+
+    def move_to(self, name, angle, speed_dps=None):
+        """
+        Set a servo's target angle; it starts moving on the next tick.
+        Replaces any target it is still moving towards.
+        Args:
+            name (str): Servo name
+            angle (int): Target angle in degrees, clamped to 0-180
+            speed_dps (int): Speed for this move (default: speed_dps); 0 jumps at once
+        """
+        i = self._index[name]
+        mdeg = int(max(0, min(180, angle)) * 1000)
+        self._step[i] = self._step_for(self.speed_dps if speed_dps is None else speed_dps)
+        self._target[i] = mdeg
+        if speed_dps == 0:
+            self._pos[i] = mdeg
+            self._pwm[i].duty_u16(_duty(mdeg))
+
+    def stop(self, name=None):
+        """
+        Hold one servo, or all of them, where it is now.
+        Args:
+            name (str): Servo name (default: all)
+        """
+        if name is None:
+            for i in range(len(self._pos)):
+                self._target[i] = self._pos[i]
+        else:
+            i = self._index[name]
+            self._target[i] = self._pos[i]
+
+    def moving(self, name=None):
+        """
+        Check whether a servo, or any servo, has not reached its target yet.
+        Args:
+            name (str): Servo name (default: any)
+        Returns:
+            bool: True while moving
+        """
+        if name is not None:
+            i = self._index[name]
+            return self._pos[i] != self._target[i]
+        for i in range(len(self._pos)):
+            if self._pos[i] != self._target[i]:
+                return True
+        return False
+
+    def angle(self, name):
+        """
+        Return a servo's current angle.
+        Args:
+            name (str): Servo name
+        Returns:
+            int: Angle in degrees, rounded
+        """
+        return (self._pos[self._index[name]] + 500) // 1000
+
+    def target(self, name):
+        """
+        Return the angle a servo is moving towards.
+        Args:
+            name (str): Servo name
+        Returns:
+            int: Angle in degrees
+        """
+        return (self._target[self._index[name]] + 500) // 1000
+
+    def wait(self, name=None):
+        """
+        Block until a servo, or every servo, has reached its target.
+        For scripted sequences; loops that have other work should poll moving().
+        Args:
+            name (str): Servo name (default: all)
+        """
+        while self.moving(name):
+            time.sleep_ms(self.period_ms)
+
+    def start(self):
+        """
+        Start the timer that moves the servos.
+        """
+        if self._timer is None:
+            self._timer = Timer(-1, mode=Timer.PERIODIC, period=self.period_ms, callback=self._tick)
+
+    def deinit(self):
+        """
+        Stop the timer; the servos hold their current angles.
+        """
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+
+    def _tick(self, _timer):
+        pos = self._pos
+        target = self._target
+        for i in range(len(pos)):
+            p = pos[i]
+            t = target[i]
+            if p == t:
+                continue
+            step = self._step[i]
+            if t > p:
+                p = t if t - p <= step else p + step
+            else:
+                p = t if p - t <= step else p - step
+            pos[i] = p
+            self._pwm[i].duty_u16(_duty(p))
@@ -0,0 +1,97 @@
+"""
+arm_stream.py
+
+Implements ArmStreamer, which turns joystick input into a stream of arm
+setpoints. Each joint has a velocity axis (-1.0 to 1.0, so an analog stick can
+drive it directly; the digital joystick gives -1, 0 or 1). tick() integrates
+the velocities over the time since the last tick and sends the pose only when
+a joint angle has changed, at most once per period.
+"""
+
+import time
+
+
+class ArmStreamer:
+    """
+    Velocity-mode arm teleoperation.
+
+    Args:
+        send (callable): Function taking (base, shoulder, elbow, gripper) that sends
+            one pose, e.g. BLEControllerClient.send_setpoints; returns True if queued
+        rate_hz (int): Highest rate at which poses are sent
+        speed_dps (int): Joint speed at full stick deflection, in degrees per second
+        home (tuple): Starting (base, shoulder, elbow, gripper) angles, taken to be
+            where the arm already is: nothing is sent until a joint moves from it
+    """
+    def __init__(self, send, rate_hz=40, speed_dps=90, home=(90, 0, 0, 180)):
+        self._send = send
+        self.period_ms = 1000 // rate_hz
+        self.speed_dps = speed_dps
+        self.angles = [float(a) for a in home]   # Exact angles, rounded when sent
+        self._axes = [0.0, 0.0, 0.0, 0.0]        # Velocity per joint, -1.0 to 1.0
+        self._sent = tuple(int(a) for a in home)  # Last pose handed to send()
+        self._last_tick = time.ticks_ms()
+
+        # Statistics
+        self.sent = 0              # Poses sent
+        self.skipped = 0           # Ticks where no joint angle changed
+
+    def set_axes(self, base=0.0, shoulder=0.0, elbow=0.0, gripper=0.0):
+        """
+        Set the velocity of every joint, as a fraction of speed_dps.
+        Args:
+            base, shoulder, elbow, gripper (float): -1.0 to 1.0
+        """
+        axes = self._axes
+        axes[0] = base
+        axes[1] = shoulder
+        axes[2] = elbow
+        axes[3] = gripper
+
+    def sync(self, base, shoulder, elbow, gripper):
+        """
+        Set the current pose, e.g. after a reset moved the arm by other means.
+        Args:
+            base, shoulder, elbow, gripper (int): Joint angles in degrees
+        """
+        self.angles = [float(base), float(shoulder), float(elbow), float(gripper)]
+        self._sent = (base, shoulder, elbow, gripper)
+
+    def tick(self):
+        """
+        Advance the pose by the elapsed time and send it if any joint moved.
+        Call this every period_ms.
+        Returns:
+            bool: True if a pose was sent
+        """
+        now = time.ticks_ms()
+        # Capped so a stalled loop does not make the arm jump
+        dt = min(time.ticks_diff(now, self._last_tick), 4 * self.period_ms) / 1000
+        self._last_tick = now
+        step = self.speed_dps * dt
+        angles = self.angles
+        for i in range(4):
+            if self._axes[i]:
+                angles[i] = min(180.0, max(0.0, angles[i] + self._axes[i] * step))
+
+        pose = (int(angles[0]), int(angles[1]), int(angles[2]), int(angles[3]))
+        if pose == self._sent:
+            self.skipped += 1
+            return False
+        if not self._send(*pose):
+            return False  # Not connected; try again next tick
+        self._sent = pose
+        self.sent += 1
+        return True
+
+    def stats(self):
+        """
+        Return streaming counters.
+        Returns:
+            dict: sent, skipped, pose
+        """
+        return {
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "pose": self._sent,
+        }
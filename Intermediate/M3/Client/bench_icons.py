@@ -0,0 +1,90 @@
+"""
+bench_icons.py
+
+Measures how long the D-pad and status icons take to draw, comparing the
+text/rect calls the D-pad used before with packed sprites (lcd_sprites.py).
+"draw" times only the drawing into the frame buffer; "+ show" includes
+sending the changed regions; "push" sends each sprite as soon as it is drawn.
+Every case runs for each frame buffer format.
+Run it on the controller instead of main.py, e.g. with `mpremote run bench_icons.py`.
+"""
+
+from lcd_display import LCDDisplay
+import framebuf
+import icons
+import time
+
+ROUNDS = 50
+FORMATS = [("RGB565", framebuf.RGB565), ("GS8", framebuf.GS8), ("GS4", framebuf.GS4_HMSB)]
+
+# D-pad layout of the controller GUI: (x, y, sprite, glyph)
+DPAD = [
+    (114, 169, icons.ARROW_UP, "^"),
+    (114, 209, icons.ARROW_DOWN, "v"),
+    (94, 189, icons.ARROW_LEFT, "<"),
+    (134, 189, icons.ARROW_RIGHT, ">"),
+    (114, 189, icons.STOP, "X"),
+]
+
+lcd = None
+
+
+def dpad_primitives(i):
+    for n, (x, y, _, glyph) in enumerate(DPAD):
+        color = lcd.red if n == i % 5 else lcd.black
+        lcd.fill_rect(x, y, 10, 10, lcd.white)
+        lcd.text(glyph, x + 1, y + 1, color)
+        lcd.rect(x, y, 10, 10, color)
+
+
+def dpad_sprites(i):
+    for n, (x, y, sprite, _) in enumerate(DPAD):
+        lcd.fill_rect(x, y, 10, 10, lcd.white)
+        sprite.draw(lcd, x, y, on if n == i % 5 else off)
+
+
+def dpad_push(i):
+    for n, (x, y, sprite, _) in enumerate(DPAD):
+        framebuf.FrameBuffer.fill_rect(lcd, x, y, 10, 10, lcd.white)
+        sprite.push(lcd, x, y, on if n == i % 5 else off)
+
+
+def status_icons(i):
+    lcd.fill_rect(176, 26, 40, 16, lcd.white)
+    (icons.TANK if i & 1 else icons.ARM).draw(lcd, 176, 26)
+    icons.LINK.draw(lcd, 200, 26)
+
+
+def timed(draw, show):
+    times = []
+    for i in range(ROUNDS):
+        start = time.ticks_us()
+        draw(i)
+        if show:
+            lcd.show()
+        times.append(time.ticks_diff(time.ticks_us(), start))
+    if not show:
+        lcd.show()
+    return sum(times) // len(times), max(times)
+
+
+CASES = [
+    ("d-pad text/rect", dpad_primitives, True),
+    ("d-pad sprites", dpad_sprites, True),
+    ("d-pad push", dpad_push, False),
+    ("tank/arm + link", status_icons, True),
+]
+
+for fmt_name, fmt in FORMATS:
+    lcd = LCDDisplay(fmt=fmt)
+    on = (None, lcd.red)
+    off = (None, lcd.black)
+    print(f"🖥️ {fmt_name}")
+    for name, draw, show in CASES:
+        avg, worst = timed(draw, False)
+        line = f"🖥️ {name:16s} draw {avg:6d} us (max {worst})"
+        if show:
+            avg, worst = timed(draw, True)
+            line += f", + show {avg:6d} us (max {worst})"
+        print(line)
+    lcd = None  # Free the buffer before allocating the next format
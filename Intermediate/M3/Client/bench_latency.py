@@ -0,0 +1,45 @@
+"""
+bench_latency.py
+
+Measures end-to-end command latency between the controller and a robot server.
+Each command carries a sequence number; the server acks it once the actuator
+call returns, and the client reports p50/p95/p99 round-trip and execution time.
+Run it on the controller instead of main.py, e.g. with `mpremote run bench_latency.py`.
+Without hardware, run it on a PC against the loopback servers: `python3 ../Host/host_run.py bench_latency.py`.
+"""
+
+from ble_controller_client import BLEControllerClient
+import time
+
+TARGET = "PicoTank"
+COUNT = 100
+# Commands that do not move the robot: stop the tank, hold the arm base where it is
+COMMAND = {"PicoTank": "S", "PicoArm": "B90"}
+
+ble = BLEControllerClient()
+ble.switch_target(TARGET)
+ble.connect()
+
+# Wait for connection and discovery
+deadline = time.ticks_add(time.ticks_ms(), 10_000)
+while not ble.tx_handle and time.ticks_diff(deadline, time.ticks_ms()) > 0:
+    time.sleep_ms(50)
+
+if not ble.tx_handle:
+    print("❌ Could not connect to", TARGET)
+else:
+    ble.enable_benchmark(COUNT)
+    for _ in range(COUNT):
+        ble.send_command(COMMAND[TARGET])
+        # Sends return at once; pace them so queueing does not dominate the round trip
+        while ble.write_stats()["pending"]:
+            ble.poll()
+            time.sleep_ms(1)
+        time.sleep_ms(50)
+    time.sleep_ms(1000)  # Let the last acks arrive
+
+    report = ble.latency_report()
+    print(f"📊 {report['samples']} samples, {report['lost']} lost, {report['superseded']} superseded, interval {ble.connection_info()['interval_us']} us")
+    print("   round trip  p50/p95/p99 (us):", report["rtt_us"])
+    print("   execution   p50/p95/p99 (us):", report["exec_us"])
+    ble.disconnect()
@@ -0,0 +1,118 @@
+"""
+bench_lcd.py
+
+Measures LCD frame times for the updates the controller GUI makes most often.
+Each case draws into the frame buffer and calls show(), which sends only the
+regions that changed; the full-frame case is the cost of every redraw before
+dirty tracking. Also reports boot-to-first-frame time and the fixed cost of
+a show() call (window setup for a single pixel).
+Every case runs for each frame buffer format, together with the RAM the
+display takes and the time of a full garbage collection with it allocated.
+Finally, a full frame is sent with show_chunks() at several slice sizes: the
+longest slice is the most a chunked flush can delay input handling.
+The log case adds one line to a LogPane (lcd_log.py), which sends its rows itself.
+Run it on the controller instead of main.py, e.g. with `mpremote run bench_lcd.py`.
+"""
+
+from lcd_display import LCDDisplay
+from lcd_log import LogPane
+import framebuf
+import gc
+import time
+
+ROUNDS = 20
+FORMATS = [("RGB565", framebuf.RGB565), ("GS8", framebuf.GS8), ("GS4", framebuf.GS4_HMSB)]
+SLICES = [512, 2048, 4096, 16384, 115200]
+
+lcd = None
+
+
+def full_frame(i):
+    lcd.fill(lcd.white)
+    lcd.text("Status: Connected", 20, 130, lcd.red)
+
+
+def status_line(i):
+    lcd.fill_rect(0, 130, lcd.width, 8, lcd.white)
+    lcd.text("Status: Connected" if i & 1 else "Status: Connecting...", 20, 130, lcd.red)
+
+
+def dpad(i):
+    # Joystick direction change: one arrow box deselected, another selected
+    lcd.fill_rect(94, 169, 50, 50, lcd.white)
+    lcd.rect(114, 169, 10, 10, lcd.red if i & 1 else lcd.black)
+    lcd.rect(134, 189, 10, 10, lcd.black if i & 1 else lcd.red)
+
+
+def status_and_dpad(i):
+    status_line(i)
+    dpad(i)
+
+
+def one_pixel(i):
+    lcd.pixel(0, 0, lcd.black if i & 1 else lcd.white)
+
+
+CASES = [
+    ("full frame", full_frame),
+    ("1 pixel", one_pixel),
+    ("status line", status_line),
+    ("d-pad", dpad),
+    ("status + d-pad", status_and_dpad),
+]
+
+for fmt_name, fmt in FORMATS:
+    gc.collect()
+    free = gc.mem_free()
+    start = time.ticks_us()
+    lcd = LCDDisplay(fmt=fmt)  # Runs the init sequence and sends the first (white) frame
+    boot_us = time.ticks_diff(time.ticks_us(), start)
+    gc.collect()
+    used = free - gc.mem_free()
+    start = time.ticks_us()
+    gc.collect()
+    gc_us = time.ticks_diff(time.ticks_us(), start)
+    print(f"🖥️ {fmt_name}: {used} bytes of RAM, gc.collect() {gc_us} us, free {gc.mem_free()}")
+    print(f"🖥️ boot to first frame: {boot_us} us (170 ms of it are the panel's reset/sleep-out waits)")
+
+    baseline = None
+    for name, draw in CASES:
+        times = []
+        sent = 0
+        for i in range(ROUNDS):
+            start = time.ticks_us()
+            draw(i)
+            sent = lcd.show()
+            times.append(time.ticks_diff(time.ticks_us(), start))
+        avg = sum(times) // len(times)
+        if baseline is None:
+            baseline = avg
+        print(f"🖥️ {name:15s} {avg:6d} us/frame (max {max(times)}), {sent:6d} bytes, "
+              f"{baseline / max(avg, 1):.1f}x vs full frame")
+
+    for slice_bytes in SLICES:
+        lcd.fill(lcd.white)
+        steps = 0
+        longest = 0
+        start = time.ticks_us()
+        last = start
+        for _ in lcd.show_chunks(slice_bytes):
+            now = time.ticks_us()
+            longest = max(longest, time.ticks_diff(now, last))
+            last = now
+            steps += 1
+        total = time.ticks_diff(time.ticks_us(), start)
+        print(f"🖥️ slice {slice_bytes:6d} bytes: full frame {total:6d} us in {steps:3d} steps, "
+              f"longest step {longest} us")
+
+    log = LogPane(lcd, 148, 2, lcd.black, lcd.white)
+    times = []
+    for i in range(ROUNDS):
+        start = time.ticks_us()
+        log.add(f"event {i}")
+        times.append(time.ticks_diff(time.ticks_us(), start))
+    print(f"🖥️ log line       {sum(times) // len(times):6d} us/line (max {max(times)}), "
+          f"{log.bytes_sent // ROUNDS:6d} bytes, hardware scroll: {log.hardware}")
+    log = None
+
+    lcd = None  # Free the buffer before allocating the next format
@@ -0,0 +1,66 @@
+"""
+bench_transfer.py
+
+Measures bulk transfer throughput from the controller to a robot server.
+Connects to the target, negotiates the MTU, then sends payloads of several
+sizes with send_large(). For each size it prints:
+  delivered: payload size over the time from the first write to the server's
+             receipt arriving back, i.e. what really got across the link
+  server:    payload size over the server's first-to-last fragment time
+Run it on the controller instead of main.py, e.g. with `mpremote run bench_transfer.py`.
+Without hardware, run it on a PC against the loopback servers: `python3 ../Host/host_run.py bench_transfer.py`.
+"""
+
+from ble_controller_client import BLEControllerClient
+import time
+
+TARGET = "PicoArm"
+SIZES = [64, 256, 1024]
+ROUNDS = 5
+RECEIPT_TIMEOUT_MS = 2000
+
+ble = BLEControllerClient()
+ble.switch_target(TARGET)
+ble.connect()
+
+# Wait for connection, discovery, and MTU exchange
+deadline = time.ticks_add(time.ticks_ms(), 10_000)
+while not (ble.tx_handle and ble.mtu > 23):
+    if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+        break
+    time.sleep_ms(50)
+
+if not ble.tx_handle:
+    print("❌ Could not connect to", TARGET)
+else:
+    print(f"📏 MTU: {ble.mtu}")
+    for size in SIZES:
+        payload = bytes(size)
+        delivered, server, lost = [], [], 0
+        for _ in range(ROUNDS):
+            ble.take_receipt()  # Drop a stale receipt
+            start = time.ticks_us()
+            if not ble.send_large(payload):
+                lost += 1
+                continue
+            deadline = time.ticks_add(time.ticks_ms(), RECEIPT_TIMEOUT_MS)
+            receipt = None
+            while receipt is None and time.ticks_diff(deadline, time.ticks_ms()) > 0:
+                ble.poll()
+                receipt = ble.take_receipt()
+                time.sleep_ms(1)
+            if receipt is None or receipt[0] != size:
+                lost += 1
+                continue
+            _, receive_us, arrival_us = receipt
+            delivered.append(size * 1_000_000 // max(time.ticks_diff(arrival_us, start), 1))
+            server.append(size * 1_000_000 // max(receive_us, 1))
+            time.sleep_ms(50)
+        if delivered:
+            print(f"📦 {size:5d} bytes: delivered {sum(delivered) // len(delivered)} bytes/s "
+                  f"(min {min(delivered)}, max {max(delivered)}), "
+                  f"server {sum(server) // len(server)} bytes/s, {lost} without receipt")
+        else:
+            print(f"📦 {size:5d} bytes: no receipts ({lost} lost)")
+        time.sleep_ms(200)
+    ble.disconnect()
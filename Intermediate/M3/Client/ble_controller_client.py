@@ -3,11 +3,22 @@ ble_controller_client.py
 
 Implements BLEControllerClient class for connecting to PicoTank and PicoArm BLE servers.
 Handles scanning, connecting, service/characteristic discovery, and command sending.
+Several robots can be connected at once; commands are routed by target name.
 """
 
 import bluetooth
 import time
 from micropython import const
+from ble_handle_cache import HandleCache
+from ble_peer import Peer
+from ble_profiles import DEFAULT_PROFILE, PROFILES, interval_range
+from ble_scan import DeviceCache, has_uuid128, name_equals
+from ble_protocol import (ACK_SUPERSEDED, ACK_V1, RECEIPT_V1, SEQ, encode_frame, pack_setpoints, parse_ascii,
+                          unpack_ack, unpack_receipt)
+from ble_rx_queue import RxQueue
+from ble_transfer import FRAG_V1, MAX_MTU, MAX_PAYLOAD, Fragmenter, payload_size
+from latency_stats import LatencyStats
+from telemetry import unpack as unpack_telemetry
 
 # BLE IRQ event constants
 _IRQ_SCAN_RESULT = const(5)
@@ -20,58 +31,151 @@ _IRQ_GATTC_CHARACTERISTIC_RESULT = const(11)
 _IRQ_GATTC_CHARACTERISTIC_DONE = const(12)
 _IRQ_GATTC_WRITE_DONE = const(17)
 _IRQ_GATTC_NOTIFY = const(18)
+_IRQ_MTU_EXCHANGED = const(21)
+_IRQ_CONNECTION_UPDATE = const(27)
+
+# conn_handle reported by _IRQ_PERIPHERAL_DISCONNECT when gap_connect times out
+_CONN_FAILED = const(0xFFFF)
+
+# Notification queue: each entry is tagged (conn_handle << 1) | kind
+_NOTIFY_RX = const(0)
+_NOTIFY_TELEMETRY = const(1)
+_NOTIFY_SLOTS = const(8)
+
+# Commands where only the latest value matters: an unsent command is replaced
+# by a newer one with the same key. Others (T, X, frames) are always sent.
+_COLLAPSE_KEYS = {
+    "PicoTank": {"F": "drive", "B": "drive", "L": "drive", "R": "drive", "S": "drive"},
+    "PicoArm": {"B": "B", "S": "S", "E": "E", "G": "G"},
+}
 
 class BLEControllerClient:
     """
     BLE client for connecting to PicoTank and PicoArm BLE servers.
     Handles scanning, connecting, service/characteristic discovery, and command sending.
+
+    Every robot has its own Peer (see ble_peer.py) holding its connection state,
+    so the tank and the arm can stay connected together. The active target is
+    the robot commands go to when no target is named; switching it is instant.
     """
-    def __init__(self):
+    def __init__(self, write_with_response=True, handle_cache_file=None, auto_reconnect=True):
         """
         Initialize BLE client and set up target device UUIDs.
+        Args:
+            write_with_response (bool): Acknowledge every command write (False trades
+                delivery confirmation for throughput)
+            handle_cache_file (str): Flash file that keeps discovered GATT handles
+                across resets (optional; handles are always cached in RAM)
+            auto_reconnect (bool): Reconnect on its own when a robot's link drops
         """
         self.ble = bluetooth.BLE()
         self.ble.active(True)
+        self.ble.config(mtu=MAX_MTU)  # Preferred MTU requested after discovery
         self.ble.irq(self._irq)
 
-        self.conn_handle = None
-        self.tx_handle = None
-        self.rx_handle = None
-        self.connected = False
+        # Callbacks run from poll(), never from the BLE IRQ
+        self.on_rx = None  # Callback taking (message (str), target name)
+        self.on_telemetry = None  # Callback taking (decoded telemetry dict, target name)
+        self.on_data = None  # Callback taking (payload sent with send_large(), target name)
+        self._notifications = RxQueue(_NOTIFY_SLOTS, payload_size(MAX_MTU))
+        self.event = None  # Optional uasyncio.ThreadSafeFlag set on every BLE event except scan results
+        self._fragmenter = Fragmenter()
+        self._transfer = None  # [peer, fragment generator, unsent fragment] of send_large()
 
-        # Target device name and UUID mappings
-        self.target_name = "PicoTank"  # default
-        self.target_uuids = None
-        self.service_start = None
-        self.service_end = None
+        # Connection setup: the stack runs one scan or gap_connect at a time, so
+        # connect requests wait in _pending until the previous one finishes
+        self.devices = DeviceCache()      # Where each robot was last seen
+        self._pending = []                # Peers waiting to be connected
+        self._scan_peer = None            # Peer the current scan is looking for
+        self._connecting = None           # Peer whose gap_connect is in progress
+        self._direct = None               # Address of a connect attempt made without scanning
+        self._by_conn = {}                # conn_handle -> Peer
+        self.auto_reconnect = auto_reconnect
+
+        # Connection parameters (see ble_profiles.py)
+        self.profile = DEFAULT_PROFILE
+
+        # GATT handle cache (see ble_handle_cache.py)
+        self._handles = HandleCache(handle_cache_file)
+
+        # Latency benchmark (see enable_benchmark)
+        self.bench = None
+        self._seq = 0
+        self._sent_at = {}                # seq -> time.ticks_us() when written
 
         self.service_uuids = {
             "PicoTank": {
                 "service": bluetooth.UUID("6E400001-B5A3-F393-E0A9-E50E24DCCA9E"),
                 "rx": bluetooth.UUID("6E400002-B5A3-F393-E0A9-E50E24DCCA9E"),
-                "tx": bluetooth.UUID("6E400003-B5A3-F393-E0A9-E50E24DCCA9E")
+                "tx": bluetooth.UUID("6E400003-B5A3-F393-E0A9-E50E24DCCA9E"),
+                "telemetry": bluetooth.UUID("6E400004-B5A3-F393-E0A9-E50E24DCCA9E")
             },
             "PicoArm": {
                 "service": bluetooth.UUID("7E400001-B5A3-F393-E0A9-E50E24DCCA9E"),
                 "rx": bluetooth.UUID("7E400002-B5A3-F393-E0A9-E50E24DCCA9E"),
-                "tx": bluetooth.UUID("7E400003-B5A3-F393-E0A9-E50E24DCCA9E")
+                "tx": bluetooth.UUID("7E400003-B5A3-F393-E0A9-E50E24DCCA9E"),
+                "telemetry": bluetooth.UUID("7E400004-B5A3-F393-E0A9-E50E24DCCA9E")
             }
         }
+        # One Peer per robot, created up front so nothing is allocated on connect
+        self.peers = {}
+        for name, uuids in self.service_uuids.items():
+            self.peers[name] = Peer(self.ble, name, uuids, write_with_response)
 
+        self.target_name = "PicoTank"  # default
         self.switch_target(self.target_name)
 
     def switch_target(self, name):
         """
-        Switch BLE target and update UUIDs.
+        Choose the robot that commands go to. Other connections stay open.
         Args:
             name (str): Target device name ("PicoTank" or "PicoArm")
         """
-        self.target_name = name
-        self.target_uuids = self.service_uuids.get(name)
-        if self.target_uuids:
-            print(f"🎯 Switched target to: {name}")
-        else:
+        if name not in self.peers:
             print(f"⚠️ Unknown target: {name}")
+            return
+        self.target_name = name
+        state = "connected" if self.peers[name].connected else "not connected"
+        print(f"🎯 Switched target to: {name} ({state})")
+
+    # State of the active target, kept as attributes for single-robot scripts
+    @property
+    def connected(self):
+        return self.peers[self.target_name].connected
+
+    @property
+    def conn_handle(self):
+        return self.peers[self.target_name].conn_handle
+
+    @property
+    def tx_handle(self):
+        return self.peers[self.target_name].tx_handle
+
+    @property
+    def mtu(self):
+        return self.peers[self.target_name].mtu
+
+    @property
+    def connecting(self):
+        """True while a connect request is queued, scanning or in progress."""
+        return bool(self._pending) or self._scan_peer is not None or self._connecting is not None
+
+    def is_connected(self, name):
+        """
+        Check whether a robot is connected and ready for commands.
+        Args:
+            name (str): Target name
+        Returns:
+            bool: True once its handles are known
+        """
+        peer = self.peers.get(name)
+        return bool(peer and peer.ready)
+
+    def _peer(self, name):
+        """
+        Return the Peer for a target name, or the active target's if name is None.
+        """
+        return self.peers.get(name or self.target_name)
 
     def _irq(self, event, data):
         """
@@ -80,99 +184,621 @@ class BLEControllerClient:
             event (int): BLE event code
             data (tuple): Event data
         """
+        if event != _IRQ_SCAN_RESULT and self.event is not None:
+            self.event.set()  # Wakes the task awaiting BLE activity once the IRQ returns
         if event == _IRQ_SCAN_RESULT:
-            addr_type, addr, _, _, adv_data = data
-            name = self.decode_name(adv_data)
-            print("🔍 Found device:", repr(name))
-            if name == self.target_name:
-                print("✅ Target found. Connecting...")
-                self.ble.gap_connect(addr_type, addr)
+            addr_type, addr, _, rssi, adv_data = data
+            peer = self._scan_peer
+            if peer is None:
+                return  # Results still queued after the scan was stopped
+            # Matched in place, so other devices cost no allocation. Servers
+            # advertise their service UUID, which also tells the tank and the arm
+            # apart; the name only arrives in the scan response.
+            if has_uuid128(adv_data, peer.uuid_bytes) or name_equals(adv_data, peer.name_bytes):
+                print(f"✅ {peer.name} found. Connecting...")
+                addr = bytes(addr)
+                self.devices.seen(addr, addr_type, rssi, peer.name)
+                self._scan_peer = None
                 self.ble.gap_scan(None)
+                self._connect_to(peer, addr_type, addr)
+            return
 
-        elif event == _IRQ_SCAN_DONE:
-            print("🔎 Scan complete.")
+        if event == _IRQ_SCAN_DONE:
+            if self._scan_peer is not None:
+                print(f"🔎 Scan complete, {self._scan_peer.name} not found.")
+                self._scan_peer.reconnect.failed("not found")
+                self._scan_peer = None
+                self._next_connect()
+            return
 
-        elif event == _IRQ_PERIPHERAL_CONNECT:
+        if event == _IRQ_PERIPHERAL_CONNECT:
+            conn_handle, _, addr = data
+            peer = self._connecting
+            self._connecting = None
+            self._direct = None
+            if peer is None:
+                self.ble.gap_disconnect(conn_handle)  # Not a connection we asked for
+                return
+            peer.conn_handle = conn_handle
+            peer.addr = bytes(addr)
+            self._by_conn[conn_handle] = peer
+            print(f"🔗 Connected to {peer.name}.")
+            elapsed = peer.reconnect.connected()
+            if elapsed is not None:
+                print(f"🔁 {peer.name} reconnected {elapsed} ms after the link was lost")
+            handles = self._handles.get(peer.addr, peer.name)
+            if handles:
+                # Known device: skip discovery and send straight away. The handles
+                # are checked by the first acknowledged write.
+                peer.tx_handle, peer.rx_handle, peer.telemetry_handle = handles
+                peer.handles_cached = True
+                print("⚡ Using cached handles.")
+                self._on_ready(peer)
+            else:
+                self._discover(peer)
+            self._next_connect()
+            return
+
+        if event == _IRQ_PERIPHERAL_DISCONNECT:
             conn_handle, _, _ = data
-            self.conn_handle = conn_handle
-            self.connected = True
-            print("🔗 Connected.")
-            self.ble.gattc_discover_services(conn_handle)
-
-        elif event == _IRQ_PERIPHERAL_DISCONNECT:
-            print("❌ Disconnected.")
-            self.connected = False
-            self.conn_handle = None
-            self.tx_handle = None
-            self.rx_handle = None
-
-        elif event == _IRQ_GATTC_SERVICE_RESULT:
+            if conn_handle == _CONN_FAILED:
+                peer = self._connecting
+                self._connecting = None
+                if peer is not None and self._direct is not None:
+                    # The robot is no longer where it was last seen: scan for it
+                    print(f"⚠️ {peer.name} not reachable at its last address.")
+                    self.devices.forget(self._direct)
+                    self._direct = None
+                    self._scan(peer)
+                else:
+                    print("❌ Connection attempt failed.")
+                    if peer is not None:
+                        peer.reconnect.failed("connect timeout")
+                    self._next_connect()
+                return
+            peer = self._by_conn.pop(conn_handle, None)
+            if peer is None:
+                return
+            print(f"❌ Disconnected from {peer.name}.")
+            peer.reset()
+            if peer.reconnect_pending:
+                # Profile switch: reconnect straight to the same device
+                peer.reconnect_pending = False
+                self._request(peer)
+            else:
+                # poll() starts the first attempt: a directed connect to the
+                # address it was just on, then a scan if that fails
+                peer.reconnect.lost("link lost")
+            return
+
+        # Everything else belongs to an established connection
+        peer = self._by_conn.get(data[0])
+        if peer is None:
+            return
+
+        if event == _IRQ_GATTC_SERVICE_RESULT:
             conn_handle, start, end, uuid = data
-            if uuid == self.target_uuids["service"]:
-                self.service_start = start
-                self.service_end = end
+            if uuid == peer.uuids["service"]:
+                peer.service_start = start
+                peer.service_end = end
 
         elif event == _IRQ_GATTC_SERVICE_DONE:
-            if self.service_start and self.service_end:
+            if peer.service_start and peer.service_end:
                 self.ble.gattc_discover_characteristics(
-                    self.conn_handle, self.service_start, self.service_end
+                    peer.conn_handle, peer.service_start, peer.service_end
                 )
 
         elif event == _IRQ_GATTC_CHARACTERISTIC_RESULT:
             conn_handle, def_handle, value_handle, properties, uuid = data
-            if uuid == self.target_uuids["rx"]:
-                self.tx_handle = value_handle
-            elif uuid == self.target_uuids["tx"]:
-                self.rx_handle = value_handle
+            if uuid == peer.uuids["rx"]:
+                peer.tx_handle = value_handle
+            elif uuid == peer.uuids["tx"]:
+                peer.rx_handle = value_handle
+            elif uuid == peer.uuids["telemetry"]:
+                peer.telemetry_handle = value_handle
 
         elif event == _IRQ_GATTC_CHARACTERISTIC_DONE:
-            print("📡 Characteristics discovered. Ready to send commands.")
+            print(f"📡 {peer.name} characteristics discovered. Ready to send commands.")
+            if peer.tx_handle:
+                self._handles.put(peer.addr, peer.name,
+                                  peer.tx_handle, peer.rx_handle, peer.telemetry_handle)
+            self._on_ready(peer)
+
+        elif event == _IRQ_GATTC_WRITE_DONE:
+            conn_handle, value_handle, status = data
+            if status == 0:
+                peer.handles_cached = False  # Handles confirmed
+                if peer.first_write_ms is None:
+                    peer.first_write_ms = peer.since_connect()
+                    print(f"⏱️ {peer.name} connect to first command: {peer.first_write_ms} ms")
+            elif peer.handles_cached:
+                self._rediscover(peer)
+            peer.writes.write_done(value_handle, status)
+
+        elif event == _IRQ_CONNECTION_UPDATE:
+            conn_handle, interval, latency, timeout, status = data
+            if status == 0:
+                peer.interval_us = interval * 1250   # 1.25 ms units
+                peer.latency = latency
+                peer.timeout_ms = timeout * 10       # 10 ms units
+                print(f"⏱️ {peer.name} connection interval: {peer.interval_us} us, latency {latency}")
+
+        elif event == _IRQ_MTU_EXCHANGED:
+            conn_handle, mtu = data
+            peer.mtu = mtu
+            print(f"📏 {peer.name} MTU negotiated: {mtu}")
 
         elif event == _IRQ_GATTC_NOTIFY:
+            # Messages and telemetry are only copied here and dispatched from
+            # poll(), so callbacks that redraw the LCD cannot stall BLE events.
+            # Acks and transfer receipts are timed here; fragments are
+            # reassembled here so a transfer cannot overflow the queue.
             conn_handle, value_handle, notify_data = data
-            msg = notify_data.decode().strip()
-            print(f"📩 Received notification: {msg}")
-            if self.on_rx:
-                self.on_rx(msg)
-
-    def decode_name(self, adv_data):
-        try:
-            i = 0
-            adv_data = bytes(adv_data)
-            while i < len(adv_data):
-                length = adv_data[i]
-                if length == 0:
-                    break
-                type_ = adv_data[i + 1]
-                if type_ == 0x09:  # Complete Local Name
-                    return adv_data[i + 2:i + 1 + length].decode("utf-8")
-                i += 1 + length
-        except Exception as e:
-            print("decode_name error:", e)
-        return None
-
-    def connect(self):
-        if self.target_name:
-            print(f"🔍 Scanning for {self.target_name}...")
-            self.ble.gap_scan(5000, 30000, 30000)
-
-    def disconnect(self):
-        if self.connected and self.conn_handle is not None:
-            self.ble.gap_disconnect(self.conn_handle)
-
-    def send_command(self, cmd):
-        if self.connected and self.tx_handle:
+            if value_handle == peer.telemetry_handle:
+                self._notifications.put(notify_data, (conn_handle << 1) | _NOTIFY_TELEMETRY)
+                return
+            if value_handle != peer.rx_handle:
+                return  # Arrived before discovery finished
+            if notify_data and notify_data[0] == ACK_V1:
+                self._on_ack(notify_data)
+                return
+            if notify_data and notify_data[0] == RECEIPT_V1:
+                receipt = unpack_receipt(notify_data)
+                if receipt is not None:
+                    peer.receipt = receipt + (time.ticks_us(),)
+                return
+            if notify_data and notify_data[0] == FRAG_V1:
+                payload = peer.reassembler.feed(notify_data)
+                if payload is not None:
+                    peer.received = bytes(payload)
+                return
+            self._notifications.put(notify_data, (conn_handle << 1) | _NOTIFY_RX)
+
+    def _discover(self, peer):
+        """
+        Run service and characteristic discovery on a robot's connection.
+        """
+        peer.service_start = None
+        peer.service_end = None
+        self.ble.gattc_discover_services(peer.conn_handle)
+
+    def _rediscover(self, peer):
+        """
+        Cached handles were rejected: forget them and discover on the live link.
+        Queued writes wait until discovery finishes.
+        """
+        print(f"⚠️ Cached handles for {peer.name} rejected, rediscovering...")
+        self._handles.forget(peer.addr, peer.name)
+        peer.handles_cached = False
+        peer.tx_handle = None
+        peer.rx_handle = None
+        peer.telemetry_handle = None
+        peer.writes.detach()
+        self._discover(peer)
+
+    def _on_ready(self, peer):
+        """
+        Start sending to a robot once its characteristic handles are known.
+        """
+        peer.ready_ms = peer.since_connect()
+        if not peer.mtu_requested:
+            peer.mtu_requested = True
+            self.ble.gattc_exchange_mtu(peer.conn_handle)
+        if peer.tx_handle:
+            peer.writes.attach(peer.conn_handle, peer.tx_handle)
+
+    def _connect_to(self, peer, addr_type, addr):
+        """
+        Connect to a robot using the interval range of the active profile.
+        Args:
+            peer (Peer): Robot being connected
+            addr_type (int): BLE address type
+            addr (bytes): BLE address
+        """
+        self._connecting = peer
+        peer.connect_started = time.ticks_ms()
+        min_us, max_us = interval_range(self.profile)
+        self.ble.gap_connect(addr_type, addr, 2000, min_us, max_us)
+
+    def _scan(self, peer):
+        """
+        Scan for a robot; the IRQ handler connects when it shows up.
+        """
+        print(f"🔍 Scanning for {peer.name}...")
+        self._scan_peer = peer
+        # Active scanning requests the scan response, which carries the name
+        self.ble.gap_scan(5000, 30000, 30000, True)
+
+    def _next_connect(self):
+        """
+        Start the next queued connection if no scan or connect is in progress.
+        Robots seen before are connected directly; others are scanned for first.
+        """
+        if self._scan_peer is not None or self._connecting is not None:
+            return
+        while self._pending:
+            peer = self._pending.pop(0)
+            if peer.connected:
+                continue
+            known = self.devices.find(peer.name)
+            if known:
+                print(f"⚡ Connecting to known {peer.name}...")
+                self._direct = known[1]
+                self._connect_to(peer, *known)
+            else:
+                self._scan(peer)
+            return
+
+    def set_profile(self, name, reconnect=False):
+        """
+        Select a connection-interval profile.
+        The profile is used for the next connection; with reconnect=True every
+        live link is dropped and re-established straight away with the new interval.
+        Args:
+            name (str): Profile name from ble_profiles.PROFILES ("drive" or "idle")
+            reconnect (bool): Apply immediately by reconnecting to the same devices
+        """
+        if name not in PROFILES:
+            print(f"⚠️ Unknown profile: {name}")
+            return
+        if name == self.profile:
+            return
+        self.profile = name
+        print(f"⚙️ Connection profile: {name}")
+        if reconnect:
+            for peer in tuple(self._by_conn.values()):
+                peer.reconnect_pending = True
+                self.ble.gap_disconnect(peer.conn_handle)
+
+    def connection_info(self, target=None):
+        """
+        Return the active profile and the connection parameters reported by the stack.
+        Args:
+            target (str): Robot to report on (default: the active target)
+        Returns:
+            dict: profile, requested_us (min, max), interval_us, latency, timeout_ms
+                (reported values are None until the stack sends a connection update),
+                ready_ms and first_write_ms (time from the connect request until the
+                handles were usable and until the first write was acknowledged)
+        """
+        peer = self._peer(target)
+        return {
+            "profile": self.profile,
+            "requested_us": interval_range(self.profile),
+            "interval_us": peer.interval_us,
+            "latency": peer.latency,
+            "timeout_ms": peer.timeout_ms,
+            "ready_ms": peer.ready_ms,
+            "first_write_ms": peer.first_write_ms,
+        }
+
+    def connect(self, target=None):
+        """
+        Connect to a robot, keeping any other connections open. Robots seen
+        before are connected straight away, others after scanning for them.
+        Requests made while another connection is being set up are queued.
+        Args:
+            target (str): Robot to connect (default: the active target)
+        """
+        peer = self._peer(target)
+        if peer is None:
+            return
+        peer.reconnect.enabled = self.auto_reconnect
+        self._request(peer)
+
+    def _request(self, peer):
+        """
+        Queue a connection to a robot unless it is connected or already queued.
+        """
+        if peer.connected or peer in self._pending \
+                or peer is self._connecting or peer is self._scan_peer:
+            return
+        self._pending.append(peer)
+        self._next_connect()
+
+    def connect_all(self):
+        """
+        Connect to every known robot, one after the other.
+        """
+        for name in self.peers:
+            self.connect(name)
+
+    def disconnect(self, target=None):
+        """
+        Disconnect a robot, or cancel its pending connection.
+        Args:
+            target (str): Robot to disconnect (default: the active target)
+        """
+        peer = self._peer(target)
+        if peer is None:
+            return
+        peer.reconnect_pending = False
+        peer.reconnect.cancel()
+        if peer in self._pending:
+            self._pending.remove(peer)
+        if peer is self._connecting:
+            # Cancelling reports a failed attempt, which moves on to the next request
+            self._direct = None
+            self._connecting = None
+            self.ble.gap_connect(None)
+        if peer is self._scan_peer:
+            self._scan_peer = None
+            self.ble.gap_scan(None)
+            self._next_connect()
+        if peer.connected:
+            self.ble.gap_disconnect(peer.conn_handle)
+
+    def send_command(self, cmd, target=None):
+        """
+        Queue one ASCII command and return immediately.
+        A movement command replaces an unsent one for the same motor or joint.
+        Args:
+            cmd (str): Command string, e.g. 'F' or 'B90'
+            target (str): Robot to send to (default: the active target)
+        """
+        peer = self._peer(target)
+        if self.bench:
+            # Tagged commands are never collapsed, so every one gets an ack
+            self._write(peer, self._tagged_frame([parse_ascii(cmd)]), cmd)
+        else:
+            key = _COLLAPSE_KEYS.get(peer.name, {}).get(cmd[:1]) if peer else None
+            self._write(peer, cmd.encode(), cmd, key)
+
+    def send_commands(self, commands, target=None):
+        """
+        Send several commands in a single BLE write using a binary frame.
+        Args:
+            commands (list): (cmd, arg) pairs, e.g. [("B", 90), ("S", 0), ("E", 0), ("G", 180)]
+            target (str): Robot to send to (default: the active target)
+        """
+        peer = self._peer(target)
+        if self.bench:
+            self._write(peer, self._tagged_frame(commands), commands)
+        else:
+            self._write(peer, encode_frame(commands), commands)
+
+    def send_setpoints(self, base, shoulder, elbow, gripper, target="PicoArm"):
+        """
+        Stream an arm pose as one 5-byte setpoint write (see ble_protocol.py).
+        Meant to be called at a fixed rate, so it does not print; an unsent pose
+        is replaced by the newer one.
+        Args:
+            base, shoulder, elbow, gripper (int): Joint angles in degrees
+            target (str): Robot to send to
+        Returns:
+            bool: True if the pose was queued
+        """
+        peer = self._peer(target)
+        if not (peer and peer.ready):
+            return False
+        peer.writes.put(pack_setpoints(base, shoulder, elbow, gripper), "pose")
+        return True
+
+    def enable_benchmark(self, samples=256):
+        """
+        Start benchmark mode. Every command is tagged with a sequence number and
+        the time it was written; the server acks once the actuator call returns.
+        Args:
+            samples (int): Number of latency samples to keep
+        """
+        self.bench = LatencyStats(samples)
+        self._sent_at = {}
+
+    def disable_benchmark(self):
+        """
+        Stop tagging commands.
+        Returns:
+            LatencyStats or None: The samples collected while benchmarking
+        """
+        bench = self.bench
+        self.bench = None
+        return bench
+
+    def latency_report(self):
+        """
+        Report round-trip and server execution latency percentiles.
+        Returns:
+            dict or None: See LatencyStats.report(); None if benchmark mode was never enabled
+        """
+        if self.bench is None:
+            return None
+        self.bench.lost = len(self._sent_at)
+        return self.bench.report()
+
+    def _tagged_frame(self, commands):
+        """
+        Build a frame led by a sequence tag and remember when it is sent.
+        """
+        self._seq = (self._seq + 1) & 0x7FFF
+        self._sent_at[self._seq] = time.ticks_us()
+        return encode_frame([(SEQ, self._seq)] + list(commands))
+
+    def _on_ack(self, data):
+        """
+        Match an ack notification to its command and record the latency.
+        """
+        now = time.ticks_us()
+        ack = unpack_ack(data)
+        if ack is None:
+            return
+        seq, exec_us = ack
+        sent = self._sent_at.pop(seq, None)
+        if sent is None or not self.bench:
+            return
+        if exec_us == ACK_SUPERSEDED:
+            # The server dropped it for a newer command; there is no latency to record
+            self.bench.superseded += 1
+        else:
+            self.bench.add(time.ticks_diff(now, sent), exec_us)
+
+    def send_large(self, data, target=None):
+        """
+        Start sending a payload of 1 to MAX_PAYLOAD (1024) bytes, split into
+        fragments that fit the negotiated MTU. Fragments use write-without-response
+        for throughput; those the stack has no buffer for yet are sent by later
+        poll() calls, so this returns at once. One payload is sent at a time.
+        The server confirms a complete payload with a receipt; see take_receipt().
+        Args:
+            data (bytes): Payload to send; must stay unchanged until it is sent
+            target (str): Robot to send to (default: the active target)
+        Returns:
+            bool: True if the transfer started, False if not connected or another
+                payload is still being sent
+        Raises:
+            ValueError: If the payload is empty or larger than the robot can receive
+        """
+        if not 0 < len(data) <= MAX_PAYLOAD:
+            raise ValueError("payload size out of range")
+        peer = self._peer(target)
+        if not (peer and peer.ready):
+            print("⚠️ Not connected or TX handle missing.")
+            return False
+        if self._transfer is not None:
+            return False
+        self._transfer = [peer, self._fragmenter.fragments(data, peer.mtu), None]
+        self._pump_transfer()
+        return True
+
+    def transfer_pending(self):
+        """
+        Check whether a send_large() payload still has fragments to send.
+        Returns:
+            bool: True until every fragment has been handed to the stack
+        """
+        return self._transfer is not None
+
+    def _pump_transfer(self):
+        """
+        Write fragments of the payload in progress until the stack runs out of buffers.
+        """
+        tx = self._transfer
+        while tx is not None:
+            peer = tx[0]
+            if not peer.ready:
+                self._transfer = None  # Link lost: abandon the rest of the payload
+                return
+            if tx[2] is None:
+                tx[2] = next(tx[1], None)
+                if tx[2] is None:
+                    self._transfer = None  # Payload complete
+                    return
             try:
-                self.ble.gattc_write(
-                    self.conn_handle, self.tx_handle, cmd.encode(), 1
-                )
-                print(f"➡️ Sent command: {cmd}")
-                time.sleep(0.3)  # 300 ms delay
-            except Exception as e:
-                print(f"❌ Failed to send command: {e}")
+                self.ble.gattc_write(peer.conn_handle, peer.tx_handle, tx[2], 0)
+            except OSError:
+                return  # Stack buffers full; the next poll() continues with this fragment
+            tx[2] = None
+
+    def take_receipt(self, target=None):
+        """
+        Return the last transfer receipt from a robot, once.
+        Args:
+            target (str): Robot to check (default: the active target)
+        Returns:
+            tuple or None: (size, receive_us, arrival_us): payload size, time the
+                server took from first to last fragment, and time.ticks_us() when
+                the receipt arrived here; None if no new receipt arrived
+        """
+        peer = self._peer(target)
+        if peer is None:
+            return None
+        receipt = peer.receipt
+        peer.receipt = None
+        return receipt
+
+    def poll(self):
+        """
+        Dispatch queued notifications, retry queued writes and send_large()
+        fragments the stack could not take yet, start reconnect attempts that
+        are due, and save newly discovered handles to flash.
+        Call this from the main loop.
+        """
+        self._dispatch_notifications()
+        for peer in self.peers.values():
+            if peer.received is not None:
+                payload = peer.received
+                peer.received = None
+                if self.on_data:
+                    self.on_data(payload, peer.name)
+            peer.writes.poll()
+            if peer.reconnect.due():
+                peer.reconnect.attempt()
+                print(f"🔁 Reconnecting to {peer.name} (attempt {peer.reconnect.attempts})...")
+                self._request(peer)
+        self._pump_transfer()
+        self._handles.save()
+
+    def _dispatch_notifications(self):
+        """
+        Pass every queued message and telemetry record to its callback.
+        """
+        queue = self._notifications
+        while True:
+            data = queue.peek()
+            if data is None:
+                break
+            tag = queue.tag()
+            peer = self._by_conn.get(tag >> 1)
+            try:
+                if peer is None:
+                    pass  # The robot disconnected before its notification was handled
+                elif tag & 1 == _NOTIFY_TELEMETRY:
+                    if self.on_telemetry:
+                        self.on_telemetry(unpack_telemetry(data), peer.name)
+                else:
+                    msg = bytes(data).decode().strip()
+                    print(f"📩 Received notification from {peer.name}: {msg}")
+                    if self.on_rx:
+                        self.on_rx(msg, peer.name)
+            except ValueError as e:
+                print("⚠️ Dropped invalid notification:", e)
+            finally:
+                queue.pop()
+
+    def notify_stats(self):
+        """
+        Return notification queue counters.
+        Returns:
+            dict: See RxQueue.stats()
+        """
+        return self._notifications.stats()
+
+    def reconnect_stats(self, target=None):
+        """
+        Return automatic reconnect counters.
+        Args:
+            target (str): Robot to report on (default: the active target)
+        Returns:
+            dict: See Reconnector.stats()
+        """
+        return self._peer(target).reconnect.stats()
+
+    def set_write_mode(self, with_response):
+        """
+        Choose how command writes are sent to every robot.
+        Args:
+            with_response (bool): True waits for each write to be acknowledged before
+                sending the next; False writes without response for lower latency
+        """
+        for peer in self.peers.values():
+            peer.writes.with_response = with_response
+
+    def write_stats(self, target=None):
+        """
+        Return outbound write queue counters.
+        Args:
+            target (str): Robot to report on (default: the active target)
+        Returns:
+            dict: See WriteQueue.stats()
+        """
+        return self._peer(target).writes.stats()
+
+    def _write(self, peer, payload, label, key=None):
+        if peer and peer.ready:
+            peer.writes.put(payload, key)
+            print(f"➡️ Queued command for {peer.name}: {label}")
         else:
             print("⚠️ Not connected or TX handle missing.")
 
     def set_rx_callback(self, callback):
-        """Set a callback function to handle incoming notifications."""
+        """Set a callback function taking (message, target name) to handle incoming notifications."""
         self.on_rx = callback
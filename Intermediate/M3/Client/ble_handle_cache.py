@@ -0,0 +1,84 @@
+"""
+ble_handle_cache.py
+
+Implements HandleCache, which remembers the GATT handles discovered on each
+robot so a reconnect can skip service and characteristic discovery.
+Entries are keyed by peer address and target name and kept in RAM; with a
+file path they are also saved to flash (from save(), outside the BLE IRQ)
+and survive a reset.
+"""
+
+import json
+
+
+class HandleCache:
+    """
+    Characteristic handles per (peer address, target name).
+
+    Args:
+        path (str): Flash file to load and save the cache (optional, RAM only if None)
+    """
+    def __init__(self, path=None):
+        self._path = path
+        self._entries = {}     # "addr-hex/target" -> [tx_handle, rx_handle, telemetry_handle]
+        self._dirty = False    # RAM entries changed since the last save()
+        if path:
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                pass  # No cache yet, or a corrupt one that will be rewritten
+
+    @staticmethod
+    def _key(addr, target):
+        return "%s/%s" % ("".join("%02x" % b for b in addr), target)
+
+    def get(self, addr, target):
+        """
+        Look up the handles of a device.
+        Args:
+            addr (bytes): Peer address
+            target (str): Target name, e.g. "PicoTank"
+        Returns:
+            list or None: [tx_handle, rx_handle, telemetry_handle], or None if unknown
+        """
+        return self._entries.get(self._key(addr, target))
+
+    def put(self, addr, target, tx_handle, rx_handle, telemetry_handle):
+        """
+        Store the handles found by discovery.
+        Args:
+            addr (bytes): Peer address
+            target (str): Target name
+            tx_handle (int): Handle the client writes commands to
+            rx_handle (int): Handle the server notifies replies on
+            telemetry_handle (int): Telemetry handle, or None if the server has none
+        """
+        entry = [tx_handle, rx_handle, telemetry_handle]
+        key = self._key(addr, target)
+        if self._entries.get(key) != entry:
+            self._entries[key] = entry
+            self._dirty = True
+
+    def forget(self, addr, target):
+        """
+        Drop the handles of a device, e.g. after its firmware changed.
+        Args:
+            addr (bytes): Peer address
+            target (str): Target name
+        """
+        if self._entries.pop(self._key(addr, target), None) is not None:
+            self._dirty = True
+
+    def save(self):
+        """
+        Write changed entries to flash. Call this from the main loop, not the BLE IRQ.
+        """
+        if not (self._dirty and self._path):
+            return
+        self._dirty = False
+        try:
+            with open(self._path, "w") as f:
+                json.dump(self._entries, f)
+        except OSError as e:
+            print("⚠️ Could not save handle cache:", e)
@@ -0,0 +1,76 @@
+"""
+ble_peer.py
+
+Implements Peer, the per-connection state BLEControllerClient keeps for each
+robot: characteristic handles, discovery progress, MTU, connection
+parameters, the robot's own write queue and reassembler, and its reconnect
+schedule.
+"""
+
+import time
+from ble_reconnect import Reconnector
+from ble_transfer import DEFAULT_MTU, Reassembler
+from ble_write_queue import WriteQueue
+
+
+class Peer:
+    """
+    One robot the controller can connect to.
+
+    Args:
+        ble: bluetooth.BLE instance
+        name (str): Target name, e.g. "PicoTank"
+        uuids (dict): "service", "rx", "tx" and "telemetry" UUIDs of the robot
+        write_with_response (bool): Write mode of the command queue
+    """
+    def __init__(self, ble, name, uuids, write_with_response=True):
+        self.name = name
+        self.uuids = uuids
+        # Raw bytes compared against scan results in the IRQ
+        self.name_bytes = name.encode()
+        self.uuid_bytes = bytes(uuids["service"])
+        self.writes = WriteQueue(ble, with_response=write_with_response)
+        self.reassembler = Reassembler()
+        self.addr = None                  # Address of the current or last connection
+        self.reconnect_pending = False    # Reconnect as soon as the link drops (profile switch)
+        self.reconnect = Reconnector()    # Automatic reconnects after the link is lost
+        self.connect_started = None       # time.ticks_ms() when gap_connect was called
+        self.received = None              # Reassembled payload waiting for poll()
+        self.receipt = None               # (size, receive_us, arrival_us) of the last transfer receipt
+        self.reset()
+
+    def reset(self):
+        """
+        Clear everything that belongs to a single connection.
+        """
+        self.conn_handle = None
+        self.tx_handle = None
+        self.rx_handle = None
+        self.telemetry_handle = None
+        self.service_start = None
+        self.service_end = None
+        self.mtu = DEFAULT_MTU
+        self.mtu_requested = False
+        self.handles_cached = False       # Handles came from the cache and no write has confirmed them
+        self.interval_us = None           # Reported by the stack after a connection update
+        self.latency = None
+        self.timeout_ms = None
+        self.ready_ms = None              # Connect request -> handles usable
+        self.first_write_ms = None        # Connect request -> first acknowledged write
+        self.writes.reset()
+
+    @property
+    def connected(self):
+        return self.conn_handle is not None
+
+    @property
+    def ready(self):
+        return self.conn_handle is not None and self.tx_handle is not None
+
+    def since_connect(self):
+        """
+        Milliseconds since gap_connect was called for this robot, or None.
+        """
+        if self.connect_started is None:
+            return None
+        return time.ticks_diff(time.ticks_ms(), self.connect_started)
@@ -0,0 +1,34 @@
+"""
+ble_profiles.py
+
+Named connection-parameter profiles for the controller's BLE links.
+
+A profile is the connection interval range passed to gap_connect(), the
+only connection parameters MicroPython lets the central choose. Peripheral
+latency and supervision timeout are left to the stack, and there is no call
+to renegotiate a live link, so switching profile on a live link means a
+quick directed reconnect (see BLEControllerClient.set_profile). The
+parameters in use, latency and timeout included, are reported through
+_IRQ_CONNECTION_UPDATE (see BLEControllerClient.connection_info).
+"""
+
+# name: (min_interval_us, max_interval_us)
+PROFILES = {
+    "drive": (7_500, 15_000),      # Shortest interval for teleoperation
+    "idle": (100_000, 200_000),    # Long interval to save power while parked
+}
+
+DEFAULT_PROFILE = "drive"
+
+
+def interval_range(name):
+    """
+    Return the connection interval range of a profile.
+    Args:
+        name (str): Profile name, e.g. "drive" or "idle"
+    Returns:
+        tuple: (min_interval_us, max_interval_us)
+    Raises:
+        KeyError: If the profile does not exist
+    """
+    return PROFILES[name]
@@ -0,0 +1,161 @@
+
+"""
+ble_rx_queue.py
+
+Implements RxQueue, a preallocated ring buffer for BLE writes.
+The BLE IRQ handler only copies each write into a free slot; the main loop
+drains the queue and runs the command handlers outside the interrupt.
+The clients use the same queue for notifications, tagging each with where
+it came from.
+"""
+
+import time
+from array import array
+
+
+class RxQueue:
+    """
+    Single-producer (IRQ) / single-consumer (main loop) ring of fixed-size slots.
+
+    Args:
+        slots (int): Number of writes that can be queued (default: 8).
+        slot_size (int): Maximum number of bytes stored per write (default: 20).
+    """
+    def __init__(self, slots=8, slot_size=20):
+        self._slots = slots
+        self._slot_size = slot_size
+        self._buf = bytearray(slots * slot_size)
+        self._mv = memoryview(self._buf)
+        self._lens = bytearray(slots)
+        self._stamps = array("I", [0] * slots)  # time.ticks_us() when each write arrived
+        self._tags = array("H", [0] * slots)    # Caller-defined 16-bit tag per write
+        # Indices run modulo 2 * slots so a full ring can be told apart from an empty one
+        self._head = 0                     # Next slot to fill (IRQ only)
+        self._tail = 0                     # Next slot to drain (main loop only)
+
+        # Statistics
+        self.max_depth = 0                 # Deepest the queue has been
+        self._peak = 0                     # Deepest since the last take_peak()
+        self.overflows = 0                 # Writes dropped because the queue was full
+        self.truncated = 0                 # Writes longer than slot_size
+        self.irq_max_us = 0                # Longest time spent handling a write IRQ
+        self.irq_last_us = 0
+
+    def depth(self):
+        """
+        Number of writes waiting to be processed.
+        Returns:
+            int: Queue depth
+        """
+        return (self._head - self._tail) % (2 * self._slots)
+
+    def take_peak(self):
+        """
+        Return the deepest the queue has been since the last call, and start
+        a new period. Unlike depth(), this shows bursts that poll() has
+        already drained.
+        Returns:
+            int: High-water mark of the period
+        """
+        peak = max(self._peak, self.depth())
+        self._peak = self.depth()
+        return peak
+
+    def put(self, data, tag=0):
+        """
+        Copy a write into the next free slot. Called from the BLE IRQ handler.
+        Args:
+            data (bytes): Value returned by gatts_read(), or notification data
+            tag (int): Returned by tag() when this write is drained (0-65535)
+        Returns:
+            bool: False if the queue was full and the write was dropped
+        """
+        depth = self.depth()
+        if depth == self._slots:
+            self.overflows += 1
+            return False
+
+        n = len(data)
+        if n > self._slot_size:
+            n = self._slot_size
+            data = memoryview(data)[:n]
+            self.truncated += 1
+        i = self._head % self._slots
+        offset = i * self._slot_size
+        self._buf[offset:offset + n] = data
+        self._lens[i] = n
+        self._stamps[i] = time.ticks_us()
+        self._tags[i] = tag
+        self._head = (self._head + 1) % (2 * self._slots)
+
+        if depth + 1 > self._peak:
+            self._peak = depth + 1
+        if depth + 1 > self.max_depth:
+            self.max_depth = depth + 1
+        return True
+
+    def record_irq(self, start_us):
+        """
+        Record how long the IRQ handler spent on a write.
+        Args:
+            start_us (int): time.ticks_us() value taken when the IRQ started
+        """
+        elapsed = time.ticks_diff(time.ticks_us(), start_us)
+        self.irq_last_us = elapsed
+        if elapsed > self.irq_max_us:
+            self.irq_max_us = elapsed
+
+    def peek(self):
+        """
+        Return the oldest queued write without removing it.
+        The view stays valid until pop() is called.
+        Returns:
+            memoryview or None: Write contents, or None if the queue is empty
+        """
+        if self._head == self._tail:
+            return None
+        i = self._tail % self._slots
+        offset = i * self._slot_size
+        return self._mv[offset:offset + self._lens[i]]
+
+    def arrival_us(self):
+        """
+        Return when the oldest queued write arrived.
+        Returns:
+            int: time.ticks_us() value recorded by put() (0 if the queue is empty)
+        """
+        if self._head == self._tail:
+            return 0
+        return self._stamps[self._tail % self._slots]
+
+    def tag(self):
+        """
+        Return the tag the oldest queued write was put with.
+        Returns:
+            int: Tag (0 if the queue is empty)
+        """
+        if self._head == self._tail:
+            return 0
+        return self._tags[self._tail % self._slots]
+
+    def pop(self):
+        """
+        Release the oldest queued write so its slot can be reused.
+        """
+        if self._head != self._tail:
+            self._tail = (self._tail + 1) % (2 * self._slots)
+
+    def stats(self):
+        """
+        Return queue and IRQ timing statistics.
+        Returns:
+            dict: depth, max_depth, overflows, truncated, irq_max_us, irq_last_us
+        """
+        return {
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "overflows": self.overflows,
+            "truncated": self.truncated,
+            "irq_max_us": self.irq_max_us,
+            "irq_last_us": self.irq_last_us,
+        }
@@ -0,0 +1,163 @@
+"""
+ble_scan.py
+
+Helpers for handling scan results in the BLE IRQ without allocating.
+The AD-structure functions work directly on the adv_data memoryview passed
+to _IRQ_SCAN_RESULT and compare bytes in place, so nothing is copied or
+decoded for the (many) devices that are not robots. DeviceCache remembers
+where robots were last seen so they can be reconnected without a scan.
+"""
+
+import time
+from micropython import const
+
+_ADV_TYPE_NAME = const(0x09)
+_ADV_TYPE_UUID128_COMPLETE = const(0x07)
+
+
+def find_field(adv_data, ad_type):
+    """
+    Find an AD structure in advertising or scan response data.
+    Args:
+        adv_data (memoryview/bytes): Raw payload
+        ad_type (int): AD type to look for, e.g. 0x09 for the complete local name
+    Returns:
+        int: Offset of the field's value, or -1 if not found
+    """
+    i = 0
+    end = len(adv_data)
+    while i + 1 < end:
+        length = adv_data[i]
+        if length == 0 or i + 1 + length > end:
+            break  # Padding or a malformed payload
+        if adv_data[i + 1] == ad_type:
+            return i + 2
+        i += 1 + length
+    return -1
+
+
+def _equals_at(adv_data, offset, value):
+    """Compare len(value) bytes of adv_data at offset with value, without slicing."""
+    for j in range(len(value)):
+        if adv_data[offset + j] != value[j]:
+            return False
+    return True
+
+
+def has_uuid128(adv_data, uuid_bytes):
+    """
+    Check whether the complete list of 128-bit service UUIDs contains a UUID.
+    Args:
+        adv_data (memoryview/bytes): Raw payload
+        uuid_bytes (bytes): bytes(bluetooth.UUID(...)), computed once by the caller
+    Returns:
+        bool: True if the UUID is advertised
+    """
+    offset = find_field(adv_data, _ADV_TYPE_UUID128_COMPLETE)
+    if offset < 0:
+        return False
+    end = offset - 1 + adv_data[offset - 2]
+    while offset + 16 <= end:
+        if _equals_at(adv_data, offset, uuid_bytes):
+            return True
+        offset += 16
+    return False
+
+
+def name_equals(adv_data, name_bytes):
+    """
+    Check whether the complete local name equals the given bytes.
+    Args:
+        adv_data (memoryview/bytes): Raw payload
+        name_bytes (bytes): Encoded name, computed once by the caller
+    Returns:
+        bool: True if the name matches
+    """
+    offset = find_field(adv_data, _ADV_TYPE_NAME)
+    if offset < 0 or adv_data[offset - 2] - 1 != len(name_bytes):
+        return False
+    return _equals_at(adv_data, offset, name_bytes)
+
+
+def decode_name(adv_data):
+    """
+    Decode the complete local name. Allocates, so use it only for matched devices.
+    Args:
+        adv_data (memoryview/bytes): Raw payload
+    Returns:
+        str or None: Device name, or None if there is none
+    """
+    offset = find_field(adv_data, _ADV_TYPE_NAME)
+    if offset < 0:
+        return None
+    try:
+        return bytes(adv_data[offset:offset - 1 + adv_data[offset - 2]]).decode()
+    except UnicodeError:
+        return None
+
+
+class DeviceCache:
+    """
+    Where each known robot was last seen, keyed by address.
+
+    Args:
+        size (int): Maximum number of devices kept; the least recently seen is evicted
+    """
+    def __init__(self, size=8):
+        self._size = size
+        self._devices = {}     # addr (bytes) -> [name, addr_type, rssi, last_seen_ms]
+
+    def seen(self, addr, addr_type, rssi, name):
+        """
+        Record a sighting of a device.
+        Args:
+            addr (bytes): Device address (a copy, not the IRQ memoryview)
+            addr_type (int): BLE address type
+            rssi (int): Signal strength in dBm
+            name (str): Device name
+        """
+        entry = self._devices.get(addr)
+        if entry is None:
+            if len(self._devices) >= self._size:
+                oldest = min(self._devices, key=lambda a: self._devices[a][3])
+                del self._devices[oldest]
+            self._devices[addr] = [name, addr_type, rssi, time.ticks_ms()]
+        else:
+            entry[0] = name
+            entry[1] = addr_type
+            entry[2] = rssi
+            entry[3] = time.ticks_ms()
+
+    def find(self, name):
+        """
+        Return the most recently seen device with a name.
+        Args:
+            name (str): Device name, e.g. "PicoTank"
+        Returns:
+            tuple or None: (addr_type, addr), or None if the name is unknown
+        """
+        best = None
+        for addr, entry in self._devices.items():
+            if entry[0] == name and (best is None or time.ticks_diff(entry[3], best[1][3]) > 0):
+                best = (addr, entry)
+        if best is None:
+            return None
+        return best[1][1], best[0]
+
+    def get(self, addr):
+        """
+        Look up a device.
+        Args:
+            addr (bytes): Device address
+        Returns:
+            list or None: [name, addr_type, rssi, last_seen_ms]
+        """
+        return self._devices.get(addr)
+
+    def forget(self, addr):
+        """
+        Remove a device, e.g. after a direct connection to it failed.
+        Args:
+            addr (bytes): Device address
+        """
+        self._devices.pop(addr, None)
@@ -0,0 +1,184 @@
+
+"""
+ble_transfer.py
+
+Fragmentation and reassembly of payloads larger than one ATT packet, such as
+recorded arm trajectories, telemetry batches, or config blobs.
+
+Each fragment travels in one write or notification:
+
+    offset 0   uint8    FRAG_V1 (0x82)
+    offset 1   uint8    transfer id (wraps at 256)
+    offset 2   uint8    fragment index within the transfer (wraps at 256)
+    offset 3   uint16   total payload length, little-endian
+    offset 5   ...      payload bytes, up to MTU - 8 per fragment
+
+BLE delivers writes and notifications on one connection in order, so a
+fragment that arrives out of sequence means the transfer was broken.
+
+Payloads are 1 to MAX_PAYLOAD bytes: that is the buffer every Reassembler on
+the robots and the controller allocates, and larger transfers are aborted
+on arrival. Senders check the size before sending anything.
+"""
+
+import struct
+import time
+from micropython import const
+
+FRAG_V1 = const(0x82)
+HEADER_SIZE = const(5)
+ATT_OVERHEAD = const(3)     # ATT opcode + handle in every write/notification
+DEFAULT_MTU = const(23)     # MTU before any exchange
+MAX_MTU = const(247)        # Largest MTU requested (fits one LE data packet)
+MAX_PAYLOAD = const(1024)   # Largest payload a default Reassembler accepts
+
+_HEADER = "<BBBH"
+
+
+def payload_size(mtu):
+    """
+    Largest write or notification value for an MTU.
+    Args:
+        mtu (int): Negotiated ATT MTU
+    Returns:
+        int: Bytes available per write or notification
+    """
+    return mtu - ATT_OVERHEAD
+
+
+def chunk_size(mtu):
+    """
+    Payload bytes carried by one fragment at a given MTU.
+    Args:
+        mtu (int): Negotiated ATT MTU
+    Returns:
+        int: Bytes of payload per fragment
+    """
+    return payload_size(mtu) - HEADER_SIZE
+
+
+class Fragmenter:
+    """
+    Splits a payload into fragments using one preallocated buffer.
+
+    Args:
+        max_mtu (int): Largest MTU that will be used (default: MAX_MTU)
+    """
+    def __init__(self, max_mtu=MAX_MTU):
+        self._buf = bytearray(payload_size(max_mtu))
+        self._mv = memoryview(self._buf)
+        self._max_chunk = chunk_size(max_mtu)
+        self._transfer_id = 0
+
+    def fragments(self, data, mtu):
+        """
+        Yield the fragments of a payload. Each fragment is a memoryview into
+        a shared buffer and is only valid until the next one is produced.
+        Args:
+            data (bytes): Payload, at most 65535 bytes (MAX_PAYLOAD for a default receiver)
+            mtu (int): Negotiated ATT MTU of the connection
+        """
+        size = len(data)
+        if size > 0xFFFF:
+            raise ValueError("payload too large")
+        step = min(chunk_size(mtu), self._max_chunk)
+        self._transfer_id = (self._transfer_id + 1) & 0xFF
+        src = memoryview(data)
+        index = 0
+        for offset in range(0, size, step):
+            n = min(step, size - offset)
+            struct.pack_into(_HEADER, self._buf, 0, FRAG_V1, self._transfer_id, index & 0xFF, size)
+            self._mv[HEADER_SIZE:HEADER_SIZE + n] = src[offset:offset + n]
+            yield self._mv[:HEADER_SIZE + n]
+            index += 1
+
+
+class Reassembler:
+    """
+    Rebuilds payloads from fragments into one preallocated buffer.
+
+    Args:
+        max_size (int): Largest payload that can be received (default: MAX_PAYLOAD)
+    """
+    def __init__(self, max_size=MAX_PAYLOAD):
+        self._buf = bytearray(max_size)
+        self._mv = memoryview(self._buf)
+        self._id = None             # Transfer in progress, or None
+        self._expected = 0          # Next fragment index
+        self._received = 0          # Payload bytes received so far
+        self._total = 0             # Payload size announced by the first fragment
+        self._start = 0
+
+        # Statistics
+        self.completed = 0          # Payloads fully received
+        self.errors = 0             # Transfers abandoned (oversize, gap, or overrun)
+        self.last_size = 0          # Size of the last completed payload
+        self.last_us = 0            # Time from first to last fragment of that payload
+
+    def feed(self, fragment):
+        """
+        Add one fragment to the transfer in progress.
+        Args:
+            fragment (memoryview/bytes): One write or notification starting with FRAG_V1
+        Returns:
+            memoryview or None: The complete payload once the last fragment arrives.
+                It stays valid until the next call to feed().
+        """
+        if len(fragment) < HEADER_SIZE:
+            return self._abort()
+        _, transfer_id, index, total = struct.unpack_from(_HEADER, fragment, 0)
+        if transfer_id == self._id and index == self._expected:
+            pass  # Next fragment of the transfer in progress
+        elif index == 0:
+            if total > len(self._buf):
+                return self._abort()
+            self._id = transfer_id
+            self._expected = 0
+            self._received = 0
+            self._total = total
+            self._start = time.ticks_us()
+        else:
+            return self._abort()
+
+        n = len(fragment) - HEADER_SIZE
+        if self._received + n > self._total:
+            return self._abort()
+        self._mv[self._received:self._received + n] = fragment[HEADER_SIZE:]
+        self._received += n
+        self._expected = (self._expected + 1) & 0xFF
+
+        if self._received < self._total:
+            return None
+        self._id = None
+        self.completed += 1
+        self.last_size = self._total
+        self.last_us = time.ticks_diff(time.ticks_us(), self._start)
+        return self._mv[:self._total]
+
+    def _abort(self):
+        self._id = None
+        self.errors += 1
+        return None
+
+    def rate(self):
+        """
+        Throughput of the last completed transfer.
+        Returns:
+            int: Bytes per second (0 if unknown)
+        """
+        if self.last_us <= 0:
+            return 0
+        return self.last_size * 1_000_000 // self.last_us
+
+    def stats(self):
+        """
+        Return transfer counters and the last measured throughput.
+        Returns:
+            dict: completed, errors, last_size, bytes_per_s
+        """
+        return {
+            "completed": self.completed,
+            "errors": self.errors,
+            "last_size": self.last_size,
+            "bytes_per_s": self.rate(),
+        }
@@ -0,0 +1,66 @@
+"""
+icons.py
+
+GUI icons as packed sprites (see lcd_sprites.py).
+Generated by make_icons.py; edit that instead.
+"""
+
+from lcd_sprites import Sprite
+
+ARROW_UP = Sprite(10, 10, 1, (
+    b"\xff\xc0\x80\x40\x8c\x40\x9e\x40\xbf\x40\x8c\x40\x8c\x40\x8c\x40"
+    b"\x80\x40\xff\xc0"
+), (None, "black"))
+
+ARROW_DOWN = Sprite(10, 10, 1, (
+    b"\xff\xc0\x80\x40\x8c\x40\x8c\x40\x8c\x40\xbf\x40\x9e\x40\x8c\x40"
+    b"\x80\x40\xff\xc0"
+), (None, "black"))
+
+ARROW_LEFT = Sprite(10, 10, 1, (
+    b"\xff\xc0\x80\x40\x88\x40\x98\x40\xbf\x40\xbf\x40\x98\x40\x88\x40"
+    b"\x80\x40\xff\xc0"
+), (None, "black"))
+
+ARROW_RIGHT = Sprite(10, 10, 1, (
+    b"\xff\xc0\x80\x40\x84\x40\x86\x40\xbf\x40\xbf\x40\x86\x40\x84\x40"
+    b"\x80\x40\xff\xc0"
+), (None, "black"))
+
+STOP = Sprite(10, 10, 1, (
+    b"\xff\xc0\x80\x40\xb3\x40\x9e\x40\x8c\x40\x8c\x40\x9e\x40\xb3\x40"
+    b"\x80\x40\xff\xc0"
+), (None, "black"))
+
+TANK = Sprite(16, 16, 2, (
+    b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+    b"\x00\x54\x15\x00\x00\x54\x55\x55\x00\x54\x15\x00\x50\x55\x55\x05"
+    b"\x54\x55\x55\x15\xa8\xaa\xaa\x2a\x82\x20\x08\x82\x82\x20\x08\x82"
+    b"\xa8\xaa\xaa\x2a\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+), (None, "green", "black"))
+
+ARM = Sprite(16, 16, 2, (
+    b"\x00\x00\x00\x00\x00\x00\x80\x20\x00\x00\x80\x2a\x00\x00\x00\x05"
+    b"\x00\x00\x40\x01\x00\x00\x50\x00\x00\x55\x29\x00\x40\x01\x00\x00"
+    b"\x40\x01\x00\x00\x40\x01\x00\x00\x40\x01\x00\x00\x40\x01\x00\x00"
+    b"\xa0\x0a\x00\x00\xa8\x2a\x00\x00\xaa\xaa\x00\x00\x00\x00\x00\x00"
+), (None, "blue", "black"))
+
+LINK = Sprite(16, 16, 2, (
+    b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x3f"
+    b"\x00\x00\x00\x3f\x00\x00\x00\x3f\x00\x00\x00\x3f\x00\x00\x2a\x3f"
+    b"\x00\x00\x2a\x3f\x00\x00\x2a\x3f\x00\x00\x2a\x3f\x00\x15\x2a\x3f"
+    b"\x00\x15\x2a\x3f\x00\x15\x2a\x3f\x00\x15\x2a\x3f\x00\x00\x00\x00"
+), (None, "green", "green", "green"))
+
+OBSTACLE = Sprite(16, 16, 2, (
+    b"\x00\x00\x00\x00\x00\x40\x01\x00\x00\x40\x01\x00\x00\x50\x05\x00"
+    b"\x00\x90\x06\x00\x00\x94\x16\x00\x00\x94\x16\x00\x00\x95\x56\x00"
+    b"\x00\x95\x56\x00\x40\x95\x56\x01\x40\x55\x55\x01\x50\x95\x56\x05"
+    b"\x50\x95\x56\x05\x54\x55\x55\x15\x54\x55\x55\x15\x00\x00\x00\x00"
+), (None, "red", "white"))
+
+CLEAR = Sprite(16, 16, 1, (
+    b"\x00\x00\x00\x00\x00\x03\x00\x07\x00\x0e\x00\x1c\x00\x38\x60\x70"
+    b"\x70\xe0\x39\xc0\x1f\x80\x0f\x00\x06\x00\x00\x00\x00\x00\x00\x00"
+), (None, "green"))
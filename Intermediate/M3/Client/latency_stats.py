@@ -0,0 +1,73 @@
+"""
+latency_stats.py
+
+Implements LatencyStats, a fixed-size sample store for command latency
+benchmarks. Records round-trip and server execution times from sequence
+acks and reports p50/p95/p99.
+"""
+
+from array import array
+
+
+def _percentile(sorted_samples, pct):
+    """Return the pct-th percentile (nearest rank) of a sorted sequence."""
+    if not sorted_samples:
+        return None
+    index = (len(sorted_samples) * pct + 99) // 100 - 1
+    return sorted_samples[max(0, index)]
+
+
+class LatencyStats:
+    """
+    Keeps the most recent latency samples in preallocated arrays.
+
+    Args:
+        size (int): Number of samples kept (default: 256)
+    """
+    def __init__(self, size=256):
+        self._rtt = array("I", [0] * size)
+        self._exec = array("I", [0] * size)
+        self._size = size
+        self._next = 0
+        self.count = 0       # Samples recorded (including overwritten ones)
+        self.lost = 0        # Commands whose ack never arrived
+        self.superseded = 0  # Commands the server replaced before running them
+
+    def add(self, rtt_us, exec_us):
+        """
+        Record one acknowledged command.
+        Args:
+            rtt_us (int): Time from write to ack notification on the client
+            exec_us (int): Execution time reported by the server
+        """
+        self._rtt[self._next] = rtt_us
+        self._exec[self._next] = exec_us
+        self._next = (self._next + 1) % self._size
+        self.count += 1
+
+    def report(self):
+        """
+        Compute latency percentiles over the stored samples.
+        Returns:
+            dict: samples, lost, superseded, and (p50, p95, p99) tuples in microseconds for
+                "rtt_us" and "exec_us"
+        """
+        n = min(self.count, self._size)
+        rtt = sorted(self._rtt[:n])
+        exe = sorted(self._exec[:n])
+        return {
+            "samples": n,
+            "lost": self.lost,
+            "superseded": self.superseded,
+            "rtt_us": (_percentile(rtt, 50), _percentile(rtt, 95), _percentile(rtt, 99)),
+            "exec_us": (_percentile(exe, 50), _percentile(exe, 95), _percentile(exe, 99)),
+        }
+
+    def reset(self):
+        """
+        Discard all samples.
+        """
+        self._next = 0
+        self.count = 0
+        self.lost = 0
+        self.superseded = 0
@@ -0,0 +1,92 @@
+"""
+lcd_log.py
+
+Implements LogPane, a scrolling event log in a band of full-width text rows.
+Adding a line draws one 8-pixel row into the frame buffer and sends just that
+row, instead of redrawing and pushing the whole frame.
+
+If the display's orientation lets the controller scroll screen rows (see
+LCDDisplay.scrolls_vertically), the pane is a hardware scrolling area: the
+new line overwrites the oldest one in frame memory and VSCSAD moves it to
+the bottom. Otherwise the lines stay in ring order, the newest marked with
+'>', which costs one extra row write to unmark the previous one.
+"""
+
+import framebuf
+
+_ROW = 8  # Built-in font is 8x8
+
+
+class LogPane:
+    """
+    Event log using rows y to y + 8 * lines of the display.
+
+    Args:
+        lcd (LCDDisplay): Display to draw on
+        y (int): Top row of the pane
+        lines (int): Number of log lines shown
+        color (int): Text color
+        background (int): Pane background color
+    """
+    def __init__(self, lcd, y, lines, color, background):
+        self.lcd = lcd
+        self.y = y
+        self.lines = lines
+        self.color = color
+        self.background = background
+        self.hardware = lcd.scrolls_vertically
+        self._texts = [""] * lines     # Text in each slot, in frame memory order
+        self._next = 0                 # Slot the next line goes into
+        self._chars = lcd.width // _ROW - (0 if self.hardware else 1)
+
+        # Statistics
+        self.added = 0                 # Lines logged
+        self.bytes_sent = 0            # Pixel bytes sent for them
+
+        # Drawn straight into the buffer, bypassing change tracking: every
+        # update is sent right away with show_rect()
+        framebuf.FrameBuffer.fill_rect(lcd, 0, y, lcd.width, lines * _ROW, background)
+        lcd.show_rect(0, y, lcd.width, lines * _ROW)
+        if self.hardware:
+            lcd.set_scroll_area(y, lines * _ROW)
+            lcd.scroll_to(y)
+
+    def _draw_slot(self, slot, newest):
+        lcd = self.lcd
+        row = self.y + slot * _ROW
+        framebuf.FrameBuffer.fill_rect(lcd, 0, row, lcd.width, _ROW, self.background)
+        text = self._texts[slot]
+        if not self.hardware:
+            text = (">" if newest else " ") + text
+        framebuf.FrameBuffer.text(lcd, text, 0, row, self.color)
+        lcd.show_rect(0, row, lcd.width, _ROW)
+        self.bytes_sent += lcd.width * _ROW * 2
+
+    def add(self, text):
+        """
+        Append a line, dropping the oldest one.
+        Args:
+            text (str): Line to log; cut to the pane width
+        """
+        slot = self._next
+        self._texts[slot] = text[:self._chars]
+        self._next = (slot + 1) % self.lines
+        self._draw_slot(slot, True)
+        if self.hardware:
+            # The oldest line (the next slot) becomes the top of the pane
+            self.lcd.scroll_to(self.y + self._next * _ROW)
+        elif self.added:
+            self._draw_slot((slot - 1) % self.lines, False)
+        self.added += 1
+
+    def stats(self):
+        """
+        Return logging counters.
+        Returns:
+            dict: added, bytes_sent, hardware
+        """
+        return {
+            "added": self.added,
+            "bytes_sent": self.bytes_sent,
+            "hardware": self.hardware,
+        }
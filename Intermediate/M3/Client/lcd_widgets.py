@@ -0,0 +1,198 @@
+"""
+lcd_widgets.py
+
+A small retained-mode widget layer for LCDDisplay. Widgets keep their value
+and only mark themselves dirty when it changes; Screen.render() clears and
+redraws just the dirty widgets, so the next LCDDisplay.show() sends only
+their rectangles. Static labels are drawn once by the caller and never
+touched again. Indicators and icons are sprites (see lcd_sprites.py), drawn
+with one blit each.
+"""
+
+_CHAR = 8  # Built-in font is 8x8
+
+
+class Widget:
+    """
+    Base class: a rectangle on screen that redraws itself when dirty.
+
+    Args:
+        x, y (int): Top-left corner
+        w, h (int): Size in pixels
+    """
+    def __init__(self, x, y, w, h):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.dirty = True          # Draw on the first render
+
+    def bounds(self):
+        """
+        Return the rectangle the next render() clears and redraws.
+        Returns:
+            tuple: (x, y, w, h)
+        """
+        return self.x, self.y, self.w, self.h
+
+    def draw(self, lcd):
+        """
+        Draw the widget; its bounds have already been cleared.
+        Args:
+            lcd (LCDDisplay): Display to draw on
+        """
+        raise NotImplementedError
+
+
+class Label(Widget):
+    """
+    One line of text, optionally after a fixed prefix (e.g. "Status: ").
+
+    Args:
+        x, y (int): Position of the first character
+        text (str): Initial value
+        color (int): Text color
+        prefix (str): Text drawn in front of the value
+    """
+    def __init__(self, x, y, text="", color=0, prefix=""):
+        super().__init__(x, y, 0, _CHAR)
+        self.prefix = prefix
+        self.text = text
+        self.color = color
+        self._drawn = 0            # Width of the text on screen, in pixels
+
+    def set(self, text, color=None):
+        """
+        Change the value; the label is redrawn only if something changed.
+        Args:
+            text (str): New value
+            color (int): New color (default: unchanged)
+        """
+        if color is None:
+            color = self.color
+        if text != self.text or color != self.color:
+            self.text = text
+            self.color = color
+            self.dirty = True
+
+    def bounds(self):
+        # Covers the old text as well, so a shorter value leaves nothing behind
+        return self.x, self.y, max(self._drawn, _CHAR * (len(self.prefix) + len(self.text))), _CHAR
+
+    def draw(self, lcd):
+        line = self.prefix + self.text
+        lcd.text(line, self.x, self.y, self.color)
+        self._drawn = _CHAR * len(line)
+
+
+class Indicator(Widget):
+    """
+    A one-color sprite that is highlighted while on, e.g. one arrow of the D-pad.
+
+    Args:
+        x, y (int): Top-left corner
+        sprite (Sprite): 1-bit sprite; value 0 is left transparent
+        on_color (int): Color while on
+        off_color (int): Color while off
+    """
+    def __init__(self, x, y, sprite, on_color, off_color):
+        super().__init__(x, y, sprite.width, sprite.height)
+        self.sprite = sprite
+        self._on_colors = (None, on_color)     # Same tuples every draw: cached palettes
+        self._off_colors = (None, off_color)
+        self.on = False
+
+    def set(self, on):
+        """
+        Switch the indicator on or off; it is redrawn only if the state changed.
+        Args:
+            on (bool): New state
+        """
+        on = bool(on)
+        if on != self.on:
+            self.on = on
+            self.dirty = True
+
+    def draw(self, lcd):
+        self.sprite.draw(lcd, self.x, self.y, self._on_colors if self.on else self._off_colors)
+
+
+class Icon(Widget):
+    """
+    A sprite that shows a state, e.g. the link quality or the obstacle sign.
+
+    Args:
+        x, y (int): Top-left corner
+        states (dict): state -> (Sprite, colors), colors as for Sprite.draw()
+            (None for the sprite's own); all sprites the same size
+        state: Initial state
+    """
+    def __init__(self, x, y, states, state):
+        sprite = states[state][0]
+        super().__init__(x, y, sprite.width, sprite.height)
+        self.states = states
+        self.state = state
+
+    def set(self, state):
+        """
+        Change the state; the icon is redrawn only if it changed.
+        Args:
+            state: A key of states
+        """
+        if state != self.state:
+            self.state = state
+            self.dirty = True
+
+    def draw(self, lcd):
+        sprite, colors = self.states[self.state]
+        sprite.draw(lcd, self.x, self.y, colors)
+
+
+class Screen:
+    """
+    The widgets on one LCD, redrawn as needed.
+
+    Args:
+        lcd (LCDDisplay): Display to draw on
+        background (int): Color used to clear a widget before redrawing it
+    """
+    def __init__(self, lcd, background):
+        self.lcd = lcd
+        self.background = background
+        self.widgets = []
+
+    def add(self, widget):
+        """
+        Add a widget to the screen.
+        Args:
+            widget (Widget): Widget to manage
+        Returns:
+            Widget: The same widget, for chaining
+        """
+        self.widgets.append(widget)
+        return widget
+
+    def invalidate(self):
+        """
+        Mark every widget dirty, e.g. after the static layout was redrawn.
+        """
+        for widget in self.widgets:
+            widget.dirty = True
+
+    def render(self):
+        """
+        Clear and redraw every dirty widget. Call lcd.show() afterwards to send them.
+        Returns:
+            list: (x, y, w, h) of every widget redrawn
+        """
+        lcd = self.lcd
+        redrawn = []
+        for widget in self.widgets:
+            if not widget.dirty:
+                continue
+            x, y, w, h = widget.bounds()
+            lcd.fill_rect(x, y, w, h, self.background)
+            widget.draw(lcd)
+            widget.dirty = False
+            redrawn.append((x, y, w, h))
+        return redrawn
@@ -4,20 +4,32 @@ main.py
 
 Main script for the BLE controller client.
 Handles LCD display, button/joystick input, BLE connection, and command sending for PicoTank and PicoArm.
+
+Runs on uasyncio with one task each for input scanning, the BLE write queue,
+BLE events, the display and arm setpoint streaming. A button press is written to BLE by the input
+task straight away; redrawing the LCD happens afterwards in its own task, so
+a slow redraw no longer delays the next command.
 """
 
 from machine import Pin
+import framebuf
 from lcd_display import LCDDisplay
+from lcd_widgets import Icon, Indicator, Label, Screen
+from lcd_log import LogPane
+import icons
 from ble_controller_client import BLEControllerClient
+from arm_stream import ArmStreamer
 import time
+import uasyncio as asyncio
 
 # --- Init LCD ---
-lcd = LCDDisplay()
+# 4-bit palette buffer: 28.8 KB instead of 115 KB, leaving heap for the BLE stack
+lcd = LCDDisplay(fmt=framebuf.GS4_HMSB)
 
 # --- Buttons ---
-button_a = Pin(15, Pin.IN, Pin.PULL_UP)  # Toggle Target
-button_b = Pin(17, Pin.IN, Pin.PULL_UP)  # Connect
-button_x = Pin(19, Pin.IN, Pin.PULL_UP)  # Disconnect
+button_a = Pin(15, Pin.IN, Pin.PULL_UP)  # Toggle Target (instant, both robots stay connected)
+button_b = Pin(17, Pin.IN, Pin.PULL_UP)  # Connect all robots
+button_x = Pin(19, Pin.IN, Pin.PULL_UP)  # Disconnect current target
 button_y = Pin(21, Pin.IN, Pin.PULL_UP)  # Reset/Servo Control
 
 # --- Joystick ---
@@ -28,49 +40,141 @@ right = Pin(20, Pin.IN, Pin.PULL_UP)
 ctrl = Pin(3, Pin.IN, Pin.PULL_UP)  # Center button
 
 # --- BLE Setup ---
-ble = BLEControllerClient()
+ble = BLEControllerClient(handle_cache_file="ble_handles.json")  # Reconnects skip GATT discovery
+ble_event = asyncio.ThreadSafeFlag()  # Set from the BLE IRQ
+ble.event = ble_event
 last_command = ""
 connection_status = "Disconnected"
 
 # --- Track mode ---
 targets = ["PicoTank", "PicoArm"]
 target_index = 0
-last_toggle_time = 0
 servo_angles = {"B": 90, "S": 90, "E": 90, "G": 90}  # base, shoulder, elbow, gripper
 servo_directions = {"B": 1, "S": 1, "E": 1, "G": 1}
 
-def draw_gui(selected=None, status_msg=""):
+# --- Arm streaming ---
+# The joystick sets joint velocities and poses are streamed at STREAM_RATE_HZ
+# (see arm_stream.py). False restores the 20-degree step per press.
+ARM_STREAMING = True
+STREAM_RATE_HZ = 40
+arm = ArmStreamer(ble.send_setpoints, rate_hz=STREAM_RATE_HZ)
+
+# --- Task timing ---
+INPUT_PERIOD_MS = 5     # Button/joystick scan period
+FLUSH_SLICE_BYTES = 4096  # LCD bytes sent between yields (about 0.6 ms of SPI)
+BLE_PERIOD_MS = 10      # Write queue retry / reconnect period
+HOLD_OFF_MS = {"A": 1000, "B": 500, "X": 500, "arm": 200, "T": 200}  # Repeat delay per action
+last_action = {}        # action -> time.ticks_ms() it last fired
+
+# --- GUI widgets, drawn by display_task (see lcd_widgets.py) ---
+# Only widgets whose value changed are redrawn and sent to the LCD
+screen = Screen(lcd, lcd.white)
+target_label = screen.add(Label(20, 30, ble.target_name, lcd.green, prefix="Target: "))
+target_icon = screen.add(Icon(176, 26, {
+    "PicoTank": (icons.TANK, None),
+    "PicoArm": (icons.ARM, None),
+}, ble.target_name))
+# Link quality 0-3: that many bars of the link icon are lit
+link_icon = screen.add(Icon(200, 26, {
+    level: (icons.LINK, (None,) + tuple(lcd.green if bar < level else lcd.black for bar in range(3)))
+    for level in range(4)
+}, 0))
+status_label = screen.add(Label(20, 130, connection_status, lcd.red, prefix="Status: "))
+dpad = {
+    "F": screen.add(Indicator(114, 169, icons.ARROW_UP, lcd.red, lcd.black)),
+    "B": screen.add(Indicator(114, 209, icons.ARROW_DOWN, lcd.red, lcd.black)),
+    "L": screen.add(Indicator(94, 189, icons.ARROW_LEFT, lcd.red, lcd.black)),
+    "R": screen.add(Indicator(134, 189, icons.ARROW_RIGHT, lcd.red, lcd.black)),
+    "S": screen.add(Indicator(114, 189, icons.STOP, lcd.red, lcd.black)),  # Center
+}
+gui_selected = None
+redraw = asyncio.Event()
+
+# --- Event log: the last LOG_LINES messages, sent a row at a time (see lcd_log.py) ---
+LOG_Y = 148
+LOG_LINES = 2
+log = None              # LogPane, created by draw_static()
+pending_log = []        # Messages waiting for display_task
+
+def draw_static():
     """
-    Draw the LCD GUI with current status and selected command.
-    Args:
-        selected (str): The currently selected command (F, B, L, R, S)
-        status_msg (str): Additional status message to display
+    Draw the parts of the GUI that never change. Called once at start-up.
     """
     lcd.fill(lcd.white)
     lcd.text("Pico BLE Controller", 20, 10, lcd.red)
-    lcd.text("Target: " + ble.target_name, 20, 30, lcd.green)
-    lcd.text("B: Connect", 20, 50, lcd.blue)
+    lcd.text("B: Connect all", 20, 50, lcd.blue)
     lcd.text("X: Disconnect", 20, 70, lcd.blue)
     lcd.text("A: Toggle Target", 20, 90, lcd.blue)
     lcd.text("Y+Joy: Control Arm", 20, 110, lcd.blue)
-    lcd.text("Status: " + connection_status, 20, 130, lcd.red)
-    lcd.text("Info: " + status_msg, 20, 150, lcd.black)
-
-    # Draw D-pad
-    def c(k): return lcd.red if k == selected else lcd.black
-    lcd.text("^", 115, 170, c("F"))
-    lcd.text("v", 115, 210, c("B"))
-    lcd.text("<", 95, 190, c("L"))
-    lcd.text(">", 135, 190, c("R"))
-    lcd.text("X", 115, 190, c("S"))
-    lcd.rect(114, 169, 10, 10, c("F"))  # Up
-    lcd.rect(114, 209, 10, 10, c("B"))  # Down
-    lcd.rect(94, 189, 10, 10, c("L"))   # Left
-    lcd.rect(134, 189, 10, 10, c("R"))  # Right
-    lcd.rect(114, 189, 10, 10, c("S"))  # Center
-    lcd.show()
-
-draw_gui()
+    global log
+    log = LogPane(lcd, LOG_Y, LOG_LINES, lcd.black, lcd.white)
+
+async def draw_gui():
+    """
+    Redraw the widgets whose value changed and send only their rectangles to the
+    LCD, a slice at a time so input and BLE tasks run during the transfer.
+    New log messages are added afterwards, one row write each.
+    """
+    screen.render()
+    await lcd.show_async(FLUSH_SLICE_BYTES)
+    while pending_log:
+        log.add(pending_log.pop(0))
+
+def link_level(name):
+    """
+    Return the link quality shown by the link icon: 0 if the robot is not
+    connected, otherwise 1-3 from the RSSI it was last scanned with (1 if it
+    was reached without a scan).
+    Args:
+        name (str): Target name
+    Returns:
+        int: 0-3
+    """
+    if not ble.is_connected(name):
+        return 0
+    known = ble.devices.find(name)
+    if known is None:
+        return 1
+    rssi = ble.devices.get(known[1])[2]
+    return 3 if rssi > -60 else 2 if rssi > -75 else 1
+
+def request_redraw(selected=None, status_msg=""):
+    """
+    Update the GUI widgets and ask display_task to draw them. Returns at once;
+    several requests made before the next redraw are drawn once, and widgets
+    that end up unchanged are not drawn at all.
+    Args:
+        selected (str): The currently selected command (F, B, L, R, S)
+        status_msg (str): Message to add to the event log
+    """
+    global gui_selected
+    gui_selected = selected
+    target_label.set(ble.target_name)
+    target_icon.set(ble.target_name)
+    link_icon.set(link_level(ble.target_name))
+    status_label.set(connection_status)
+    if status_msg:
+        pending_log.append(status_msg)
+        if len(pending_log) > LOG_LINES:
+            pending_log.pop(0)  # Would scroll out before it is seen
+    for key, indicator in dpad.items():
+        indicator.set(key == selected)
+    redraw.set()
+
+def fire(action, now):
+    """
+    Check whether an action may fire again and record it if so.
+    Args:
+        action (str): Key in HOLD_OFF_MS
+        now (int): time.ticks_ms()
+    Returns:
+        bool: True if the hold-off since the last time has passed
+    """
+    last = last_action.get(action)
+    if last is not None and time.ticks_diff(now, last) < HOLD_OFF_MS[action]:
+        return False
+    last_action[action] = now
+    return True
 
 def send_servo_command(joint):
     angle = servo_angles[joint]
@@ -84,96 +188,158 @@ def send_servo_command(joint):
         servo_directions[joint] = 1
     servo_angles[joint] = angle
     ble.send_command(f"{joint}{angle}")
-    draw_gui(status_msg=f"{joint} angle â {angle}Â°")
+    request_redraw(status_msg=f"{joint} angle â {angle}Â°")
 
 def reset_servos():
-    for joint in ["B", "S", "E", "G"]:
+    home = {"B": 90, "S": 0, "E": 0, "G": 180}
+    for joint in home:
         servo_directions[joint] = 1
-        if joint == "B":
-            ble.send_command(f"{joint}90")
-            servo_angles[joint] = 90
-        elif joint == "S":
-            ble.send_command(f"{joint}0")
-            servo_angles[joint] = 0
-        elif joint == "E":
-            ble.send_command(f"{joint}0")
-            servo_angles[joint] = 0
-        elif joint == "G":
-            ble.send_command(f"{joint}180")
-            servo_angles[joint] = 180
-        time.sleep(0.3)  # Add a short delay after each command
-    draw_gui(status_msg="Reset all servos")
-
-# Main loop
-while True:
-    try:
-        now = time.ticks_ms()
-
-        # --- Toggle BLE Target ---
-        if not button_a.value() and time.ticks_diff(now, last_toggle_time) > 1000:
-            target_index = (target_index + 1) % len(targets)
-            ble.switch_target(targets[target_index])
-            draw_gui(status_msg="Switched target")
-            last_toggle_time = now
-
-        # --- Connect ---
-        if not button_b.value():
-            if not ble.connected:
-                connection_status = "Connecting..."
-                draw_gui()
-                ble.connect()
-                time.sleep(0.5)
-
-        # --- Disconnect ---
-        if not button_x.value():
-            if ble.connected:
-                ble.disconnect()
-                connection_status = "Disconnected"
-                draw_gui()
-                time.sleep(0.5)
+        servo_angles[joint] = home[joint]
+    # One binary frame carries all four joints instead of four separate writes
+    ble.send_commands([(joint, home[joint]) for joint in ["B", "S", "E", "G"]])
+    arm.sync(home["B"], home["S"], home["E"], home["G"])
+    request_redraw(status_msg="Reset all servos")
+
+def on_rx(message, target):
+    # Runs from ble.poll(); several messages before the next redraw are drawn once
+    request_redraw(selected=gui_selected, status_msg=f"{target}: {message}")
+
+ble.set_rx_callback(on_rx)
+
+def scan_input():
+    """
+    Read the buttons and joystick once and send whatever they ask for.
+    """
+    global target_index, last_command, connection_status
+    now = time.ticks_ms()
+
+    # --- Toggle BLE Target ---
+    if not button_a.value() and fire("A", now):
+        target_index = (target_index + 1) % len(targets)
+        ble.switch_target(targets[target_index])
+        request_redraw(status_msg="Switched target")
+
+    # --- Connect ---
+    if not button_b.value() and not ble.connected and fire("B", now):
+        ble.connect_all()  # Queued: the stack connects one robot at a time
+        connection_status = "Connecting..."
+        request_redraw()
+
+    # --- Disconnect ---
+    if not button_x.value() and ble.connected and fire("X", now):
+        ble.disconnect()
+        connection_status = "Disconnected"
+        request_redraw()
+
+    command = ""
+    # --- Tank joystick controls ---
+    if ble.target_name == "PicoTank":
+        if not up.value(): command = "F"
+        elif not down.value(): command = "B"
+        elif not left.value(): command = "L"
+        elif not right.value(): command = "R"
+        elif not ctrl.value(): command = "S"
+
+        if command and command != last_command:
+            ble.send_command(command)
+            request_redraw(selected=command)
+            last_command = command
+        elif not command and last_command:
+            request_redraw(selected=None)
+            last_command = ""
+
+    # --- Arm joystick + button_y control ---
+    if ble.target_name != "PicoArm":
+        arm.set_axes()
+    elif ARM_STREAMING:
+        scan_arm_stream(now)
+    else:
+        if not button_y.value() and fire("arm", now):
+            if not up.value(): send_servo_command("S")   # shoulder
+            elif not down.value(): send_servo_command("E")  # elbow
+            elif not left.value(): send_servo_command("B")  # base
+            elif not right.value(): send_servo_command("G")  # gripper angle
+            else: reset_servos()
+        if not ctrl.value() and fire("T", now):
+            ble.send_command("T")  # Toggle gripper open/close
+            request_redraw(status_msg="Gripper toggled")
+
+def scan_arm_stream(now):
+    """
+    Map the joystick to joint velocities: base/shoulder, or elbow/gripper while Y is held.
+    Center toggles the gripper, or resets all servos while Y is held.
+    Args:
+        now (int): time.ticks_ms()
+    """
+    modifier = not button_y.value()
+    vertical = (not up.value()) - (not down.value())
+    horizontal = (not right.value()) - (not left.value())
+    if modifier:
+        arm.set_axes(elbow=vertical, gripper=horizontal)
+    else:
+        arm.set_axes(base=horizontal, shoulder=vertical)
+
+    if not ctrl.value():
+        if modifier and fire("arm", now):
+            reset_servos()
+        elif not modifier and fire("T", now):
+            # Sent as part of the pose: a separate T would be undone by the next setpoint
+            arm.angles[3] = 0.0 if arm.angles[3] >= 90 else 180.0
+            request_redraw(status_msg="Gripper toggled")
+
+async def input_task():
+    while True:
+        try:
+            scan_input()
+        except Exception as e:
+            print("❌ Error:", e)
+            request_redraw(status_msg=str(e))
+            await asyncio.sleep(1)
+        await asyncio.sleep_ms(INPUT_PERIOD_MS)
+
+async def ble_task():
+    # Send writes the BLE stack could not take yet and start due reconnects
+    while True:
+        ble.poll()
+        await asyncio.sleep_ms(BLE_PERIOD_MS)
+
+async def ble_event_task():
+    global connection_status
+    while True:
+        await ble_event.wait()
+        ble.poll()  # Dispatch queued notifications now rather than on the next ble_task pass
 
         # --- BLE State UI ---
         if ble.connected and connection_status != "Connected":
             connection_status = "Connected"
-            draw_gui()
-        elif not ble.connected and connection_status != "Disconnected":
+            request_redraw(status_msg=f"Connected to {ble.target_name}")
+        elif not ble.connected and not ble.connecting and connection_status != "Disconnected":
             connection_status = "Disconnected"
-            draw_gui()
-
-        command = ""
-        # --- Tank joystick controls ---
-        if ble.target_name == "PicoTank":
-            if not up.value(): command = "F"
-            elif not down.value(): command = "B"
-            elif not left.value(): command = "L"
-            elif not right.value(): command = "R"
-            elif not ctrl.value(): command = "S"
-
-            if command and command != last_command:
-                ble.send_command(command)
-                draw_gui(selected=command)
-                last_command = command
-            elif not command and last_command:
-                draw_gui(selected=None)
-                last_command = ""
-
-        # --- Arm joystick + button_y control ---
-        if ble.target_name == "PicoArm":
-            if not button_y.value():
-                if not up.value(): send_servo_command("S")   # shoulder
-                elif not down.value(): send_servo_command("E")  # elbow
-                elif not left.value(): send_servo_command("B")  # base
-                elif not right.value(): send_servo_command("G")  # gripper angle
-                else: reset_servos()
-                time.sleep(0.2)
-            if not ctrl.value():
-                ble.send_command("T")  # Toggle gripper open/close
-                draw_gui(status_msg="Gripper toggled")
-                time.sleep(0.2)
-
-        time.sleep(0.05)
-
-    except Exception as e:
-        print("❌ Error:", e)
-        draw_gui(status_msg=str(e))
-        time.sleep(1)
+            request_redraw(status_msg="Connection lost")
+
+async def stream_task():
+    # Sends the arm pose only when it changed, at most STREAM_RATE_HZ times a second
+    while True:
+        if ARM_STREAMING and ble.target_name == "PicoArm":
+            arm.tick()
+        await asyncio.sleep_ms(arm.period_ms)
+
+async def display_task():
+    while True:
+        await redraw.wait()
+        redraw.clear()
+        await draw_gui()
+
+async def main():
+    draw_static()
+    await draw_gui()
+    asyncio.create_task(ble_task())
+    asyncio.create_task(ble_event_task())
+    asyncio.create_task(display_task())
+    asyncio.create_task(stream_task())
+    await input_task()
+
+try:
+    asyncio.run(main())
+finally:
+    asyncio.new_event_loop()  # Clear the loop state for the next run from the REPL
@@ -0,0 +1,285 @@
+"""
+make_icons.py
+
+Generates icons.py, the packed sprites the controller GUI draws (see
+lcd_sprites.py). Runs on a PC with CPython, not on the Pico:
+
+    python3 make_icons.py > icons.py
+    python3 make_icons.py robot.png warning.png > icons.py
+
+The built-in icons are drawn as text below: '.' is pixel value 0, '#' 1,
+'+' 2, '*' 3 (hex digits give a value directly). PNG files are added as
+well, named after the file; they need Pillow. Fully transparent pixels
+become value 0 and are transparent on screen, every other color is mapped
+to the nearest LCDDisplay color.
+
+Each icon gets the smallest depth that holds its values: 1 bit for two
+values, 2 bits for four, 4 bits for sixteen.
+"""
+
+import os
+import sys
+
+# LCDDisplay color names and their RGB values, for PNG import
+_LCD_COLORS = {
+    "white": (255, 255, 255),
+    "black": (0, 0, 0),
+    "red": (255, 0, 0),
+    "green": (0, 255, 0),
+    "blue": (0, 0, 255),
+}
+_VALUES = {".": 0, "#": 1, "+": 2, "*": 3}
+
+ARROW_UP = [
+    "##########",
+    "#........#",
+    "#...##...#",
+    "#..####..#",
+    "#.######.#",
+    "#...##...#",
+    "#...##...#",
+    "#...##...#",
+    "#........#",
+    "##########",
+]
+
+STOP = [
+    "##########",
+    "#........#",
+    "#.##..##.#",
+    "#..####..#",
+    "#...##...#",
+    "#...##...#",
+    "#..####..#",
+    "#.##..##.#",
+    "#........#",
+    "##########",
+]
+
+TANK = [
+    "................",
+    "................",
+    "................",
+    "................",
+    ".....######.....",
+    ".....###########",
+    ".....######.....",
+    "..############..",
+    ".##############.",
+    ".++++++++++++++.",
+    "+..+..+..+..+..+",
+    "+..+..+..+..+..+",
+    ".++++++++++++++.",
+    "................",
+    "................",
+    "................",
+]
+
+ARM = [
+    "................",
+    "...........+..+.",
+    "...........++++.",
+    "............##..",
+    "...........##...",
+    "..........##....",
+    "....#####++.....",
+    "...##...........",
+    "...##...........",
+    "...##...........",
+    "...##...........",
+    "...##...........",
+    "..++++..........",
+    ".++++++.........",
+    "++++++++........",
+    "................",
+]
+
+# One value per bar, so the link quality is shown by recoloring the bars
+LINK = [
+    "................",
+    "................",
+    "................",
+    "............333.",
+    "............333.",
+    "............333.",
+    "............333.",
+    "........222.333.",
+    "........222.333.",
+    "........222.333.",
+    "........222.333.",
+    "....111.222.333.",
+    "....111.222.333.",
+    "....111.222.333.",
+    "....111.222.333.",
+    "................",
+]
+
+OBSTACLE = [
+    "................",
+    ".......##.......",
+    ".......##.......",
+    "......####......",
+    "......#++#......",
+    ".....##++##.....",
+    ".....##++##.....",
+    "....###++###....",
+    "....###++###....",
+    "...####++####...",
+    "...##########...",
+    "..#####++#####..",
+    "..#####++#####..",
+    ".##############.",
+    ".##############.",
+    "................",
+]
+
+CLEAR = [
+    "................",
+    "................",
+    "..............##",
+    ".............###",
+    "............###.",
+    "...........###..",
+    "..........###...",
+    ".##......###....",
+    ".###....###.....",
+    "..###..###......",
+    "...######.......",
+    "....####........",
+    ".....##.........",
+    "................",
+    "................",
+    "................",
+]
+
+
+def flip_vertical(art):
+    return art[::-1]
+
+
+def flip_horizontal(art):
+    return [row[::-1] for row in art]
+
+
+def transpose(art):
+    return ["".join(row[x] for row in art) for x in range(len(art[0]))]
+
+
+# name -> (art, colors); colors are LCDDisplay color names per value, None is transparent
+ICONS = {
+    "ARROW_UP": (ARROW_UP, (None, "black")),
+    "ARROW_DOWN": (flip_vertical(ARROW_UP), (None, "black")),
+    "ARROW_LEFT": (transpose(ARROW_UP), (None, "black")),
+    "ARROW_RIGHT": (flip_horizontal(transpose(ARROW_UP)), (None, "black")),
+    "STOP": (STOP, (None, "black")),
+    "TANK": (TANK, (None, "green", "black")),
+    "ARM": (ARM, (None, "blue", "black")),
+    "LINK": (LINK, (None, "green", "green", "green")),
+    "OBSTACLE": (OBSTACLE, (None, "red", "white")),
+    "CLEAR": (CLEAR, (None, "green")),
+}
+
+
+def parse_art(art):
+    """
+    Turn text art into rows of pixel values.
+    Args:
+        art (list): Equal-length strings, one per row
+    Returns:
+        list: Rows of ints
+    """
+    return [[_VALUES[ch] if ch in _VALUES else int(ch, 16) for ch in row] for row in art]
+
+
+def load_png(path):
+    """
+    Read a PNG into rows of pixel values and the color of each value.
+    Args:
+        path (str): PNG file
+    Returns:
+        tuple: (rows, colors)
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        sys.exit("PNG icons need Pillow: pip install pillow")
+
+    image = Image.open(path).convert("RGBA")
+    width, height = image.size
+    colors = [None]            # Value 0 is transparent, used or not
+    rows = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            r, g, b, a = image.getpixel((x, y))
+            if a == 0:
+                name = None
+            else:
+                name = min(_LCD_COLORS, key=lambda n: sum((c - v) ** 2 for c, v in
+                                                          zip(_LCD_COLORS[n], (r, g, b))))
+            if name not in colors:
+                colors.append(name)
+            row.append(colors.index(name))
+        rows.append(row)
+    return rows, tuple(colors)
+
+
+def pack(rows):
+    """
+    Pack pixel values in the framebuf layout for the smallest depth that fits.
+    Args:
+        rows (list): Rows of ints
+    Returns:
+        tuple: (bits, bytes)
+    """
+    top = max(max(row) for row in rows)
+    bits = 1 if top < 2 else 2 if top < 4 else 4
+    if top >= 16:
+        raise ValueError("more than 16 colors")
+    data = bytearray()
+    for row in rows:
+        packed = bytearray((len(row) * bits + 7) // 8)
+        for x, value in enumerate(row):
+            if bits == 1:                            # MONO_HLSB: leftmost pixel in bit 7
+                packed[x // 8] |= value << (7 - x % 8)
+            elif bits == 2:                          # GS2_HMSB: leftmost pixel in bits 0-1
+                packed[x // 4] |= value << (2 * (x % 4))
+            else:                                    # GS4_HMSB: leftmost pixel in the high nibble
+                packed[x // 2] |= value << (4 if x % 2 == 0 else 0)
+        data += packed
+    return bits, bytes(data)
+
+
+def emit(name, rows, colors):
+    bits, data = pack(rows)
+    chunks = ["".join("\\x%02x" % b for b in data[i:i + 16]) for i in range(0, len(data), 16)]
+    body = "\n".join('    b"%s"' % chunk for chunk in chunks)
+    names = ", ".join("None" if c is None else '"%s"' % c for c in colors)
+    return "%s = Sprite(%d, %d, %d, (\n%s\n), (%s))\n" % (name, len(rows[0]), len(rows), bits, body, names)
+
+
+def main(paths):
+    icons = [(name, parse_art(art), colors) for name, (art, colors) in ICONS.items()]
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0].upper().replace("-", "_")
+        rows, colors = load_png(path)
+        icons.append((name, rows, colors))
+
+    out = [
+        '"""\n',
+        "icons.py\n",
+        "\n",
+        "GUI icons as packed sprites (see lcd_sprites.py).\n",
+        "Generated by make_icons.py; edit that instead.\n",
+        '"""\n',
+        "\n",
+        "from lcd_sprites import Sprite\n",
+    ]
+    for name, rows, colors in icons:
+        out.append("\n")
+        out.append(emit(name, rows, colors))
+    sys.stdout.write("".join(out))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
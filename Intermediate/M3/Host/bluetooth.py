@@ -0,0 +1,388 @@
+"""
+bluetooth.py
+
+Loopback stand-in for MicroPython's bluetooth module, for running the client
+and a robot server in one CPython process on a PC (see host_run.py).
+Every BLE() is a radio on the same simulated air: the client scans, connects
+to, discovers and writes to the server's registered services, and the server's
+notifications come back to the client, all through the usual IRQ handlers.
+
+IRQs are queued and delivered once the outermost BLE call returns, or from
+run(), so a handler that calls back into BLE does not nest. With delay_us set,
+each IRQ is held back that long, which stands in for the link's latency.
+Only what the course code uses is implemented; there is no radio timing,
+packet loss, or security.
+"""
+
+import time
+
+# IRQ event codes, as in MicroPython
+_IRQ_CENTRAL_CONNECT = 1
+_IRQ_CENTRAL_DISCONNECT = 2
+_IRQ_GATTS_WRITE = 3
+_IRQ_SCAN_RESULT = 5
+_IRQ_SCAN_DONE = 6
+_IRQ_PERIPHERAL_CONNECT = 7
+_IRQ_PERIPHERAL_DISCONNECT = 8
+_IRQ_GATTC_SERVICE_RESULT = 9
+_IRQ_GATTC_SERVICE_DONE = 10
+_IRQ_GATTC_CHARACTERISTIC_RESULT = 11
+_IRQ_GATTC_CHARACTERISTIC_DONE = 12
+_IRQ_GATTC_WRITE_DONE = 17
+_IRQ_GATTC_NOTIFY = 18
+_IRQ_MTU_EXCHANGED = 21
+_IRQ_CONNECTION_UPDATE = 27
+
+_ADV_IND = 0
+_SCAN_RSP = 4
+_CONN_FAILED = 0xFFFF
+_DEFAULT_MTU = 23
+_DEFAULT_BUFFER = 20
+_SUPERVISION_TIMEOUT = 400         # 4 s, in 10 ms units
+_ATT_INVALID_HANDLE = 0x01
+
+FLAG_BROADCAST = 0x0001
+FLAG_READ = 0x0002
+FLAG_WRITE_NO_RESPONSE = 0x0004
+FLAG_WRITE = 0x0008
+FLAG_NOTIFY = 0x0010
+FLAG_INDICATE = 0x0020
+
+
+class UUID:
+    """
+    16-bit or 128-bit UUID. bytes() gives the little-endian form used on air.
+
+    Args:
+        value (int/str): 16-bit value, or a 128-bit UUID string
+    """
+    def __init__(self, value):
+        if isinstance(value, int):
+            self._bytes = value.to_bytes(2, "little")
+        else:
+            self._bytes = bytes.fromhex(value.replace("-", ""))[::-1]
+            if len(self._bytes) != 16:
+                raise ValueError("invalid UUID")
+
+    def __bytes__(self):
+        return self._bytes
+
+    def __eq__(self, other):
+        return isinstance(other, UUID) and self._bytes == other._bytes
+
+    def __hash__(self):
+        return hash(self._bytes)
+
+    def __repr__(self):
+        if len(self._bytes) == 2:
+            return "UUID(0x%04x)" % int.from_bytes(self._bytes, "little")
+        h = self._bytes[::-1].hex().upper()
+        return "UUID('%s-%s-%s-%s-%s')" % (h[:8], h[8:12], h[12:16], h[16:20], h[20:])
+
+
+class _Air:
+    """
+    Everything the radios share: who is advertising, open links, pending IRQs.
+    """
+    def __init__(self):
+        self.radios = []
+        self.links = {}            # conn_handle -> (central BLE, peripheral BLE)
+        self.events = []           # [due ticks_us, target BLE, event, data, guard]
+        self.next_conn = 1
+        self.delay_us = 0
+        self._depth = 0            # Nesting of BLE calls; IRQs wait for the outermost
+
+    def post(self, target, event, data, guard=None):
+        due = time.ticks_add(time.ticks_us(), self.delay_us)
+        self.events.append([due, target, event, data, guard])
+
+    def enter(self):
+        self._depth += 1
+
+    def leave(self):
+        self._depth -= 1
+        if self._depth == 0:
+            self.run()
+
+    def run(self):
+        """
+        Deliver every IRQ that is due, including ones raised while delivering.
+        Returns:
+            int: Number of IRQs delivered
+        """
+        if self._depth:
+            return 0
+        delivered = 0
+        self._depth += 1
+        try:
+            while True:
+                now = time.ticks_us()
+                for i, entry in enumerate(self.events):
+                    if time.ticks_diff(now, entry[0]) >= 0:
+                        break
+                else:
+                    break
+                _, target, event, data, guard = self.events.pop(i)
+                if guard is not None and not guard():
+                    continue
+                if target._handler is not None and target._active:
+                    target._handler(event, data)
+                    delivered += 1
+        finally:
+            self._depth -= 1
+        return delivered
+
+
+_air = _Air()
+
+
+def set_delay(delay_us):
+    """
+    Hold every IRQ back for a while, standing in for the link's latency.
+    Args:
+        delay_us (int): Delay in microseconds, 0 to deliver right after the call
+    """
+    _air.delay_us = delay_us
+
+
+def run():
+    """
+    Deliver pending IRQs. Call this while the program waits (host_run.py does
+    it from time.sleep_ms()).
+    Returns:
+        int: Number of IRQs delivered
+    """
+    return _air.run()
+
+
+def _call(method):
+    # Runs the BLE method, then delivers the IRQs it raised
+    def wrapper(self, *args, **kwargs):
+        _air.enter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _air.leave()
+    return wrapper
+
+
+class BLE:
+    """
+    One simulated radio. Unlike on a device, every call makes a new one, so
+    a client and a server can share the process.
+    """
+    def __init__(self):
+        _air.radios.append(self)
+        self._addr = bytes((0x02, 0, 0, 0, 0, len(_air.radios)))  # Static random address
+        self._active = False
+        self._handler = None
+        self._mtu = _DEFAULT_MTU
+        self._gap_name = "MPY BTSTACK"
+        self._adv = None           # (adv_data, resp_data) while advertising
+        self._scanning = False
+        self._connecting = False
+        self._services = []        # (uuid, start, end, [(uuid, def_handle, value_handle, flags)])
+        self._values = {}          # value_handle -> bytearray
+        self._limits = {}          # value_handle -> buffer size
+        self._next_handle = 1
+
+    def active(self, state=None):
+        if state is not None:
+            self._active = bool(state)
+            if not self._active:
+                self._adv = None
+                self._scanning = False
+        return self._active
+
+    def config(self, *args, **kwargs):
+        if args:
+            name = args[0]
+            if name == "mac":
+                return (1, self._addr)
+            if name == "mtu":
+                return self._mtu
+            if name == "gap_name":
+                return self._gap_name
+            raise ValueError("unknown config param")
+        if "mtu" in kwargs:
+            self._mtu = kwargs["mtu"]
+        if "gap_name" in kwargs:
+            self._gap_name = kwargs["gap_name"]
+        return None
+
+    def irq(self, handler):
+        self._handler = handler
+
+    # GAP
+
+    @_call
+    def gap_advertise(self, interval_us, adv_data=None, resp_data=None, connectable=True):
+        if interval_us is None:
+            self._adv = None
+        else:
+            self._adv = (bytes(adv_data or b""), bytes(resp_data or b""))
+
+    @_call
+    def gap_scan(self, duration_ms, interval_us=1280000, window_us=11250, active=False):
+        if duration_ms is None:
+            if self._scanning:
+                self._scanning = False
+                _air.post(self, _IRQ_SCAN_DONE, (0,))
+            return
+        self._scanning = True
+        scanning = lambda: self._scanning
+        for radio in _air.radios:
+            if radio is self or radio._adv is None:
+                continue
+            adv_data, resp_data = radio._adv
+            _air.post(self, _IRQ_SCAN_RESULT, (1, memoryview(radio._addr), _ADV_IND, -40,
+                                               memoryview(adv_data)), scanning)
+            if active and resp_data:
+                _air.post(self, _IRQ_SCAN_RESULT, (1, memoryview(radio._addr), _SCAN_RSP, -40,
+                                                   memoryview(resp_data)), scanning)
+
+        def done():
+            was_scanning = self._scanning
+            self._scanning = False
+            return was_scanning
+        _air.post(self, _IRQ_SCAN_DONE, (0,), done)
+
+    @_call
+    def gap_connect(self, addr_type, addr=None, scan_duration_ms=2000,
+                    min_conn_interval_us=None, max_conn_interval_us=None):
+        if addr_type is None:
+            if self._connecting:
+                self._connecting = False
+                _air.post(self, _IRQ_PERIPHERAL_DISCONNECT, (_CONN_FAILED, 0, memoryview(bytes(6))))
+            return True
+        addr = bytes(addr)
+        peripheral = None
+        for radio in _air.radios:
+            if radio._addr == addr and radio._adv is not None:
+                peripheral = radio
+        self._connecting = True
+        if peripheral is None:
+            def failed():
+                was_connecting = self._connecting
+                self._connecting = False
+                return was_connecting
+            _air.post(self, _IRQ_PERIPHERAL_DISCONNECT, (_CONN_FAILED, addr_type, memoryview(addr)), failed)
+            return True
+
+        conn_handle = _air.next_conn
+        _air.next_conn += 1
+        _air.links[conn_handle] = (self, peripheral)
+        peripheral._adv = None     # A connectable advertiser stops once connected
+        self._connecting = False
+        interval = (max_conn_interval_us or min_conn_interval_us or 30000) // 1250
+        _air.post(peripheral, _IRQ_CENTRAL_CONNECT, (conn_handle, 1, memoryview(self._addr)))
+        _air.post(self, _IRQ_PERIPHERAL_CONNECT, (conn_handle, addr_type, memoryview(addr)))
+        update = (conn_handle, interval, 0, _SUPERVISION_TIMEOUT, 0)
+        _air.post(peripheral, _IRQ_CONNECTION_UPDATE, update)
+        _air.post(self, _IRQ_CONNECTION_UPDATE, update)
+        return True
+
+    @_call
+    def gap_disconnect(self, conn_handle):
+        link = _air.links.pop(conn_handle, None)
+        if link is None:
+            return False
+        central, peripheral = link
+        _air.post(peripheral, _IRQ_CENTRAL_DISCONNECT, (conn_handle, 1, memoryview(central._addr)))
+        _air.post(central, _IRQ_PERIPHERAL_DISCONNECT, (conn_handle, 1, memoryview(peripheral._addr)))
+        return True
+
+    # GATT server
+
+    @_call
+    def gatts_register_services(self, services):
+        result = []
+        for uuid, characteristics in services:
+            start = self._next_handle
+            self._next_handle += 1
+            entries = []
+            handles = []
+            for char in characteristics:
+                char_uuid, flags = char[0], char[1]
+                def_handle = self._next_handle
+                value_handle = def_handle + 1
+                self._next_handle += 2
+                if flags & (FLAG_NOTIFY | FLAG_INDICATE):
+                    self._next_handle += 1  # CCCD
+                self._values[value_handle] = bytearray()
+                self._limits[value_handle] = _DEFAULT_BUFFER
+                entries.append((char_uuid, def_handle, value_handle, flags))
+                handles.append(value_handle)
+            self._services.append((uuid, start, self._next_handle - 1, entries))
+            result.append(tuple(handles))
+        return tuple(result)
+
+    def gatts_set_buffer(self, value_handle, size, append=False):
+        self._limits[value_handle] = size
+
+    def gatts_read(self, value_handle):
+        return bytes(self._values[value_handle])
+
+    @_call
+    def gatts_write(self, value_handle, data, send_update=False):
+        self._values[value_handle] = bytearray(data)
+
+    @_call
+    def gatts_notify(self, conn_handle, value_handle, data=None):
+        link = _air.links.get(conn_handle)
+        if link is None or link[1] is not self:
+            raise OSError(107)     # ENOTCONN
+        if data is None:
+            data = self._values[value_handle]
+        _air.post(link[0], _IRQ_GATTC_NOTIFY, (conn_handle, value_handle, memoryview(bytes(data))))
+
+    # GATT client
+
+    def _server(self, conn_handle):
+        link = _air.links.get(conn_handle)
+        if link is None or link[0] is not self:
+            raise OSError(107)     # ENOTCONN
+        return link[1]
+
+    @_call
+    def gattc_discover_services(self, conn_handle, uuid=None):
+        server = self._server(conn_handle)
+        for service_uuid, start, end, _ in server._services:
+            if uuid is None or uuid == service_uuid:
+                _air.post(self, _IRQ_GATTC_SERVICE_RESULT, (conn_handle, start, end, service_uuid))
+        _air.post(self, _IRQ_GATTC_SERVICE_DONE, (conn_handle, 0))
+
+    @_call
+    def gattc_discover_characteristics(self, conn_handle, start_handle, end_handle, uuid=None):
+        server = self._server(conn_handle)
+        for _, start, end, entries in server._services:
+            for char_uuid, def_handle, value_handle, flags in entries:
+                if start_handle <= def_handle <= end_handle and (uuid is None or uuid == char_uuid):
+                    _air.post(self, _IRQ_GATTC_CHARACTERISTIC_RESULT,
+                              (conn_handle, def_handle, value_handle, flags, char_uuid))
+        _air.post(self, _IRQ_GATTC_CHARACTERISTIC_DONE, (conn_handle, 0))
+
+    @_call
+    def gattc_exchange_mtu(self, conn_handle):
+        server = self._server(conn_handle)
+        mtu = min(self._mtu, server._mtu)
+        _air.post(server, _IRQ_MTU_EXCHANGED, (conn_handle, mtu))
+        _air.post(self, _IRQ_MTU_EXCHANGED, (conn_handle, mtu))
+
+    @_call
+    def gattc_write(self, conn_handle, value_handle, data, mode=0):
+        server = self._server(conn_handle)
+        if value_handle in server._values:
+            # Longer writes are cut to the buffer set with gatts_set_buffer()
+            value = bytearray(bytes(data)[:server._limits[value_handle]])
+
+            def arrive():
+                # The value changes when the write arrives, so delayed writes keep their order
+                server._values[value_handle] = value
+                return True
+            _air.post(server, _IRQ_GATTS_WRITE, (conn_handle, value_handle), arrive)
+            status = 0
+        else:
+            status = _ATT_INVALID_HANDLE
+        if mode == 1:
+            _air.post(self, _IRQ_GATTC_WRITE_DONE, (conn_handle, value_handle, status))
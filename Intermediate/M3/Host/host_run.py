@@ -0,0 +1,116 @@
+"""
+host_run.py
+
+Runs a controller script (such as bench_latency.py) on a PC with CPython,
+against the tank and arm servers in the same process, over the loopback
+bluetooth module in this folder. Useful to check the protocol, the benchmarks,
+and changes to the client or servers without hardware, e.g. in CI:
+
+    python3 host_run.py bench_latency.py
+    python3 host_run.py bench_transfer.py --delay-us 7500
+
+The servers run with actuator callbacks that do nothing; their poll() runs
+whenever the script calls time.sleep_ms(). --delay-us holds every BLE event
+back for that long, roughly one connection interval. Times measured here
+show what the code costs on a PC, not what the radio does.
+"""
+
+import os
+import runpy
+import sys
+import time
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+_M3 = os.path.dirname(_HERE)
+_CLIENT = os.path.join(_M3, "Client")
+_SERVERS = [
+    ("Tank Server", "ble_tank_server", "BLETankServer"),
+    ("Arm Server", "ble_arm_server", "BLEArmServer"),
+]
+_TICKS_PERIOD = 1 << 30    # MicroPython ticks wrap at 2**30 on the Pico
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+servers = []
+
+
+def _ticks_add(ticks, delta):
+    return (ticks + delta) % _TICKS_PERIOD
+
+
+def _ticks_diff(end, start):
+    return ((end - start + _TICKS_HALF) % _TICKS_PERIOD) - _TICKS_HALF
+
+
+def _sleep_ms(ms):
+    # Stand-in for the robots' main loops: deliver BLE events and poll every
+    # server until the time is up
+    import bluetooth
+    end = time.monotonic() + ms / 1000
+    while True:
+        bluetooth.run()
+        for server in servers:
+            server.poll()
+        bluetooth.run()
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        time.sleep(min(remaining, 0.001))
+
+
+def install_time():
+    """
+    Add MicroPython's ticks and sleep functions to CPython's time module.
+    """
+    time.ticks_ms = lambda: int(time.monotonic() * 1000) % _TICKS_PERIOD
+    time.ticks_us = lambda: int(time.monotonic() * 1_000_000) % _TICKS_PERIOD
+    time.ticks_cpu = time.ticks_us
+    time.ticks_add = _ticks_add
+    time.ticks_diff = _ticks_diff
+    time.sleep_ms = _sleep_ms
+    time.sleep_us = lambda us: _sleep_ms(us / 1000)
+
+
+def start_servers():
+    """
+    Start every robot server, each with its own folder's modules.
+    The folders share module names (ble_notifier, telemetry, ...), so each
+    server's modules are dropped from sys.modules once it is running.
+    """
+    import bluetooth
+    for folder, module_name, class_name in _SERVERS:
+        path = os.path.join(_M3, folder)
+        sys.path.insert(0, path)
+        try:
+            module = __import__(module_name)
+            server = getattr(module, class_name)(bluetooth.BLE(), lambda cmd, arg: None)
+        finally:
+            sys.path.remove(path)
+            for name, loaded in tuple(sys.modules.items()):
+                if os.path.dirname(getattr(loaded, "__file__", None) or "") == path:
+                    del sys.modules[name]
+        servers.append(server)
+
+
+def main(argv):
+    if not argv or argv[0].startswith("-"):
+        sys.exit("usage: host_run.py SCRIPT [--delay-us N]")
+    script = argv[0]
+    if "--delay-us" in argv:
+        delay_us = int(argv[argv.index("--delay-us") + 1])
+    else:
+        delay_us = 0
+
+    sys.path.insert(0, _HERE)  # bluetooth and micropython stand-ins come first
+    install_time()
+    import bluetooth
+    bluetooth.set_delay(delay_us)
+    start_servers()
+
+    sys.path.insert(1, _CLIENT)
+    if not os.path.exists(script):
+        script = os.path.join(_CLIENT, script)
+    runpy.run_path(script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
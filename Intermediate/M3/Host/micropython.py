@@ -0,0 +1,17 @@
+"""
+micropython.py
+
+Stand-in for MicroPython's micropython module on a PC (see host_run.py).
+"""
+
+
+def const(value):
+    return value
+
+
+def native(function):
+    return function
+
+
+def viper(function):
+    return function
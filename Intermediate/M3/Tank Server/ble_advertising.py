@@ -4,10 +4,10 @@
 ble_advertising.py
 
 Utility functions for creating BLE advertising payloads for MicroPython BLE applications.
-Provides a function to build advertising payloads with device name and service UUIDs.
+Provides functions to build advertising and scan response payloads with device name and service UUIDs.
 
 This module is designed for use on MicroPython devices with BLE support (e.g., Raspberry Pi Pico W).
-It provides a helper function to construct advertising payloads for BLE services, including device name and service UUIDs.
+It provides helper functions to construct advertising and scan response payloads for BLE services, including device name and service UUIDs.
 """
 
 
@@ -24,6 +24,58 @@ _ADV_TYPE_UUID32_COMPLETE = const(0x05)    # Complete list of 32-bit Service Cla
 _ADV_TYPE_UUID128_COMPLETE = const(0x07)   # Complete list of 128-bit Service Class UUIDs
 
 
+# Legacy advertising data and scan response data are each limited to 31 bytes
+_MAX_PAYLOAD = const(31)
+
+# AD type for each UUID length in bytes; other lengths are ignored
+_UUID_TYPES = {
+    2: _ADV_TYPE_UUID16_COMPLETE,
+    4: _ADV_TYPE_UUID32_COMPLETE,
+    16: _ADV_TYPE_UUID128_COMPLETE,
+}
+
+
+def _encode(flags, name, services):
+    """
+    Pack AD structures (length, type, value) into a single preallocated bytearray.
+
+    Args:
+        flags (int): Flags value, or None to leave out the Flags field (scan responses).
+        name (str): Device name (optional).
+        services (list): List of UUID objects (optional).
+
+    Returns:
+        bytearray: The encoded payload.
+
+    Raises:
+        ValueError: If the payload does not fit in 31 bytes.
+    """
+    # Collect the fields first so the payload is allocated once at its final size
+    fields = []
+    if flags is not None:
+        fields.append((_ADV_TYPE_FLAGS, bytes((flags,))))
+    if name:
+        fields.append((_ADV_TYPE_NAME, name.encode()))
+    for uuid in services or ():
+        b = bytes(uuid)
+        if len(b) in _UUID_TYPES:
+            fields.append((_UUID_TYPES[len(b)], b))
+
+    size = 0
+    for _, value in fields:
+        size += 2 + len(value)  # Length and type bytes plus the value
+    if size > _MAX_PAYLOAD:
+        raise ValueError("advertising payload is %d bytes, limit is 31" % size)
+
+    payload = bytearray(size)
+    offset = 0
+    for adv_type, value in fields:
+        struct.pack_into("BB", payload, offset, len(value) + 1, adv_type)  # Length, Type
+        payload[offset + 2:offset + 2 + len(value)] = value                # Value
+        offset += 2 + len(value)
+    return payload
+
+
 def advertising_payload(limited_disc=False, br_edr=False, name=None, services=None):
     """
     Build a BLE advertising payload for MicroPython BLE applications.
@@ -37,37 +89,26 @@ def advertising_payload(limited_disc=False, br_edr=False, name=None, services=No
     Returns:
         bytearray: The constructed BLE advertising payload.
 
-    This function creates a payload that can be used with BLE advertising APIs.
-    It includes flags, device name, and service UUIDs as appropriate.
+    Build it once and pass the same object to every gap_advertise() call.
+    The Flags field is always included; the name and UUIDs are optional.
     """
-    payload = bytearray()
-
-    # Add Flags field (required for BLE advertising)
     # 0x02: LE Limited Discoverable Mode, 0x06: LE General Discoverable Mode
-    flags = 0x02 if limited_disc else 0x06
-    payload += struct.pack("BB", 2, _ADV_TYPE_FLAGS)  # Length, Type
-    payload += struct.pack("B", flags)                # Value
+    return _encode(0x02 if limited_disc else 0x06, name, services)
 
-    # Add Complete Local Name (if provided)
-    if name:
-        name_bytes = name.encode()
-        payload += struct.pack("BB", len(name_bytes) + 1, _ADV_TYPE_NAME)  # Length, Type
-        payload += name_bytes
-
-    # Add Service UUIDs (if provided)
-    if services:
-        for uuid in services:
-            b = bytes(uuid)
-            # Determine UUID length and use appropriate advertisement type
-            if len(b) == 2:
-                # 16-bit UUID
-                payload += struct.pack("BB", len(b) + 1, _ADV_TYPE_UUID16_COMPLETE) + b
-            elif len(b) == 4:
-                # 32-bit UUID
-                payload += struct.pack("BB", len(b) + 1, _ADV_TYPE_UUID32_COMPLETE) + b
-            elif len(b) == 16:
-                # 128-bit UUID
-                payload += struct.pack("BB", len(b) + 1, _ADV_TYPE_UUID128_COMPLETE) + b
-            # If UUID length is not standard, it is ignored
-
-    return payload  # Return the constructed advertising payload
+
+def scan_response_payload(name=None, services=None):
+    """
+    Build a BLE scan response payload for MicroPython BLE applications.
+
+    Args:
+        name (str): Device name to send (optional).
+        services (list): List of UUID objects to send (optional).
+
+    Returns:
+        bytearray: The constructed scan response payload.
+
+    Scan responses are only sent to scanners using active scanning and carry
+    no Flags field. They give a second 31 bytes, e.g. for the device name when
+    the advertisement is filled by a 128-bit service UUID.
+    """
+    return _encode(None, name, services)
@@ -19,13 +19,15 @@ from ble_led import BleLED
 led = BleLED()                            # BLE indicator LED (e.g., GPIO 16)
 tank = RobotTank(2, 3, 4, 5)              # Motor driver pins: IN1, IN2, IN3, IN4
 
-def on_rx(command):
+def on_rx(command, arg=None):
     """
     BLE receive callback. Handles incoming commands and controls the tank robot.
 
     Args:
         command (str): Single-character command from BLE client.
-            'F' = Forward, 'B' = Backward, 'L' = Left, 'R' = Right, 'S' = Stop
+            'F' = Forward, 'B' = Backward, 'L' = Left, 'R' = Right, 'S' = Stop,
+            'X' = Emergency stop
+        arg (int): Command argument (unused by the tank)
     """
     print("📥 Command received:", command)
     led.toggle()  # Indicate command received
@@ -39,7 +41,7 @@ def on_rx(command):
             tank.turn_left()
         elif command == "R":
             tank.turn_right()
-        elif command == "S":
+        elif command in ("S", "X"):
             tank.stop()
         else:
             print("⚠️ Unknown command")
@@ -70,7 +72,11 @@ try:
         if not connected:
             led.blink()  # Blink LED while waiting for connection
 
-        time.sleep(0.1)
+        # Run commands queued by the BLE IRQ and stream telemetry
+        ble_server.telemetry.motor = tank.state
+        ble_server.poll()
+
+        time.sleep_ms(10)
 
 except KeyboardInterrupt:
     print("🛑 Script stopped by user")